@@ -0,0 +1,31 @@
+"""Add chat_histories table
+
+Revision ID: add_chat_histories_table
+Revises: 381d2962d851
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chat_histories_table'
+down_revision: Union[str, None] = '381d2962d851'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Persistent chat mentor history, one versioned JSON document per user
+    op.create_table(
+        'chat_histories',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('messages', sa.JSON(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+def downgrade() -> None:
+    op.drop_table('chat_histories')
@@ -0,0 +1,29 @@
+"""Add read watermarks to conversations
+
+Revision ID: add_conversation_read_watermarks
+Revises: add_messages_pair_index
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_conversation_read_watermarks'
+down_revision: Union[str, None] = 'add_messages_pair_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('last_read_a', sa.Integer(), nullable=True))
+    op.add_column('conversations', sa.Column('last_read_b', sa.Integer(), nullable=True))
+    
+    # A side with nothing unread has read up to the latest message; sides with
+    # pending unread messages keep their counter and get a watermark on first read
+    op.execute("UPDATE conversations SET last_read_a = last_message_id WHERE unread_a = 0")
+    op.execute("UPDATE conversations SET last_read_b = last_message_id WHERE unread_b = 0")
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'last_read_b')
+    op.drop_column('conversations', 'last_read_a')
@@ -0,0 +1,61 @@
+"""Add conversations table
+
+Revision ID: add_conversations_table
+Revises: add_chat_histories_table
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_conversations_table'
+down_revision: Union[str, None] = 'add_chat_histories_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table(
+        'conversations',
+        sa.Column('user_a_id', sa.Integer(), nullable=False),
+        sa.Column('user_b_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=False),
+        sa.Column('last_sender_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_preview', sa.String(length=255), nullable=False),
+        sa.Column('last_message_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('unread_a', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('unread_b', sa.Integer(), server_default='0', nullable=False),
+        sa.CheckConstraint('user_a_id <= user_b_id', name='ck_conversations_ordered_pair'),
+        sa.ForeignKeyConstraint(['user_a_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_b_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_a_id', 'user_b_id')
+    )
+    
+    # Each user's inbox is read newest-first from one side of the pair
+    op.create_index('ix_conversations_user_a_recent', 'conversations', ['user_a_id', 'last_message_at'], unique=False)
+    op.create_index('ix_conversations_user_b_recent', 'conversations', ['user_b_id', 'last_message_at'], unique=False)
+    
+    # Backfill one row per existing pair from its latest message
+    op.execute("""
+        INSERT INTO conversations (
+            user_a_id, user_b_id, last_message_id, last_sender_id,
+            last_message_preview, last_message_at, unread_a, unread_b
+        )
+        SELECT DISTINCT ON (LEAST(sender_id, recipient_id), GREATEST(sender_id, recipient_id))
+            LEAST(sender_id, recipient_id),
+            GREATEST(sender_id, recipient_id),
+            message_id,
+            sender_id,
+            LEFT(body, 255),
+            timestamp,
+            0,
+            0
+        FROM messages
+        ORDER BY LEAST(sender_id, recipient_id), GREATEST(sender_id, recipient_id), timestamp DESC, message_id DESC
+    """)
+
+def downgrade() -> None:
+    op.drop_index('ix_conversations_user_b_recent', table_name='conversations')
+    op.drop_index('ix_conversations_user_a_recent', table_name='conversations')
+    op.drop_table('conversations')
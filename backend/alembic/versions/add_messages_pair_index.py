@@ -0,0 +1,40 @@
+"""Add conversation keyset index on messages
+
+Revision ID: add_messages_pair_index
+Revises: add_conversations_table
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_messages_pair_index'
+down_revision: Union[str, None] = 'add_conversations_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Serves WHERE LEAST(..) = a AND GREATEST(..) = b ORDER BY timestamp, message_id
+    # in either direction, from any (timestamp, message_id) cursor
+    op.create_index(
+        'ix_messages_pair_timestamp',
+        'messages',
+        [
+            sa.text('LEAST(sender_id, recipient_id)'),
+            sa.text('GREATEST(sender_id, recipient_id)'),
+            sa.text('timestamp DESC'),
+            sa.text('message_id DESC'),
+        ],
+        unique=False
+    )
+
+    # Superseded by the pair index; 383abf336991 and 6dcdf8a4ad47 normally dropped it
+    # already, so only remove it where it somehow survived
+    op.execute("DROP INDEX IF EXISTS ix_messages_conversation")
+
+def downgrade() -> None:
+    # ix_messages_conversation was already gone before this revision, so only the
+    # pair index is undone
+    op.drop_index('ix_messages_pair_timestamp', table_name='messages')
@@ -0,0 +1,41 @@
+"""Add full-text search column to messages
+
+Revision ID: add_messages_search
+Revises: add_conversation_read_watermarks
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_messages_search'
+down_revision: Union[str, None] = 'add_conversation_read_watermarks'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # A stored generated column is filled for existing rows here (rewriting the table)
+    # and kept up to date by Postgres on every insert, with no trigger to maintain
+    op.add_column(
+        'messages',
+        sa.Column(
+            'body_tsv',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', body)", persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_messages_body_tsv',
+        'messages',
+        ['body_tsv'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_body_tsv', table_name='messages')
+    op.drop_column('messages', 'body_tsv')
@@ -0,0 +1,43 @@
+"""Add keyset pagination index to saved_recommendations
+
+Revision ID: add_saved_recommendations_page_index
+Revises: partition_messages_by_month
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_saved_recommendations_page_index'
+down_revision: Union[str, None] = 'partition_messages_by_month'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Keyset cursors compare (saved_at, id), which a NULL saved_at would break
+    op.execute("UPDATE saved_recommendations SET saved_at = now() WHERE saved_at IS NULL")
+    op.alter_column(
+        'saved_recommendations',
+        'saved_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=False
+    )
+    op.create_index(
+        'ix_saved_recommendations_user_saved_at',
+        'saved_recommendations',
+        ['user_id', 'saved_at', 'id'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_saved_recommendations_user_saved_at', table_name='saved_recommendations')
+    op.alter_column(
+        'saved_recommendations',
+        'saved_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=True
+    )
@@ -0,0 +1,111 @@
+"""Partition messages by month
+
+Revision ID: partition_messages_by_month
+Revises: add_messages_search
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'partition_messages_by_month'
+down_revision: Union[str, None] = 'add_messages_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created past the current month; later ones are created by the app at
+# startup and by scripts/manage_message_partitions.py
+MONTHS_AHEAD = 3
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _create_indexes() -> None:
+    # Created on the parent, so every partition gets (and new ones inherit) its own copy
+    op.create_index('ix_messages_sender_id', 'messages', ['sender_id'], unique=False)
+    op.create_index('ix_messages_recipient_id', 'messages', ['recipient_id'], unique=False)
+    op.create_index('ix_messages_timestamp', 'messages', ['timestamp'], unique=False)
+    op.create_index(
+        'ix_messages_pair_timestamp',
+        'messages',
+        [
+            sa.text('LEAST(sender_id, recipient_id)'),
+            sa.text('GREATEST(sender_id, recipient_id)'),
+            sa.text('timestamp DESC'),
+            sa.text('message_id DESC'),
+        ],
+        unique=False
+    )
+    op.create_index('ix_messages_body_tsv', 'messages', ['body_tsv'], unique=False, postgresql_using='gin')
+
+def _messages_columns(primary_key):
+    return [
+        sa.Column('message_id', sa.Integer(), server_default=sa.text("nextval('message_id_seq')"), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('recipient_id', sa.Integer(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column(
+            'body_tsv',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', body)", persisted=True),
+            nullable=True
+        ),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+        primary_key,
+    ]
+
+def upgrade() -> None:
+    # Rebuilds messages as a partitioned table and copies every row across, holding an
+    # exclusive lock on messages for the duration: run it in a maintenance window.
+    op.rename_table('messages', 'messages_unpartitioned')
+    op.execute('ALTER INDEX messages_pkey RENAME TO messages_unpartitioned_pkey')
+
+    # The partition key has to be part of the primary key
+    op.create_table(
+        'messages',
+        *_messages_columns(sa.PrimaryKeyConstraint('message_id', 'timestamp', name='messages_pkey')),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text('SELECT MIN(timestamp) FROM messages_unpartitioned')).scalar()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = oldest.astimezone(timezone.utc).date().replace(day=1) if oldest is not None else current
+    while month <= _add_months(current, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE messages_{month:%Y_%m} PARTITION OF messages "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{_add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute("""
+        INSERT INTO messages (message_id, sender_id, recipient_id, body, timestamp)
+        SELECT message_id, sender_id, recipient_id, body, timestamp
+        FROM messages_unpartitioned
+    """)
+    op.drop_table('messages_unpartitioned')
+    _create_indexes()
+
+def downgrade() -> None:
+    # Archived partitions are not restored: restore them first to keep their messages
+    op.rename_table('messages', 'messages_partitioned')
+    op.execute('ALTER INDEX messages_pkey RENAME TO messages_partitioned_pkey')
+    for name in ('ix_messages_sender_id', 'ix_messages_recipient_id', 'ix_messages_timestamp',
+                 'ix_messages_pair_timestamp', 'ix_messages_body_tsv'):
+        op.drop_index(name, table_name='messages_partitioned')
+
+    op.create_table('messages', *_messages_columns(sa.PrimaryKeyConstraint('message_id', name='messages_pkey')))
+    op.execute("""
+        INSERT INTO messages (message_id, sender_id, recipient_id, body, timestamp)
+        SELECT message_id, sender_id, recipient_id, body, timestamp
+        FROM messages_partitioned
+    """)
+    op.drop_table('messages_partitioned')
+    _create_indexes()
@@ -5,6 +5,8 @@ from .message import Message
 from .saved_recommendation import SavedRecommendation
 from .user_note import UserNote
 from .user_skill import UserSkill
+from .chat_history import ChatHistory
+from .conversation import Conversation
 from ..utils.database import Base
 
-__all__ = ['User', 'UserProfile', 'SuggestedPeers', 'Message', 'SavedRecommendation', 'UserNote', 'UserSkill', 'Base']
+__all__ = ['User', 'UserProfile', 'SuggestedPeers', 'Message', 'SavedRecommendation', 'UserNote', 'UserSkill', 'ChatHistory', 'Conversation', 'Base']
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from ..utils.database import Base
+
+class ChatHistory(Base):
+    __tablename__ = "chat_histories"
+    
+    # One row per user; written in batches by app.services.chat_history
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    messages = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
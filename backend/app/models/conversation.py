@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index
+from sqlalchemy.sql import func
+from ..utils.database import Base
+
+class Conversation(Base):
+    """
+    One row per pair of users who have exchanged messages, maintained by send_message in
+    the same transaction as the message insert so the inbox never scans messages.
+    The pair is stored ordered (user_a_id <= user_b_id); *_a / *_b columns belong to that side.
+    """
+    __tablename__ = "conversations"
+    
+    user_a_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    user_b_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Not a foreign key, so old messages can be archived without touching this table
+    last_message_id = Column(Integer, nullable=False)
+    last_sender_id = Column(Integer, nullable=False)
+    last_message_preview = Column(String(255), nullable=False)
+    last_message_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    unread_a = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_b = Column(Integer, nullable=False, default=0, server_default="0")
+    # Read watermarks: every message with an id up to this one has been read by that side
+    last_read_a = Column(Integer, nullable=True)
+    last_read_b = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        CheckConstraint("user_a_id <= user_b_id", name="ck_conversations_ordered_pair"),
+        Index("ix_conversations_user_a_recent", "user_a_id", "last_message_at"),
+        Index("ix_conversations_user_b_recent", "user_b_id", "last_message_at"),
+    )
@@ -1,16 +1,38 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Sequence
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Sequence, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from ..utils.database import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    # One partition per month (see app/utils/message_partitions.py), so indexes stay
+    # month-sized and old months can be archived by detaching them
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
     
     message_id = Column(Integer, Sequence("message_id_seq"), primary_key=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     body = Column(Text, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # Part of the primary key because it is the partition key
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True, index=True)
+    # Search document maintained by Postgres on insert/update. The 'simple' configuration
+    # (no stemming or stopwords) because messages mix French and English. Deferred so
+    # ordinary message loads do not fetch it.
+    body_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', body)", persisted=True)))
     
     # Relationships can be added later if needed
     # sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
-    # recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_messages") 
\ No newline at end of file
+    # recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_messages") 
+
+# Conversation pages: one index range per user pair, whichever side sent the message
+Index(
+    "ix_messages_pair_timestamp",
+    func.least(Message.sender_id, Message.recipient_id),
+    func.greatest(Message.sender_id, Message.recipient_id),
+    Message.timestamp.desc(),
+    Message.message_id.desc(),
+)
+
+# Full-text search over message bodies
+Index("ix_messages_body_tsv", Message.body_tsv, postgresql_using="gin")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Float, Text, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Float, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..utils.database import Base
@@ -26,12 +26,14 @@ class SavedRecommendation(Base):
     decision_making = Column(Float, nullable=True)
     stress_tolerance = Column(Float, nullable=True)
     all_fields = Column(JSON, nullable=True)
-    saved_at = Column(DateTime(timezone=True), server_default=func.now())
+    saved_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     
     # Define unique constraint to prevent duplicates
     __table_args__ = (
         UniqueConstraint('user_id', 'oasis_code', name='uq_user_oasis_code'),
+        # Keyset pages of a user's space, newest first
+        Index('ix_saved_recommendations_user_saved_at', 'user_id', 'saved_at', 'id'),
     )
     
     # Relationships
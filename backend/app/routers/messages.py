@@ -1,18 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Body, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
-from ..utils.database import get_db
-from ..models import User, UserProfile
+from ..utils.database import get_db, SessionLocal
+from ..models import User, Message
 from ..routes.user import get_current_user
-from ..utils.messaging import send_message, get_conversation, get_user_suggested_peers, MessageResponse
+from ..utils.message_partitions import ensure_partitions
+from ..utils.messaging import (
+    send_message, get_conversation, get_user_conversations, get_user_suggested_peers, MessageResponse,
+    mark_conversation_read, ReadReceipt, message_hub, search_messages, MessageSearchPage,
+    send_bulk_messages, publish_bulk_messages, BulkSendResult
+)
+import asyncio
 import logging
-from sqlalchemy import text
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 logger = logging.getLogger(__name__)
 
+def create_upcoming_partitions():
+    db = SessionLocal()
+    try:
+        ensure_partitions(db)
+    except Exception as e:
+        # Another worker may be creating the same partition; the next start retries
+        db.rollback()
+        logger.warning(f"Could not create upcoming message partitions: {str(e)}")
+    finally:
+        db.close()
+
+@router.on_event("startup")
+async def start_message_hub():
+    await message_hub.start()
+    await asyncio.to_thread(create_upcoming_partitions)
+
+@router.on_event("shutdown")
+async def stop_message_hub():
+    await message_hub.stop()
+
+def authenticate_socket(token: str) -> Optional[int]:
+    """User id for a bearer token, or None; uses a short-lived session so sockets hold no DB connection."""
+    db = SessionLocal()
+    try:
+        return get_current_user(token=token, db=db).id
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+def load_message_body(message_id: int) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        message = db.query(Message).filter(Message.message_id == message_id).first()
+        return message.body if message else None
+    finally:
+        db.close()
+
 class MessageRequest(BaseModel):
     recipient_id: int
     body: str = Field(..., min_length=1, max_length=5000)
@@ -21,8 +64,25 @@ class ConversationPreview(BaseModel):
     peer_id: int
     peer_name: Optional[str] = None
     last_message: str
+    last_message_id: int
+    last_sender_id: int
     timestamp: datetime
     unread_count: int = 0
+    last_read_message_id: Optional[int] = None
+    peer_last_read_message_id: Optional[int] = None
+
+# Messages accepted by one bulk request
+MAX_BULK_MESSAGES = 1000
+
+class BulkMessageRequest(BaseModel):
+    recipient_ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_MESSAGES)
+    body: str = Field(..., min_length=1, max_length=5000)
+
+class ImportMessagesRequest(BaseModel):
+    messages: List[MessageRequest] = Field(..., min_length=1, max_length=MAX_BULK_MESSAGES)
+
+class MarkReadRequest(BaseModel):
+    up_to: Optional[int] = Field(None, description="Last message id read; defaults to the latest message")
 
 @router.post("", response_model=MessageResponse)
 def create_message(
@@ -49,16 +109,75 @@ def create_message(
             detail=f"Failed to send message: {str(e)}"
         )
 
+def run_bulk_send(
+    db: Session, sender_id: int, recipient_ids: List[int], bodies: List[str], background_tasks: BackgroundTasks
+) -> BulkSendResult:
+    if any(not body.strip() for body in bodies):
+        raise HTTPException(status_code=400, detail="Message body cannot be empty")
+    try:
+        result, messages = send_bulk_messages(db, sender_id, recipient_ids, bodies)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error sending bulk messages: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to send messages: {str(e)}"
+        )
+    
+    # Socket notifications go out after the response rather than delaying it
+    background_tasks.add_task(publish_bulk_messages, messages)
+    return result
+
+@router.post("/bulk", response_model=BulkSendResult)
+def create_bulk_messages(
+    background_tasks: BackgroundTasks,
+    request: BulkMessageRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Send the same message to many users at once, e.g. an announcement to a cohort.
+    Unknown recipients are skipped and listed in invalid_recipient_ids.
+    """
+    recipient_ids = list(dict.fromkeys(request.recipient_ids))
+    return run_bulk_send(db, current_user.id, recipient_ids, [request.body] * len(recipient_ids), background_tasks)
+
+@router.post("/import", response_model=BulkSendResult)
+def import_messages(
+    background_tasks: BackgroundTasks,
+    request: ImportMessagesRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Send a batch of individually addressed messages from the current user in one request.
+    Unknown recipients are skipped and listed in invalid_recipient_ids.
+    """
+    return run_bulk_send(
+        db,
+        current_user.id,
+        [message.recipient_id for message in request.messages],
+        [message.body for message in request.messages],
+        background_tasks
+    )
+
 @router.get("/conversation/{peer_id}", response_model=List[MessageResponse])
 def read_conversation(
     peer_id: int,
     limit: int = Query(20, gt=0, le=100),
+    before: Optional[int] = Query(None, description="Return messages older than this message id"),
+    after: Optional[int] = Query(None, description="Return messages newer than this message id"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get conversation between current user and another user."""
+    """
+    Get one page of the conversation between the current user and another user, newest first.
+    Page back with `before` set to the oldest message id received so far.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
     try:
-        messages = get_conversation(db, current_user.id, peer_id, limit)
+        messages = get_conversation(db, current_user.id, peer_id, limit, before=before, after=after)
         return messages
         
     except Exception as e:
@@ -68,74 +187,38 @@ def read_conversation(
             detail=f"Failed to retrieve conversation: {str(e)}"
         )
 
+@router.post("/conversation/{peer_id}/read", response_model=ReadReceipt)
+def mark_read(
+    peer_id: int,
+    request: Optional[MarkReadRequest] = Body(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark the conversation with a peer read, up to a message or entirely."""
+    try:
+        receipt = mark_conversation_read(db, current_user.id, peer_id, request.up_to if request else None)
+    except Exception as e:
+        logger.error(f"Error marking conversation read: {str(e)}")
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to mark conversation read: {str(e)}"
+        )
+    
+    if receipt is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return receipt
+
 @router.get("/conversations", response_model=List[ConversationPreview])
 def read_conversations(
+    limit: int = Query(20, gt=0, le=100),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all active conversations for the current user."""
+    """Get the current user's conversations, most recent first."""
     try:
-        # Find all users the current user has exchanged messages with
-        conversation_partners = db.execute(
-            text("""
-                SELECT DISTINCT 
-                    CASE 
-                        WHEN sender_id = :user_id THEN recipient_id 
-                        ELSE sender_id 
-                    END AS peer_id
-                FROM messages
-                WHERE sender_id = :user_id OR recipient_id = :user_id
-            """),
-            {"user_id": current_user.id}
-        ).fetchall()
-        
-        # If no conversations found, return empty list
-        if not conversation_partners:
-            return []
-        
-        result = []
-        
-        for (peer_id,) in conversation_partners:
-            # Get the most recent message
-            latest_message = db.execute(
-                text("""
-                    SELECT 
-                        message_id, 
-                        sender_id, 
-                        body, 
-                        timestamp
-                    FROM messages
-                    WHERE (sender_id = :user_id AND recipient_id = :peer_id)
-                       OR (sender_id = :peer_id AND recipient_id = :user_id)
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                """),
-                {"user_id": current_user.id, "peer_id": peer_id}
-            ).fetchone()
-            
-            if not latest_message:
-                continue
-            
-            # Get peer profile info
-            peer_profile = db.query(UserProfile).filter(UserProfile.user_id == peer_id).first()
-            peer_name = peer_profile.name if peer_profile and peer_profile.name else f"User {peer_id}"
-            
-            # Count unread messages (messages sent by peer that weren't read yet)
-            # This is a placeholder - in a real implementation you'd have a read_at field
-            unread_count = 0
-            
-            result.append(ConversationPreview(
-                peer_id=peer_id,
-                peer_name=peer_name,
-                last_message=latest_message.body,
-                timestamp=latest_message.timestamp,
-                unread_count=unread_count
-            ))
-        
-        # Sort by most recent message
-        result.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        return result
+        return get_user_conversations(db, current_user.id, limit, offset)
         
     except Exception as e:
         logger.error(f"Error retrieving conversations: {str(e)}")
@@ -144,6 +227,27 @@ def read_conversations(
             detail=f"Failed to retrieve conversations: {str(e)}"
         )
 
+@router.get("/search", response_model=MessageSearchPage)
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words or \"phrases\" to find; -word excludes"),
+    limit: int = Query(20, gt=0, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Search the current user's messages, best match first, with highlighted snippets."""
+    try:
+        return search_messages(db, current_user.id, q, limit, cursor)
+        
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except Exception as e:
+        logger.error(f"Error searching messages: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search messages: {str(e)}"
+        )
+
 @router.get("/suggested-peers", response_model=List[dict])
 def read_suggested_peers(
     limit: int = Query(5, gt=0, le=20),
@@ -160,4 +264,44 @@ def read_suggested_peers(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve suggested peers: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.websocket("/ws")
+async def messages_socket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Push new messages to the current user as they are sent, instead of polling.
+
+    Authenticates once with the `token` query parameter (browsers cannot set headers on
+    WebSockets), then sends one JSON event per message the user sends or receives:
+    {"type": "message", "message": {message_id, sender_id, recipient_id, body, timestamp}},
+    and one per read receipt in their conversations:
+    {"type": "read", "reader_id", "peer_id", "last_read_message_id", "unread_count"}.
+    """
+    user_id = await asyncio.to_thread(authenticate_socket, token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    logger.info(f"Message socket opened for user {user_id}")
+
+    async with message_hub.subscribe(user_id) as queue:
+        async def forward_events():
+            while True:
+                event = await queue.get()
+                if event.get("truncated"):
+                    # The same event object is shared by every socket of every recipient
+                    body = await asyncio.to_thread(load_message_body, event["message"]["message_id"])
+                    event = {"type": event["type"], "message": {**event["message"], "body": body}}
+                await websocket.send_json(event)
+
+        sender = asyncio.create_task(forward_events())
+        try:
+            # Nothing is expected from the client; reading just detects the disconnect
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            logger.info(f"Message socket closed for user {user_id}")
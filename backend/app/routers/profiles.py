@@ -6,6 +6,7 @@ import logging
 from app.utils.database import get_db
 from app.models import User, UserProfile, UserSkill
 from app.routes.user import get_current_user
+from app.services.system_prompts import system_prompt_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -152,6 +153,9 @@ def update_profile(
         db.refresh(profile)
         db.refresh(skills)
         
+        # Recompile the chat system prompt for the new profile version
+        system_prompt_cache.put(current_user.id, profile)
+        
         # Build response with combined data
         response = ProfileResponse.model_validate(profile)
         response.creativity = skills.creativity
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import Dict, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, selectinload, defer, load_only
+import numpy as np
+import base64
+import heapq
+import math
 import re
 import logging
 
@@ -11,11 +17,13 @@ logging.basicConfig(level=logging.INFO)
 from ..utils.database import get_db
 from app.routes.user import get_current_user
 from ..models import User, SavedRecommendation, UserNote, UserSkill
+from ..utils.oasis_cache import ROLE_SKILLS, COGNITIVE_TRAITS, TRAIT_COLUMNS
+from ..utils.skill_fit import SAVED_RECOMMENDATION_COLUMNS, SKILL_SCALE_MAX, fit_scores, saved_recommendation_matrix, to_vector
 from ..schemas.space import (
     SavedRecommendationCreate, SavedRecommendation as SavedRecommendationSchema,
     UserNoteCreate, UserNoteUpdate, UserNote as UserNoteSchema,
     UserSkillUpdate,
-    RecommendationWithNotes, SkillComparison, SkillsComparison, CognitiveTraits
+    RecommendationWithNotes, RecommendationSummary, RecommendationFit, SkillComparison, SkillsComparison, CognitiveTraits
 )
 
 router = APIRouter(
@@ -92,92 +100,195 @@ def create_saved_recommendation(
     
     return db_recommendation
 
-@router.get("/recommendations", response_model=List[RecommendationWithNotes])
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_cursor(value: Union[datetime, float], recommendation_id: int) -> str:
+    """
+    Opaque X-Next-Cursor for a page ending at (value, id): saved_at as epoch microseconds
+    or the fit score, URL-safe base64 so it can go in a query string unencoded.
+    """
+    if isinstance(value, datetime):
+        # saved_at is timestamptz; naive values (e.g. SQLite) are taken as UTC
+        aware = value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        value = (aware - EPOCH) // timedelta(microseconds=1)
+    raw = f"{value!r}|{recommendation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Union[datetime, float], int]:
+    """(sort value, id) of an X-Next-Cursor; raises ValueError if it is malformed."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    value, recommendation_id = raw.rsplit("|", 1)
+    if sort == "saved_at":
+        return EPOCH + timedelta(microseconds=int(value)), int(recommendation_id)
+    return float(value), int(recommendation_id)
+
+def parse_trait_values(values: List[str]) -> Dict[str, float]:
+    """{trait: value} from "trait:value" query parameters (skills or cognitive traits); raises ValueError."""
+    parsed = {}
+    for value in values:
+        trait, _, number = value.partition(":")
+        if trait not in TRAIT_COLUMNS:
+            raise ValueError(f"Unknown trait '{trait}'")
+        parsed[trait] = float(number)
+    return parsed
+
+def list_saved_recommendations(
+    db: Session,
+    user: User,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "saved_at",
+    label: Optional[str] = None,
+    trait_minimums: Optional[Dict[str, float]] = None,
+    summary: bool = False
+) -> Tuple[list, Optional[str]]:
+    """
+    One page of a user's saved recommendations and the cursor of the next one (None on
+    the last page; every match is returned when limit is None).
+
+    saved_at order (newest first) is a keyset range scan of the (user_id, saved_at, id)
+    index, so a page costs the same however many recommendations the user has saved.
+    fit order (best first, unrated last) cannot be served from an index: every page
+    reads the skill columns of all N matching rows, scores them in one vectorized pass
+    and picks the page past the cursor (O(N log limit)) before loading only the page's
+    rows. Both take a constant number of statements whatever N and the page size.
+    """
+    cursor_key = decode_cursor(cursor, sort) if cursor is not None else None
+    filters = [SavedRecommendation.user_id == user.id]
+    if label:
+        escaped = label.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        filters.append(SavedRecommendation.label.ilike(f"{escaped}%", escape="\\"))
+    for trait, minimum in (trait_minimums or {}).items():
+        column = f"role_{trait}" if trait in ROLE_SKILLS else trait
+        filters.append(getattr(SavedRecommendation, column) >= minimum)
+
+    # The user's side of every skill comparison is the same, so read it once
+    user_skills = db.query(UserSkill).filter(UserSkill.user_id == user.id).first()
+    user_skill_values = {skill: getattr(user_skills, skill) for skill in ROLE_SKILLS} if user_skills else {}
+    has_user_skills = any(value is not None for value in user_skill_values.values())
+
+    if summary:
+        # all_fields, descriptions and duties are the bulk of a row
+        options = [load_only(
+            SavedRecommendation.id, SavedRecommendation.oasis_code, SavedRecommendation.label,
+            SavedRecommendation.saved_at, *[getattr(SavedRecommendation, column) for column in SAVED_RECOMMENDATION_COLUMNS]
+        )]
+    else:
+        options = [
+            selectinload(SavedRecommendation.notes.and_(UserNote.user_id == user.id)),
+            defer(SavedRecommendation.all_fields)
+        ]
+
+    fit_by_id = None
+    if sort == "fit":
+        rows = db.query(
+            SavedRecommendation.id, *[getattr(SavedRecommendation, column) for column in SAVED_RECOMMENDATION_COLUMNS]
+        ).filter(*filters).all()
+        _, fit = fit_scores(to_vector(user_skill_values), saved_recommendation_matrix(rows))
+        # Unrated recommendations (no comparable skill) sort last
+        keys = zip(np.where(np.isnan(fit), -np.inf, fit).tolist(), [row.id for row in rows])
+        if cursor_key is not None:
+            keys = [key for key in keys if key < cursor_key]
+        page_keys = sorted(keys, reverse=True) if limit is None else heapq.nlargest(limit + 1, keys)
+        fit_by_id = {recommendation_id: score for score, recommendation_id in page_keys}
+        loaded = {
+            rec.id: rec
+            for rec in db.query(SavedRecommendation).options(*options).filter(
+                SavedRecommendation.id.in_(list(fit_by_id))
+            ).all()
+        } if page_keys else {}
+        recommendations = [loaded[recommendation_id] for _, recommendation_id in page_keys if recommendation_id in loaded]
+    else:
+        query = db.query(SavedRecommendation).options(*options).filter(*filters)
+        if cursor_key is not None:
+            query = query.filter(tuple_(SavedRecommendation.saved_at, SavedRecommendation.id) < tuple_(*cursor_key))
+        query = query.order_by(SavedRecommendation.saved_at.desc(), SavedRecommendation.id.desc())
+        recommendations = query.all() if limit is None else query.limit(limit + 1).all()
+
+    next_cursor = None
+    if limit is not None and len(recommendations) > limit:
+        recommendations = recommendations[:limit]
+        last = recommendations[-1]
+        next_cursor = encode_cursor(fit_by_id[last.id] if sort == "fit" else last.saved_at, last.id)
+
+    if summary:
+        if fit_by_id is None:
+            _, fit = fit_scores(to_vector(user_skill_values), saved_recommendation_matrix(recommendations))
+            fit_by_id = {rec.id: score for rec, score in zip(recommendations, fit.tolist())}
+        items = [
+            RecommendationSummary(
+                id=rec.id,
+                oasis_code=rec.oasis_code,
+                label=rec.label,
+                saved_at=rec.saved_at,
+                fit_score=round(fit_by_id[rec.id], 4) if np.isfinite(fit_by_id[rec.id]) else None
+            )
+            for rec in recommendations
+        ]
+    else:
+        items = [build_recommendation_with_notes(rec, user_skill_values, has_user_skills) for rec in recommendations]
+
+    logger.info(f"Returning {len(items)} saved recommendations for user {user.id} (sort={sort}, summary={summary})")
+    return items, next_cursor
+
+def build_recommendation_with_notes(rec, user_skill_values: Dict[str, Optional[float]], has_user_skills: bool):
+    skill_comparison = None
+    if has_user_skills:
+        skill_comparison = SkillsComparison(**{
+            skill: SkillComparison(user_skill=user_skill_values[skill], role_skill=getattr(rec, f"role_{skill}"))
+            for skill in ROLE_SKILLS
+        })
+    
+    return RecommendationWithNotes(
+        id=rec.id,
+        user_id=rec.user_id,
+        oasis_code=rec.oasis_code,
+        label=rec.label,
+        description=rec.description,
+        main_duties=rec.main_duties,
+        role_creativity=rec.role_creativity,
+        role_leadership=rec.role_leadership,
+        role_digital_literacy=rec.role_digital_literacy,
+        role_critical_thinking=rec.role_critical_thinking,
+        role_problem_solving=rec.role_problem_solving,
+        saved_at=rec.saved_at,
+        notes=rec.notes,
+        skill_comparison=skill_comparison,
+        cognitive_traits=CognitiveTraits(**{trait: getattr(rec, trait) for trait in COGNITIVE_TRAITS})
+    )
+
+@router.get(
+    "/recommendations",
+    response_model=Union[List[RecommendationWithNotes], List[RecommendationSummary]]
+)
 def get_saved_recommendations(
+    response: Response,
+    limit: Optional[int] = Query(None, gt=0, le=100, description="Page size; omit to get every saved recommendation"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    sort: str = Query("saved_at", pattern="^(saved_at|fit)$", description="saved_at (newest first) or fit (best first)"),
+    label: Optional[str] = Query(None, max_length=100, description="Only labels starting with this, case-insensitive"),
+    trait_min: List[str] = Query([], description='Minimum role skill or trait, as "trait:minimum"; repeatable'),
+    summary: bool = Query(False, description="Only id, code, label, saved_at and fit score"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get user's saved recommendations
-    recommendations = db.query(SavedRecommendation).filter(
-        SavedRecommendation.user_id == current_user.id
-    ).all()
-    
-    logger.info(f"Found {len(recommendations)} recommendations for user {current_user.id}")
-    
-    # Get the user's skills from UserSkill table
-    user_skills = db.query(UserSkill).filter(UserSkill.user_id == current_user.id).first()
-    
-    result = []
-    for rec in recommendations:
-        # Get notes for this recommendation
-        notes = db.query(UserNote).filter(
-            UserNote.user_id == current_user.id,
-            UserNote.saved_recommendation_id == rec.id
-        ).all()
-        
-        # Build skill comparison if both user and role skills are available
-        skill_comparison = None
-        if user_skills and (user_skills.creativity is not None or user_skills.leadership is not None or \
-           user_skills.digital_literacy is not None or user_skills.critical_thinking is not None or \
-           user_skills.problem_solving is not None):
-            
-            # Log user skills
-            logger.info(f"User skills: creativity={user_skills.creativity}, leadership={user_skills.leadership}, "
-                       f"digital_literacy={user_skills.digital_literacy}, critical_thinking={user_skills.critical_thinking}, "
-                       f"problem_solving={user_skills.problem_solving}")
-            
-            # Build comparison dict
-            comparison = {}
-            for skill in ["creativity", "leadership", "digital_literacy", "critical_thinking", "problem_solving"]:
-                role_skill_name = f"role_{skill}"
-                
-                comparison[skill] = SkillComparison(
-                    user_skill=getattr(user_skills, skill),
-                    role_skill=getattr(rec, role_skill_name)
-                )
-            
-            skill_comparison = SkillsComparison(**comparison)
-            logger.info(f"Created skill comparison for recommendation {rec.id}")
-        else:
-            logger.info(f"User has no skills set, cannot create skill comparison")
-        
-        # Create cognitive traits object
-        cognitive_traits = CognitiveTraits(
-            analytical_thinking=rec.analytical_thinking,
-            attention_to_detail=rec.attention_to_detail,
-            collaboration=rec.collaboration,
-            adaptability=rec.adaptability,
-            independence=rec.independence,
-            evaluation=rec.evaluation,
-            decision_making=rec.decision_making,
-            stress_tolerance=rec.stress_tolerance
+    """
+    The current user's saved recommendations. With `limit`, returns one page and, if
+    there are more, the cursor of the next page in the X-Next-Cursor header.
+    """
+    try:
+        items, next_cursor = list_saved_recommendations(
+            db, current_user, limit, cursor, sort, label, parse_trait_values(trait_min), summary
         )
-        
-        # Create recommendation with notes
-        recommendation_with_notes = RecommendationWithNotes(
-            id=rec.id,
-            user_id=rec.user_id,
-            oasis_code=rec.oasis_code,
-            label=rec.label,
-            description=rec.description,
-            main_duties=rec.main_duties,
-            role_creativity=rec.role_creativity,
-            role_leadership=rec.role_leadership,
-            role_digital_literacy=rec.role_digital_literacy,
-            role_critical_thinking=rec.role_critical_thinking,
-            role_problem_solving=rec.role_problem_solving,
-            saved_at=rec.saved_at,
-            notes=notes,
-            skill_comparison=skill_comparison,
-            cognitive_traits=cognitive_traits
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor or trait filter: {str(e)}"
         )
-        
-        # Log the complete structure
-        logger.info(f"Added recommendation: id={rec.id}, label={rec.label}, has_skill_comparison={skill_comparison is not None}")
-        
-        result.append(recommendation_with_notes)
     
-    return result
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @router.delete("/recommendations/{recommendation_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_saved_recommendation(
@@ -339,6 +450,71 @@ def update_user_skills(
     )
 
 # ===== Special Endpoints =====
+@router.get("/recommendations/ranking", response_model=List[RecommendationFit])
+def rank_saved_recommendations(
+    trait: List[str] = Query(
+        [],
+        description='Cognitive trait preference (or skill override), as "trait:value" on the 0-5 scale; repeatable'
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Every saved recommendation ranked by fit with the student, best first, with per-skill
+    gaps: the five role skills against the student's UserSkill and the eight cognitive
+    traits against any `trait` preferences, scored in one vectorized pass. Replaces one
+    skill-comparison call per saved recommendation.
+    """
+    user_skill = db.query(UserSkill).filter(UserSkill.user_id == current_user.id).first()
+    profile = {
+        skill: getattr(user_skill, skill)
+        for skill in ROLE_SKILLS
+        if user_skill and getattr(user_skill, skill) is not None
+    }
+    try:
+        preferences = parse_trait_values(trait)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid trait: {str(e)}")
+    if any(not 0 <= value <= SKILL_SCALE_MAX for value in preferences.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Trait values must be between 0 and 5")
+    profile.update(preferences)
+    
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Set at least one skill or cognitive trait to rank recommendations"
+        )
+    
+    rows = db.query(
+        SavedRecommendation.id, SavedRecommendation.oasis_code, SavedRecommendation.label,
+        *[getattr(SavedRecommendation, column) for column in SAVED_RECOMMENDATION_COLUMNS]
+    ).filter(
+        SavedRecommendation.user_id == current_user.id
+    ).order_by(SavedRecommendation.id).all()
+    
+    gaps, fit = fit_scores(to_vector(profile), saved_recommendation_matrix(rows))
+    # Best first; recommendations with nothing to compare go last, oldest saved first on ties
+    order = np.argsort(-np.where(np.isnan(fit), -np.inf, fit), kind="stable")
+    rounded_gaps = np.round(gaps.astype(np.float64), 2).tolist()
+    rounded_fit = np.round(fit.astype(np.float64), 4).tolist()
+    
+    ranking = []
+    for row in order.tolist():
+        ranking.append(RecommendationFit(
+            id=rows[row].id,
+            oasis_code=rows[row].oasis_code,
+            label=rows[row].label,
+            fit_score=None if np.isnan(fit[row]) else rounded_fit[row],
+            skill_gaps={
+                trait_name: gap
+                for trait_name, gap in zip(TRAIT_COLUMNS, rounded_gaps[row])
+                if not math.isnan(gap)
+            }
+        ))
+    
+    logger.info(f"Ranked {len(ranking)} saved recommendations for user {current_user.id}")
+    return ranking
+
 @router.get("/recommendations/{oasis_code}/skill-comparison", response_model=SkillsComparison)
 def get_skill_comparison(
     oasis_code: str,
@@ -364,7 +540,7 @@ def get_skill_comparison(
     
     # Build comparison
     comparison = {}
-    for skill in ["creativity", "leadership", "digital_literacy", "critical_thinking", "problem_solving"]:
+    for skill in ROLE_SKILLS:
         role_skill_name = f"role_{skill}"
         comparison[skill] = SkillComparison(
             user_skill=getattr(user_skill, skill),
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
+import asyncio
+import json
 import os
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from app.routes.user import get_current_user
-from app.models import User, UserProfile
+from app.models import User
 from sqlalchemy.orm import Session
-from app.utils.database import get_db
+from app.utils.database import get_db, SessionLocal
+from app.services.chat_history import ChatHistoryStore, MemoryHistoryBackend, PostgresHistoryBackend
+from app.services.system_prompts import get_system_prompt
+from app.services.chat_context import fit_window, join_summary, split_summary
+from app.services.llm_gate import LLMGate, QueueFullError
+from app.services.loop_monitor import EventLoopLagMonitor
+from app.services.occupation_context import OccupationRetriever
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -28,12 +37,86 @@ if not api_key:
 
 logger.info(f"OpenAI API Key exists and starts with: {api_key[:5]}...")
 
-client = OpenAI(
+# OPENAI_BASE_URL points the client at any OpenAI-compatible server, e.g. the local
+# stand-in in scripts/llm_stub_server.py for load tests
+base_url = os.getenv("OPENAI_BASE_URL") or None
+if base_url:
+    logger.info(f"Using OpenAI-compatible endpoint at {base_url}")
+
+# Async client so in-flight completions never block the event loop
+client = AsyncOpenAI(
     api_key=api_key,
+    base_url=base_url,
+)
+
+CHAT_MODEL = "gpt-3.5-turbo"
+COMPLETION_PARAMS = {
+    "max_tokens": 30,
+    "temperature": 0.8,  # Slightly higher temperature for more creative responses
+    "presence_penalty": 0.6,  # Encourage more diverse responses
+    "frequency_penalty": 0.3,  # Reduce repetition while maintaining coherence
+}
+
+# Admission control for upstream completions, per worker: a concurrency limit with fair
+# per-user queueing, a token bucket sized to the provider quota (split the quota across
+# workers) and fast 429s once the queue is too deep
+llm_gate = LLMGate(
+    max_concurrent=int(os.getenv("CHAT_MAX_CONCURRENT_COMPLETIONS", "16")),
+    requests_per_minute=float(os.getenv("CHAT_RATE_LIMIT_RPM", "500")),
+    burst=int(os.getenv("CHAT_RATE_LIMIT_BURST", "16")),
+    max_queue_depth=int(os.getenv("CHAT_MAX_QUEUE_DEPTH", "100")),
+    max_queued_per_user=int(os.getenv("CHAT_MAX_QUEUED_PER_USER", "4")),
+)
+
+# Tokens of conversation sent with each completion; older turns are folded into a
+# rolling summary by a background task instead of being sent verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1200"))
+SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "200"))
+# Hard cap on stored turns in case summarisation keeps failing
+MAX_STORED_TURNS = 50
+
+SUMMARY_PROMPT = """You maintain a running summary of a mentoring conversation between a student and a Socratic mentor.
+Merge the new turns into the current summary. Keep the student's goals, interests, values, concerns and any decisions or insights they reached.
+Write in the third person, as short factual notes, in under 150 words."""
+
+# In-flight background summarisations, keyed by user
+summary_tasks: Dict[int, asyncio.Task] = {}
+
+# OaSIS occupations relevant to the latest message, retrieved alongside history loading
+occupation_retriever = OccupationRetriever(
+    top_k=int(os.getenv("CHAT_RAG_TOP_K", "3")),
+    budget_seconds=float(os.getenv("CHAT_RAG_BUDGET_MS", "20")) / 1000.0,
+)
+
+# Conversation history: a bounded per-worker cache in front of the chat_histories table.
+# CHAT_HISTORY_BACKEND=memory keeps it process-local (single worker, lost on restart).
+history_backend = (
+    MemoryHistoryBackend()
+    if os.getenv("CHAT_HISTORY_BACKEND", "postgres") == "memory"
+    else PostgresHistoryBackend(SessionLocal)
 )
+history_store = ChatHistoryStore(
+    history_backend,
+    max_sessions=int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "5000")),
+    max_bytes=int(os.getenv("CHAT_HISTORY_MAX_BYTES", str(64 * 1024 * 1024))),
+    idle_ttl=float(os.getenv("CHAT_HISTORY_IDLE_TTL_SECONDS", "1800")),
+    flush_interval=float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL_SECONDS", "0.5")),
+)
+
+loop_monitor = EventLoopLagMonitor()
+
+@router.on_event("startup")
+async def start_history_store():
+    await history_store.start()
+    await loop_monitor.start()
 
-# In-memory conversation history (in a production app, this should be stored in a database)
-conversation_history: Dict[int, List[Dict[str, str]]] = {}
+@router.on_event("shutdown")
+async def stop_history_store():
+    await loop_monitor.stop()
+    for task in list(summary_tasks.values()):
+        task.cancel()
+    # Persist whatever is still waiting for the write-behind flush
+    await history_store.stop()
 
 class MessageRequest(BaseModel):
     text: str
@@ -46,20 +129,131 @@ class ClearHistoryResponse(BaseModel):
     success: bool
     message: str
 
-SYSTEM_PROMPT = """You are a Socratic mentor engaging the student in a "game" of problem-solving. Your role is to:
+def build_prompt(
+    user_id: int,
+    summary: Optional[str],
+    turns: List[Dict[str, str]],
+    db: Session,
+    occupation_context: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Messages for a completion: the user's cached system prompt (plus the rolling summary of
+    older turns and any retrieved occupations) followed by the newest turns that fit in
+    HISTORY_TOKEN_BUDGET.
+    """
+    system_message = get_system_prompt(user_id, db)
+    if summary:
+        system_message = f"{system_message}\n\nSummary of the earlier conversation:\n{summary}"
+    if occupation_context:
+        system_message = f"{system_message}\n\n{occupation_context}"
+    _, window = fit_window(turns, HISTORY_TOKEN_BUDGET, CHAT_MODEL)
+    return [{"role": "system", "content": system_message}, *window]
+
+def parse_history(history: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    A stored history as (rolling summary, conversation turns). The system prompt is not
+    stored with them; histories written before that change start with one, which is dropped here.
+    """
+    if history and history[0]["role"] == "system":
+        history = history[1:]
+    return split_summary(history)
+
+async def load_history(user_id: int) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    return parse_history(await history_store.get(user_id) or [])
+
+async def update_history(
+    user_id: int,
+    change: Callable[[Optional[str], List[Dict[str, str]]], Tuple[Optional[str], List[Dict[str, str]]]]
+) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    Apply change(summary, turns) -> (summary, turns) to the user's history and return the
+    result. The store re-applies it if another worker saves this user's history first.
+    """
+    def apply(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        summary, turns = change(*parse_history(history))
+        return join_summary(summary, turns[-MAX_STORED_TURNS:])
+    return parse_history(await history_store.update(user_id, apply))
+
+async def append_user_message(user_id: int, text: str) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """Add the student's message to their history and return (summary, turns so far)."""
+    return await update_history(user_id, lambda summary, turns: (summary, [*turns, {"role": "user", "content": text}]))
+
+async def append_assistant_message(user_id: int, text: str) -> None:
+    """Add the assistant's reply, summarising older turns once they outgrow the token budget."""
+    _, turns = await update_history(
+        user_id, lambda summary, turns: (summary, [*turns, {"role": "assistant", "content": text}])
+    )
+    overflow, _ = fit_window(turns, HISTORY_TOKEN_BUDGET, CHAT_MODEL)
+    if overflow:
+        schedule_summary(user_id)
+
+async def discard_user_message(user_id: int) -> None:
+    """Drop a trailing user message that never got a reply, keeping turns paired."""
+    def discard(summary, turns):
+        if turns and turns[-1]["role"] == "user":
+            return summary, turns[:-1]
+        return summary, turns
+    await update_history(user_id, discard)
+
+def schedule_summary(user_id: int) -> None:
+    """Summarise a user's overflowing turns in the background; at most one task per user."""
+    task = summary_tasks.get(user_id)
+    if task is not None and not task.done():
+        return
+    task = asyncio.create_task(summarize_overflow(user_id))
+    summary_tasks[user_id] = task
+    task.add_done_callback(lambda _: summary_tasks.pop(user_id, None))
+
+async def summarize_overflow(user_id: int) -> None:
+    """Fold the turns that no longer fit the token budget into the rolling summary."""
+    try:
+        summary, turns = await load_history(user_id)
+        overflow, _ = fit_window(turns, HISTORY_TOKEN_BUDGET, CHAT_MODEL)
+        if not overflow:
+            return
+
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in overflow)
+        async with llm_gate.slot(user_id):
+            response = await client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {
+                        "role": "user",
+                        "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
+                    },
+                ],
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.3,
+            )
+        new_summary = response.choices[0].message.content.strip()
+
+        # The history may have moved on (or been cleared) while the summary was generated
+        folded = []
+        def fold(current_summary, current_turns):
+            if current_summary != summary or current_turns[:len(overflow)] != overflow:
+                return current_summary, current_turns
+            folded.append(True)
+            return new_summary, current_turns[len(overflow):]
+        await update_history(user_id, fold)
+        if not folded:
+            logger.info(f"History changed during summarisation for user {user_id}, discarding summary")
+            return
+        logger.info(f"Summarised {len(overflow)} turns for user {user_id}")
+    except Exception as e:
+        logger.error(f"Failed to summarise chat history for user {user_id}: {str(e)}")
 
-1. Ask clarifying, guiding questions to help the student reflect, articulate their thoughts, and explore what truly motivates them.
-2. Encourage them to discover their own goals and values through questioning and gentle nudges, rather than providing direct answers upfront.
-3. Ensure the student thinks deeply and reflects on their options.
-4. Help them progress toward self-defined objectives while feeling supported and validated.
-5. Use the Socratic method: ask open-ended questions that challenge assumptions and promote critical thinking.
-6. Acknowledge and validate their thoughts and feelings while gently pushing them to explore deeper.
-7. When they express a goal or interest, ask them to elaborate on why it matters to them.
-8. Help them identify patterns in their thinking and interests.
-9. Use their personal preferences (favorite movies, books, celebrities) to create relatable examples and analogies.
-10. Consider their learning style when suggesting approaches or activities.
+def queue_full_response(error: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=error.reason,
+        headers={"Retry-After": str(error.retry_after)}
+    )
 
-Remember: Your goal is not to give answers, but to help them discover their own path through thoughtful questioning."""
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 @router.post("/send", response_model=MessageResponse)
 async def send_message(
@@ -67,94 +261,49 @@ async def send_message(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    try:
+        # Reject before touching history when the LLM queue is already saturated
+        llm_gate.check(current_user.id)
+    except QueueFullError as e:
+        raise queue_full_response(e)
+
     try:
         logger.info(f"Received message from user {current_user.id}: {message.text}")
-        
-        # Get user's profile information
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        
-        # Initialize conversation history for this user if it doesn't exist yet
         user_id = current_user.id
-        if user_id not in conversation_history:
-            logger.info(f"Initializing conversation history for user {user_id}")
-            
-            # Create initial system message with user profile context
-            system_message = SYSTEM_PROMPT
-            if profile:
-                system_message += f"\n\nUser Profile Information:\n"
-                if profile.name:
-                    system_message += f"- Name: {profile.name}\n"
-                if profile.age:
-                    system_message += f"- Age: {profile.age}\n"
-                if profile.sex:
-                    system_message += f"- Sex: {profile.sex}\n"
-                if profile.major:
-                    system_message += f"- Major: {profile.major}\n"
-                if profile.year:
-                    system_message += f"- Year: {profile.year}\n"
-                if profile.gpa:
-                    system_message += f"- GPA: {profile.gpa}\n"
-                if profile.hobbies:
-                    system_message += f"- Hobbies: {profile.hobbies}\n"
-                if profile.country:
-                    system_message += f"- Country: {profile.country}\n"
-                if profile.state_province:
-                    system_message += f"- State/Province: {profile.state_province}\n"
-                if profile.unique_quality:
-                    system_message += f"- Unique Quality: {profile.unique_quality}\n"
-                if profile.story:
-                    system_message += f"- Personal Story: {profile.story}\n"
-                if profile.favorite_movie:
-                    system_message += f"- Favorite Movie: {profile.favorite_movie}\n"
-                if profile.favorite_book:
-                    system_message += f"- Favorite Book: {profile.favorite_book}\n"
-                if profile.favorite_celebrities:
-                    system_message += f"- Role Models: {profile.favorite_celebrities}\n"
-                if profile.learning_style:
-                    system_message += f"- Learning Style: {profile.learning_style}\n"
-                if profile.interests:
-                    system_message += f"- Interests: {profile.interests}\n"
-            
-            conversation_history[user_id] = [
-                {"role": "system", "content": system_message}
-            ]
-        
-        # Add the new user message to history
-        conversation_history[user_id].append({"role": "user", "content": message.text})
+        (summary, turns), occupation_context = await asyncio.gather(
+            append_user_message(user_id, message.text),
+            occupation_retriever.retrieve(user_id, message.text)
+        )
+        messages = build_prompt(user_id, summary, turns, db, occupation_context)
         
         logger.info("Calling OpenAI API...")
         try:
-            # Call OpenAI API with the entire conversation history
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=conversation_history[user_id],
-                max_tokens=30,
-                temperature=0.8,  # Slightly higher temperature for more creative responses
-                presence_penalty=0.6,  # Encourage more diverse responses
-                frequency_penalty=0.3,  # Reduce repetition while maintaining coherence
-            )
+            # Call OpenAI API with the system prompt and the recent conversation window
+            async with llm_gate.slot(user_id):
+                response = await client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    **COMPLETION_PARAMS
+                )
             
             # Extract the assistant's response
             assistant_response = response.choices[0].message.content
             logger.info(f"Received response from OpenAI: {assistant_response[:50]}...")
+        except QueueFullError as e:
+            await discard_user_message(user_id)
+            raise queue_full_response(e)
         except Exception as openai_error:
             logger.error(f"OpenAI API error: {str(openai_error)}")
+            await discard_user_message(user_id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"OpenAI API error: {str(openai_error)}"
             )
         
-        # Add assistant response to history
-        conversation_history[user_id].append({"role": "assistant", "content": assistant_response})
-        
-        # Limit conversation history to the last 10 messages to avoid token limits
-        if len(conversation_history[user_id]) > 11:  # 1 system message + 10 conversation messages
-            conversation_history[user_id] = [
-                conversation_history[user_id][0],  # Keep the system message
-                *conversation_history[user_id][-10:]  # Keep the 10 most recent messages
-            ]
-        
+        await append_assistant_message(user_id, assistant_response)
         return MessageResponse(text=assistant_response)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in send_message: {str(e)}")
         raise HTTPException(
@@ -162,16 +311,95 @@ async def send_message(
             detail=f"Failed to get response from AI service: {str(e)}"
         )
 
+@router.post("/send/stream")
+async def send_message_stream(
+    message: MessageRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the assistant's reply as server-sent events: one `data: {"text": ...}` event
+    per token chunk, then `event: done` with the full reply (or `event: error`).
+    The upstream completion is cancelled as soon as the client disconnects.
+    """
+    try:
+        llm_gate.check(current_user.id)
+    except QueueFullError as e:
+        raise queue_full_response(e)
+
+    logger.info(f"Received streaming message from user {current_user.id}: {message.text}")
+    user_id = current_user.id
+
+    async def event_stream() -> AsyncIterator[str]:
+        reply_parts: List[str] = []
+        stream = None
+        try:
+            async with llm_gate.slot(user_id):
+                stream = await client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    stream=True,
+                    **COMPLETION_PARAMS
+                )
+                async for chunk in stream:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected, cancelling completion for user {user_id}")
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        reply_parts.append(delta)
+                        yield sse_event({"text": delta})
+            
+            if reply_parts:
+                await append_assistant_message(user_id, "".join(reply_parts))
+                yield sse_event({"text": "".join(reply_parts)}, event="done")
+            else:
+                await discard_user_message(user_id)
+        except asyncio.CancelledError:
+            # Starlette cancels the response task when the client goes away mid-stream
+            logger.info(f"Streaming cancelled for user {user_id}")
+            if reply_parts:
+                await append_assistant_message(user_id, "".join(reply_parts))
+            else:
+                await discard_user_message(user_id)
+            raise
+        except QueueFullError as e:
+            await discard_user_message(user_id)
+            yield sse_event({"detail": e.reason, "retry_after": e.retry_after}, event="error")
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {str(e)}")
+            await discard_user_message(user_id)
+            yield sse_event({"detail": f"OpenAI API error: {str(e)}"}, event="error")
+        finally:
+            if stream is not None:
+                # Close the upstream HTTP stream so the provider stops generating
+                await stream.response.aclose()
+
+    try:
+        (summary, turns), occupation_context = await asyncio.gather(
+            append_user_message(user_id, message.text),
+            occupation_retriever.retrieve(user_id, message.text)
+        )
+        messages = build_prompt(user_id, summary, turns, db, occupation_context)
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except Exception as e:
+        # Nothing will answer the message, so take it back out as /send does
+        logger.error(f"Error in send_message_stream: {str(e)}")
+        await discard_user_message(user_id)
+        raise
+
 @router.post("/clear", response_model=ClearHistoryResponse)
 async def clear_history(current_user: User = Depends(get_current_user)):
     try:
         user_id = current_user.id
         logger.info(f"Clearing chat history for user {user_id}")
-        if user_id in conversation_history:
-            # Reset to just the system message
-            conversation_history[user_id] = [
-                {"role": "system", "content": SYSTEM_PROMPT}
-            ]
+        await history_store.set(user_id, [])
+        occupation_retriever.forget(user_id)
         
         return ClearHistoryResponse(
             success=True,
@@ -182,4 +410,18 @@ async def clear_history(current_user: User = Depends(get_current_user)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to clear conversation history: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.get("/metrics")
+async def chat_metrics(current_user: User = Depends(get_current_user)):
+    """
+    LLM queue depth, wait times and rejections for this worker, plus history cache usage.
+    Aggregate counts only: nothing here identifies a user or their conversation.
+    """
+    return {
+        "llm": llm_gate.metrics(),
+        "event_loop": loop_monitor.metrics(),
+        "history": history_store.stats(),
+        "summaries_in_flight": len(summary_tasks),
+        "retrieval": {"enabled": occupation_retriever.enabled, **occupation_retriever.stats},
+    }
@@ -1,18 +1,24 @@
 import os
 import openai
 from pinecone import Pinecone
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from dotenv import load_dotenv
 import logging
-from ..models import SavedRecommendation
+from ..models import SavedRecommendation, UserSkill
 from ..routes.user import get_current_user
-from ..schemas.space import SavedRecommendationCreate
+from ..schemas.space import SavedRecommendationCreate, UserSkillBase, CognitiveTraits
 from ..utils.database import get_db
+from ..utils.oasis_index import INDEX_NAME, get_active_namespace
+from ..utils.oasis_cache import ROLE_SKILLS, TRAIT_COLUMNS, load_oasis_table
+from ..utils.skill_fit import fit_scores, to_vector, top_k
+from ..utils.oasis_graph import SIMILARITY_GRAPH, load_graph, load_skill_gap_graph, shortest_path
 from sqlalchemy.orm import Session
 import re
-from typing import List, Optional, Dict
+import numpy as np
+from functools import lru_cache
+from typing import List, Optional, Dict, Tuple
 
 
 # Configure logging
@@ -40,11 +46,9 @@ def get_pinecone_index():
         if not pinecone_environment:
             raise ValueError("PINECONE_ENVIRONMENT environment variable is not set")
             
-        index_name = "oasis-minilm-index"
-        
         logger.info(f"Initializing Pinecone with environment: {pinecone_environment}")
         pc = Pinecone(api_key=pinecone_api_key)
-        index = pc.Index(index_name)
+        index = pc.Index(INDEX_NAME)
         return index
     except Exception as e:
         logger.error(f"Error initializing Pinecone: {e}")
@@ -135,6 +139,44 @@ class SearchRequest(BaseModel):
     query: str
     top_k: Optional[int] = 5
 
+class SimilarOccupation(BaseModel):
+    oasis_code: str
+    label: str
+    score: float
+
+class SimilarOccupationsResponse(BaseModel):
+    oasis_code: str
+    label: str
+    similar: List[SimilarOccupation]
+
+class CareerPathStep(BaseModel):
+    oasis_code: str
+    label: str
+    step_distance: float
+    trait_changes: Dict[str, float] = {}
+
+class CareerPathResponse(BaseModel):
+    from_code: str
+    to_code: str
+    total_distance: float
+    steps: List[CareerPathStep]
+
+class SkillMatchRequest(BaseModel):
+    # Slider values override the saved UserSkill record; cognitive traits are optional preferences
+    skills: Optional[UserSkillBase] = None
+    cognitive_traits: Optional[CognitiveTraits] = None
+    top_k: int = Field(10, gt=0, le=100)
+
+class OccupationMatch(BaseModel):
+    oasis_code: str
+    label: str
+    fit_score: float
+    skill_gaps: Dict[str, float] = {}
+
+class SkillMatchResponse(BaseModel):
+    profile: Dict[str, float]
+    matches: List[OccupationMatch]
+
 @router.post("/search", response_model=SearchResponse)
 async def search_embeddings(request: SearchRequest):
     """
@@ -154,10 +196,10 @@ async def search_embeddings(request: SearchRequest):
             "top_k": request.top_k
         }
         
-        # Query Pinecone using integrated embeddings
+        # Query Pinecone using integrated embeddings, against the live index version
         try:
             pinecone_response = index.search(
-                namespace="", 
+                namespace=get_active_namespace(),
                 query=query_payload
             )
             logger.info("Received response from Pinecone")
@@ -332,6 +374,170 @@ async def save_search_result(
         logger.error(f"Error saving recommendation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error saving recommendation: {str(e)}")
 
+@router.get("/similar/{oasis_code}", response_model=SimilarOccupationsResponse)
+async def get_similar_occupations(
+    oasis_code: str,
+    limit: int = Query(10, gt=0, le=50)
+):
+    """
+    Return the occupations most similar to oasis_code, read from the precomputed kNN graph
+    (built by scripts/build_oasis_graph.py) without querying the vector index
+    """
+    try:
+        graph = load_graph(SIMILARITY_GRAPH)
+    except FileNotFoundError as e:
+        logger.error(f"Similarity graph not available: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Occupation similarity graph has not been built"
+        )
+
+    node = graph.index_of(oasis_code)
+    if node is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown OaSIS code: {oasis_code}"
+        )
+
+    neighbors, scores = graph.neighbors(node)
+    similar = [
+        SimilarOccupation(
+            oasis_code=str(graph.codes[neighbor]),
+            label=str(graph.labels[neighbor]),
+            score=float(score)
+        )
+        for neighbor, score in zip(neighbors[:limit], scores[:limit])
+    ]
+    return SimilarOccupationsResponse(
+        oasis_code=oasis_code,
+        label=str(graph.labels[node]),
+        similar=similar
+    )
+
+@lru_cache(maxsize=1024)
+def find_career_path(source: int, target: int) -> Optional[Tuple[float, Tuple[int, ...]]]:
+    """Shortest skill-gap route between two graph nodes, LRU-cached for popular routes."""
+    route = shortest_path(load_skill_gap_graph(), source, target)
+    if route is None:
+        return None
+    cost, path = route
+    return cost, tuple(path)
+
+@router.get("/career-path", response_model=CareerPathResponse)
+async def get_career_path(
+    from_code: str = Query(..., description="OaSIS code of the current occupation"),
+    to_code: str = Query(..., description="OaSIS code of the target occupation")
+):
+    """
+    Find the sequence of occupations leading from one OaSIS occupation to another in small
+    skill steps, using A* over the in-memory skill-gap graph
+    """
+    try:
+        graph = load_skill_gap_graph()
+    except FileNotFoundError as e:
+        logger.error(f"OaSIS cache not available: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OaSIS occupation data has not been cached"
+        )
+
+    source = graph.index_of(from_code)
+    target = graph.index_of(to_code)
+    if source is None or target is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown OaSIS code: {from_code if source is None else to_code}"
+        )
+
+    route = find_career_path(source, target)
+    if route is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No career path from {from_code} to {to_code}"
+        )
+
+    total_distance, path = route
+    steps = []
+    for previous, node in zip((None,) + path[:-1], path):
+        changes = {}
+        step_distance = 0.0
+        if previous is not None:
+            delta = graph.vectors[node] - graph.vectors[previous]
+            step_distance = float(np.linalg.norm(delta))
+            changes = {
+                trait: round(float(value), 2)
+                for trait, value in zip(TRAIT_COLUMNS, delta)
+                if abs(value) >= 0.01
+            }
+        steps.append(CareerPathStep(
+            oasis_code=str(graph.codes[node]),
+            label=str(graph.labels[node]),
+            step_distance=step_distance,
+            trait_changes=changes
+        ))
+
+    return CareerPathResponse(
+        from_code=from_code,
+        to_code=to_code,
+        total_distance=float(total_distance),
+        steps=steps
+    )
+
+@router.post("/match", response_model=SkillMatchResponse)
+def match_occupations(
+    request: SkillMatchRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Rank every OaSIS occupation by fit with the student's skills (and optional cognitive
+    trait preferences) in one vectorized pass over the cached occupation trait matrix
+    """
+    try:
+        codes, labels, matrix = load_oasis_table().occupation_traits()
+    except FileNotFoundError as e:
+        logger.error(f"OaSIS cache not available: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OaSIS occupation data has not been cached"
+        )
+
+    profile = {}
+    if request.skills is not None:
+        profile.update(request.skills.model_dump(exclude_none=True))
+    else:
+        user_skill = db.query(UserSkill).filter(UserSkill.user_id == current_user.id).first()
+        if user_skill:
+            profile.update({
+                skill: getattr(user_skill, skill)
+                for skill in ROLE_SKILLS
+                if getattr(user_skill, skill) is not None
+            })
+    if request.cognitive_traits is not None:
+        profile.update(request.cognitive_traits.model_dump(exclude_none=True))
+
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Set at least one skill or cognitive trait to match occupations"
+        )
+
+    gaps, fit = fit_scores(to_vector(profile), matrix)
+    matches = []
+    for row in top_k(fit, request.top_k):
+        matches.append(OccupationMatch(
+            oasis_code=str(codes[row]),
+            label=str(labels[row]),
+            fit_score=round(float(fit[row]), 4),
+            skill_gaps={
+                trait: round(float(gap), 2)
+                for trait, gap in zip(TRAIT_COLUMNS, gaps[row])
+                if not np.isnan(gap)
+            }
+        ))
+
+    return SkillMatchResponse(profile=profile, matches=matches)
+
 @router.get("/health")
 async def health_check():
     """
@@ -339,12 +545,17 @@ async def health_check():
     """
     try:
         logger.info("Checking Pinecone health...")
+        index = get_pinecone_index()
+        namespace = get_active_namespace()
         stats = index.describe_index_stats()
         vector_count = stats.get("total_vector_count", 0)
+        namespace_summary = stats.namespaces.get(namespace) if stats.namespaces else None
         logger.info(f"Pinecone index contains {vector_count} vectors")
         return {
             "status": "healthy",
-            "vector_count": vector_count
+            "vector_count": vector_count,
+            "namespace": namespace,
+            "namespace_vector_count": namespace_summary.vector_count if namespace_summary else 0
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}", exc_info=True)
@@ -97,4 +97,21 @@ class RecommendationWithNotes(SavedRecommendation):
     cognitive_traits: Optional[CognitiveTraits] = None
     class Config:
         orm_mode = True
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class RecommendationSummary(BaseModel):
+    # Lightweight listing entry: no notes, traits or skill comparison
+    id: int
+    oasis_code: str
+    label: str
+    saved_at: datetime
+    fit_score: Optional[float] = None
+
+class RecommendationFit(BaseModel):
+    id: int
+    oasis_code: str
+    label: str
+    # 1 - RMS gap / 5 over the dimensions rated on both sides; None if there are none
+    fit_score: Optional[float] = None
+    # Role value minus the student's, per compared skill or trait (positive: the role asks for more)
+    skill_gaps: Dict[str, float] = {}
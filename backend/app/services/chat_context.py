@@ -0,0 +1,76 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    logger.warning("tiktoken not available, estimating token counts. Install with: pip install tiktoken")
+    TIKTOKEN_AVAILABLE = False
+
+# Per-message framing tokens added by the chat completion format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Stored turns start with this entry once older turns have been summarised
+SUMMARY_ROLE = "summary"
+
+# Encoding per model, or None where it could not be loaded
+_encodings: Dict[str, object] = {}
+
+def _encoding(model: str):
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken downloads encodings on first use (cached under TIKTOKEN_CACHE_DIR)
+            logger.warning(f"Could not load the tiktoken encoding for {model}, estimating token counts: {str(e)}")
+            _encodings[model] = None
+    return _encodings[model]
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Exact token count with tiktoken, otherwise the usual ~4 characters per token estimate."""
+    encoding = _encoding(model) if TIKTOKEN_AVAILABLE else None
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def message_tokens(message: Dict[str, str], model: str = "gpt-3.5-turbo") -> int:
+    return count_tokens(message.get("content", ""), model) + MESSAGE_OVERHEAD_TOKENS
+
+def split_summary(history: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """(rolling summary or None, conversation turns) from a stored history."""
+    if history and history[0]["role"] == SUMMARY_ROLE:
+        return history[0]["content"], history[1:]
+    return None, history
+
+def join_summary(summary: Optional[str], turns: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Inverse of split_summary."""
+    if summary:
+        return [{"role": SUMMARY_ROLE, "content": summary}, *turns]
+    return list(turns)
+
+def fit_window(
+    turns: List[Dict[str, str]], budget: int, model: str = "gpt-3.5-turbo"
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Split turns into (overflow, window): window is the longest suffix of turns whose
+    token count fits in budget, and always holds at least the newest turn. The window
+    never starts with an assistant reply whose question was cut off.
+    """
+    used = 0
+    start = len(turns)
+    while start > 0:
+        cost = message_tokens(turns[start - 1], model)
+        if used + cost > budget and start < len(turns):
+            break
+        used += cost
+        start -= 1
+    while start < len(turns) - 1 and turns[start]["role"] == "assistant":
+        start += 1
+    return turns[:start], turns[start:]
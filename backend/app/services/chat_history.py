@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+Messages = List[Dict[str, str]]
+# A change to a history: applied once locally, and again on top of a newer stored
+# history if another worker's write lands first
+Change = Callable[[Messages], Messages]
+
+class MemoryHistoryBackend:
+    """Process-local stand-in for the chat_histories table (single worker, no persistence)."""
+
+    def __init__(self):
+        self._rows: Dict[int, Tuple[Messages, int]] = {}
+
+    def load(self, user_id: int) -> Optional[Tuple[Messages, int]]:
+        return self._rows.get(user_id)
+
+    def version(self, user_id: int) -> Optional[int]:
+        row = self._rows.get(user_id)
+        return row[1] if row else None
+
+    def save_many(self, rows: Dict[int, Tuple[Messages, int]]) -> Dict[int, int]:
+        saved = {}
+        for user_id, (messages, base_version) in rows.items():
+            current = self._rows.get(user_id)
+            if current is None or current[1] == base_version:
+                saved[user_id] = base_version + 1
+                self._rows[user_id] = (list(messages), saved[user_id])
+        return saved
+
+class PostgresHistoryBackend:
+    """chat_histories table: one JSON document per user, versioned for cross-worker consistency."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def load(self, user_id: int) -> Optional[Tuple[Messages, int]]:
+        with self.session_factory() as db:
+            row = db.execute(
+                text("SELECT messages, version FROM chat_histories WHERE user_id = :user_id"),
+                {"user_id": user_id}
+            ).fetchone()
+        if not row:
+            return None
+        messages = json.loads(row.messages) if isinstance(row.messages, str) else row.messages
+        return messages, row.version
+
+    def version(self, user_id: int) -> Optional[int]:
+        with self.session_factory() as db:
+            return db.execute(
+                text("SELECT version FROM chat_histories WHERE user_id = :user_id"),
+                {"user_id": user_id}
+            ).scalar()
+
+    def save_many(self, rows: Dict[int, Tuple[Messages, int]]) -> Dict[int, int]:
+        # One round trip for the whole batch. A row is only replaced if it still holds the
+        # version the write was built on (compare-and-swap), so a concurrent write from
+        # another worker is never overwritten; writes that lost are absent from RETURNING.
+        payload = [
+            {"user_id": user_id, "messages": messages, "version": base_version + 1}
+            for user_id, (messages, base_version) in rows.items()
+        ]
+        with self.session_factory() as db:
+            saved = db.execute(
+                text("""
+                    INSERT INTO chat_histories (user_id, messages, version, updated_at)
+                    SELECT row.user_id, row.messages, row.version, now()
+                    FROM json_to_recordset(CAST(:rows AS JSON)) AS row(user_id integer, messages json, version integer)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET messages = EXCLUDED.messages,
+                        version = chat_histories.version + 1,
+                        updated_at = now()
+                    WHERE chat_histories.version = EXCLUDED.version - 1
+                    RETURNING user_id, version
+                """),
+                {"rows": json.dumps(payload)}
+            ).fetchall()
+            db.commit()
+        return {row.user_id: row.version for row in saved}
+
+class _Session:
+    # version is the stored version the messages were built on; pending holds the changes
+    # applied on top of it that no flush has written yet
+    __slots__ = ("messages", "version", "pending", "in_flight", "size", "last_access")
+
+    def __init__(self, messages: Messages, version: int):
+        self.messages = messages
+        self.version = version
+        self.pending: List[Change] = []
+        self.in_flight = False
+        self.size = _estimate_size(messages)
+        self.last_access = time.monotonic()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+def _estimate_size(messages: Messages) -> int:
+    # Content length plus a rough per-message overhead for the dicts themselves
+    return sum(len(message.get("content", "")) + 200 for message in messages)
+
+def _replay(messages: Messages, changes: List[Change]) -> Messages:
+    for change in changes:
+        messages = change(list(messages))
+    return messages
+
+class ChatHistoryStore:
+    """
+    Two-tier conversation history: a per-worker LRU of recent sessions in front of a
+    shared backend, with batched write-behind persistence.
+
+    - Memory is capped by session count and by an estimate of stored bytes; the least
+      recently used sessions are evicted first and idle sessions expire after idle_ttl.
+    - Every read and update first compares the cached version with the stored one (a
+      primary-key lookup) and reloads the history if another worker has written since,
+      so a user moving between workers always builds on the latest flushed history.
+      What is saved here reaches the other workers with the next flush (flush_interval).
+    - Updates are kept as changes, not snapshots, until they are flushed. Flushes are
+      batched and the backend only accepts a write built on the version it still holds;
+      a write that loses to another worker's reloads the winning history, re-applies its
+      pending changes on top and tries again, so concurrent turns are never dropped.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_sessions: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 1800.0,
+        flush_interval: float = 0.5,
+        max_flush_attempts: int = 3,
+    ):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.max_flush_attempts = max_flush_attempts
+
+        self._sessions: "OrderedDict[int, _Session]" = OrderedDict()
+        self._bytes = 0
+        # Dirty sessions evicted before their flush; written on the next flush
+        self._evicted_dirty: Dict[int, _Session] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get(self, user_id: int) -> Optional[Messages]:
+        """Return a copy of the user's history, or None if they have never chatted."""
+        session = await self._session(user_id)
+        if session.version == 0 and not session.dirty:
+            return None
+        return list(session.messages)
+
+    async def update(self, user_id: int, change: Change) -> Messages:
+        """
+        Apply change to the user's history and return a copy of the result; persisted by
+        the next flush. change gets a copy of the history and must only depend on it, as
+        it runs again if another worker's write is flushed first.
+        """
+        session = await self._session(user_id)
+        self._set_messages(user_id, session, change(list(session.messages)))
+        session.pending.append(change)
+        return list(session.messages)
+
+    async def set(self, user_id: int, messages: Messages) -> None:
+        """Replace the user's history; persisted by the next flush."""
+        messages = list(messages)
+        await self.update(user_id, lambda _: list(messages))
+
+    async def flush(self) -> None:
+        """Write every dirty session to the backend in one batch."""
+        batch = {
+            user_id: session
+            for user_id, session in [*self._evicted_dirty.items(), *self._sessions.items()]
+            if session.dirty and not session.in_flight
+        }
+        for attempt in range(self.max_flush_attempts):
+            if not batch:
+                return
+            rows = {user_id: (list(session.messages), session.version) for user_id, session in batch.items()}
+            written = {user_id: len(session.pending) for user_id, session in batch.items()}
+            for session in batch.values():
+                session.in_flight = True
+            try:
+                saved = await asyncio.to_thread(self.backend.save_many, rows)
+            except Exception as e:
+                # The changes stay pending for the next flush
+                logger.error(f"Failed to persist {len(rows)} chat histories: {str(e)}")
+                return
+            finally:
+                for session in batch.values():
+                    session.in_flight = False
+
+            lost = {}
+            for user_id, session in batch.items():
+                version = saved.get(user_id)
+                if version is None:
+                    lost[user_id] = session
+                    continue
+                # Changes made while the batch was in flight were applied on top of what
+                # was just written and stay pending
+                session.version = version
+                del session.pending[:written[user_id]]
+                if not session.dirty and self._evicted_dirty.get(user_id) is session:
+                    del self._evicted_dirty[user_id]
+
+            # Another worker wrote first: build on its history and try again
+            for user_id, session in lost.items():
+                row = await asyncio.to_thread(self.backend.load, user_id)
+                self._rebase(user_id, session, row)
+            batch = lost
+        logger.warning(f"Chat histories of {len(batch)} users kept changing on other workers; retrying on the next flush")
+
+    def evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [user_id for user_id, session in self._sessions.items() if session.last_access < cutoff]
+        for user_id in idle:
+            self._evict(user_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "dirty": sum(1 for session in self._sessions.values() if session.dirty) + len(self._evicted_dirty),
+        }
+
+    async def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Chat history flush loop error: {str(e)}")
+
+    async def _session(self, user_id: int) -> _Session:
+        """The user's cached session, reloaded first if the stored history moved on."""
+        session = self._cached(user_id)
+        if session is None:
+            row = await asyncio.to_thread(self.backend.load, user_id)
+            # Another request for the same user may have loaded it meanwhile
+            session = self._cached(user_id)
+            if session is None:
+                session = _Session(list(row[0]), row[1]) if row else _Session([], 0)
+        elif not session.in_flight:
+            # A session in a running flush is reconciled by that flush instead
+            stored_version = await asyncio.to_thread(self.backend.version, user_id)
+            if (stored_version or 0) != session.version:
+                row = await asyncio.to_thread(self.backend.load, user_id)
+                current = self._cached(user_id)
+                if current is not None and current is not session:
+                    session = current
+                elif not session.in_flight:
+                    self._rebase(user_id, session, row)
+
+        session.last_access = time.monotonic()
+        if self._sessions.get(user_id) is session:
+            self._sessions.move_to_end(user_id)
+        else:
+            self._put(user_id, session)
+        return session
+
+    def _cached(self, user_id: int) -> Optional[_Session]:
+        session = self._sessions.get(user_id)
+        return session if session is not None else self._evicted_dirty.get(user_id)
+
+    def _rebase(self, user_id: int, session: _Session, row: Optional[Tuple[Messages, int]]) -> None:
+        """Re-apply the session's pending changes on top of the stored row."""
+        messages, version = row if row else ([], 0)
+        session.version = version
+        self._set_messages(user_id, session, _replay(messages, session.pending))
+
+    def _set_messages(self, user_id: int, session: _Session, messages: Messages) -> None:
+        size = _estimate_size(messages)
+        if self._sessions.get(user_id) is session:
+            self._bytes += size - session.size
+        session.messages = messages
+        session.size = size
+
+    def _put(self, user_id: int, session: _Session) -> None:
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        self._bytes += session.size
+        self._evicted_dirty.pop(user_id, None)
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            self._evict(next(iter(self._sessions)))
+
+    def _drop(self, user_id: int) -> None:
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self._bytes -= session.size
+
+    def _evict(self, user_id: int) -> None:
+        session = self._sessions.get(user_id)
+        if session is not None and session.dirty:
+            self._evicted_dirty[user_id] = session
+        self._drop(user_id)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised instead of queueing when the gate is saturated; retry_after is in seconds."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+class TokenBucket:
+    """Requests-per-minute limiter matching the provider quota, with a burst allowance."""
+
+    def __init__(self, requests_per_minute: float, burst: int):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before it is actually available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class LLMGate:
+    """
+    Admission control in front of the LLM client.
+
+    - At most max_concurrent calls run at once; further callers wait in per-user queues
+      that are served round-robin, so one user with many tabs cannot starve the others.
+    - Every call also takes a token from a TokenBucket sized to the provider quota.
+    - Callers are rejected immediately with QueueFullError once max_queue_depth calls
+      are waiting overall, or max_queued_per_user for the same user.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        requests_per_minute: float,
+        burst: Optional[int] = None,
+        max_queue_depth: int = 100,
+        max_queued_per_user: int = 4,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.bucket = TokenBucket(requests_per_minute, burst or max_concurrent)
+
+        self._active = 0
+        self._waiting = 0
+        self._queues: "OrderedDict[Any, Deque[asyncio.Future]]" = OrderedDict()
+
+        # Metrics
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._service_time = 1.0  # moving average of seconds a slot is held
+        self.completed = 0
+        self.rejected = 0
+
+    def check(self, user_id: Any) -> None:
+        """Fail fast with QueueFullError if a call for user_id would be rejected."""
+        if self._active < self.max_concurrent and not self._waiting:
+            return
+        if self._waiting >= self.max_queue_depth:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after(), "Chat service is busy, please retry shortly")
+        if len(self._queues.get(user_id, ())) >= self.max_queued_per_user:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after(), "Too many chat requests in flight for this user")
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained, at least 1."""
+        by_concurrency = (self._waiting + 1) * self._service_time / self.max_concurrent
+        by_rate = (self._waiting + 1) / self.bucket.rate
+        return max(1, math.ceil(max(by_concurrency, by_rate)))
+
+    async def acquire(self, user_id: Any) -> None:
+        started = time.monotonic()
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+        else:
+            self.check(user_id)
+            future = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(user_id, deque()).append(future)
+            self._waiting += 1
+            try:
+                # release() hands its slot straight to us, so _active is already counted
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release()
+                else:
+                    self._remove_waiter(user_id, future)
+                raise
+
+        try:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.release()
+            raise
+        self._wait_times.append(time.monotonic() - started)
+
+    def release(self) -> None:
+        # Serve the user at the head of the rotation, then move them to the back
+        while self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: Any) -> AsyncIterator[None]:
+        """Hold one LLM call slot for user_id for the duration of the block."""
+        await self.acquire(user_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.9 * self._service_time + 0.1 * (time.monotonic() - started)
+            self.completed += 1
+            self.release()
+
+    def _remove_waiter(self, user_id: Any, future: asyncio.Future) -> None:
+        queue = self._queues.get(user_id)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[user_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "active": self._active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self._waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "queued_users": len(self._queues),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_p50": percentile(0.50),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": percentile(1.0),
+            "avg_service_seconds": round(self._service_time, 3),
+            "rate_limit_tokens": round(max(self.bucket.tokens, 0.0), 2),
+        }
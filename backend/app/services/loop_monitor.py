@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class EventLoopLagMonitor:
+    """
+    Measures event-loop lag: how late a sleep(interval) wakes up. Sustained lag means
+    something is blocking the loop (sync I/O or CPU work in an async handler).
+    """
+
+    def __init__(self, interval: float = 0.1, samples: int = 600, warn_ms: float = 100.0):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self._lags: Deque[float] = deque(maxlen=samples)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - started - self.interval) * 1000)
+            self._lags.append(lag_ms)
+            if lag_ms > self.warn_ms:
+                logger.warning(f"Event loop blocked for {lag_ms:.0f} ms")
+
+    def metrics(self) -> Dict[str, float]:
+        lags = sorted(self._lags)
+        if not lags:
+            return {"lag_ms_p50": 0.0, "lag_ms_p99": 0.0, "lag_ms_max": 0.0}
+        return {
+            "lag_ms_p50": round(lags[len(lags) // 2], 2),
+            "lag_ms_p99": round(lags[min(len(lags) - 1, int(0.99 * len(lags)))], 2),
+            "lag_ms_max": round(lags[-1], 2),
+        }
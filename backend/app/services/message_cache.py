@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[int, int]
+
+class _Ring:
+    """The newest messages of one conversation, oldest first."""
+
+    __slots__ = ("messages", "complete", "size", "filled_at")
+
+    def __init__(self):
+        self.messages: List[Any] = []
+        # True when the ring holds the whole conversation, not just its newest part
+        self.complete = False
+        self.size = 0
+        self.filled_at = time.monotonic()
+
+def _sort_key(message):
+    return (message.timestamp, message.message_id)
+
+def _message_size(message) -> int:
+    # Rough footprint of a MessageResponse beyond its body
+    return len(message.body or "") + 150
+
+class RecentMessageCache:
+    """
+    Per-worker ring buffers of the most recent `capacity` messages of active conversations.
+
+    Messages are any objects with message_id, timestamp and body attributes (MessageResponse).
+
+    A ring is filled by the first read of a conversation's latest page and appended to as
+    messages are sent (locally after commit, from other workers via the message hub), so
+    recent pages are served without touching the database. Rings are evicted LRU once the
+    total estimated size exceeds max_bytes or max_conversations, and refilled after
+    max_age seconds in case a cross-worker notification was missed.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 50,
+        max_conversations: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_age: float = 600.0,
+    ):
+        self.capacity = capacity
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._rings: "OrderedDict[Pair, _Ring]" = OrderedDict()
+        self._bytes = 0
+        # When messages last arrived for conversations that were not cached, so a fill from
+        # a read that started before them does not seed a ring that misses them
+        self._appended_at: "OrderedDict[Pair, float]" = OrderedDict()
+        # Sync routes run in the threadpool, hub events on the event loop
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_page(
+        self, pair: Pair, limit: int, before: Optional[int] = None, after: Optional[int] = None
+    ) -> Optional[List[Any]]:
+        """A newest-first page like get_conversation's, or None if the ring cannot answer it."""
+        with self._lock:
+            ring = self._rings.get(pair)
+            if ring is None or time.monotonic() - ring.filled_at > self.max_age:
+                self.stats["misses"] += 1
+                return None
+            messages = ring.messages
+
+            if before is None and after is None:
+                page = messages[-limit:]
+                answerable = len(page) == limit or ring.complete
+            else:
+                cursor = before if before is not None else after
+                position = next((i for i, m in enumerate(messages) if m.message_id == cursor), None)
+                if position is None:
+                    answerable = False
+                elif after is not None:
+                    page = messages[position + 1:position + 1 + limit]
+                    answerable = True
+                else:
+                    page = messages[max(0, position - limit):position]
+                    answerable = len(page) == limit or ring.complete
+
+            if not answerable:
+                self.stats["misses"] += 1
+                return None
+            self._rings.move_to_end(pair)
+            self.stats["hits"] += 1
+            return page[::-1]
+
+    def fill(self, pair: Pair, newest_first: List[Any], limit: int, read_started: float) -> None:
+        """
+        Seed a ring from a latest-page database read that began at read_started
+        (time.monotonic()), merging with anything appended meanwhile.
+        """
+        with self._lock:
+            ring = self._rings.get(pair)
+            if ring is None or time.monotonic() - ring.filled_at > self.max_age:
+                if self._appended_at.get(pair, float("-inf")) >= read_started:
+                    return
+                self._drop(pair)
+                ring = _Ring()
+                ring.complete = len(newest_first) < limit
+            self._merge(pair, ring, newest_first)
+
+    def append(self, pair: Pair, message: Any) -> None:
+        """Add a newly sent message to the conversation's ring, if that ring is cached."""
+        with self._lock:
+            ring = self._rings.get(pair)
+            if ring is not None:
+                self._merge(pair, ring, [message])
+                return
+            self._appended_at[pair] = time.monotonic()
+            self._appended_at.move_to_end(pair)
+            if len(self._appended_at) > self.max_conversations:
+                self._appended_at.popitem(last=False)
+
+    def invalidate(self, pair: Pair) -> None:
+        with self._lock:
+            self._drop(pair)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rings.clear()
+            self._bytes = 0
+            self._appended_at.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"conversations": len(self._rings), "bytes": self._bytes, **self.stats}
+
+    def _merge(self, pair: Pair, ring: _Ring, messages: List[Any]) -> None:
+        known = {m.message_id for m in ring.messages}
+        new = [m for m in messages if m.message_id not in known]
+        if not new and pair in self._rings:
+            return
+
+        self._drop(pair)
+        merged = sorted(ring.messages + new, key=_sort_key)
+        if len(merged) > self.capacity:
+            merged = merged[-self.capacity:]
+            ring.complete = False
+        ring.messages = merged
+        ring.size = sum(_message_size(m) for m in merged)
+
+        self._rings[pair] = ring
+        self._bytes += ring.size
+        while len(self._rings) > 1 and (len(self._rings) > self.max_conversations or self._bytes > self.max_bytes):
+            oldest = next(iter(self._rings))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, pair: Pair) -> None:
+        ring = self._rings.pop(pair, None)
+        if ring is not None:
+            self._bytes -= ring.size
@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import logging
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.oasis_cache import load_oasis_table, normalize_column
+from app.utils.oasis_index import INDEX_NAME, get_active_namespace
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    from pinecone import Pinecone
+    PINECONE_AVAILABLE = True
+except ImportError:
+    logger.warning("pinecone not available, chat runs without occupation context. Install with: pip install pinecone")
+    PINECONE_AVAILABLE = False
+
+CONTEXT_HEADER = (
+    "Occupations from the OaSIS taxonomy that may relate to what the student just said. "
+    "Draw on them only when they help your next question; do not list them unprompted:"
+)
+
+# Words that say nothing about the topic of a message
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "your", "with", "this", "that", "have",
+    "was", "were", "what", "when", "where", "why", "how", "who", "which", "would", "could",
+    "should", "about", "just", "really", "think", "like", "want", "feel", "know", "maybe",
+    "because", "them", "they", "then", "than", "there", "here", "some", "more", "very",
+    "yes", "yeah", "okay", "sure", "can", "did", "does", "don", "its", "also", "from",
+    "into", "been", "being", "will", "much", "many", "things", "thing", "something",
+}
+
+def topic_key(text: str) -> Optional[str]:
+    """Order-insensitive key of the content words of a message, None for pure follow-ups."""
+    words = {word for word in re.findall(r"[a-zà-ÿ]+", text.lower()) if len(word) > 2 and word not in STOPWORDS}
+    return " ".join(sorted(words)) if words else None
+
+@lru_cache(maxsize=1)
+def get_index():
+    """Pinecone index handle, created once per process instead of once per query."""
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(INDEX_NAME)
+
+@lru_cache(maxsize=1)
+def _lead_statement_column() -> Optional[int]:
+    columns = load_oasis_table().columns
+    return next((i for i, column in enumerate(columns) if normalize_column(column) == "lead_statement"), None)
+
+def describe_occupation(doc_id: str, text: str, max_chars: int = 160) -> str:
+    """One compact line per hit, read from the local OaSIS cache when it is available."""
+    oasis_code = doc_id.split("-")[1] if "-" in doc_id else doc_id
+    try:
+        table = load_oasis_table()
+        row = table.index_of(oasis_code)
+        if row is not None:
+            column = _lead_statement_column()
+            lead_statement = table.cell(row, column) if column is not None else ""
+            return f"- {oasis_code} {table.labels[row]}: {lead_statement[:max_chars]}".rstrip(": ")
+    except FileNotFoundError:
+        pass
+    return f"- {oasis_code}: {' '.join(text.split())[:max_chars]}"
+
+class OccupationRetriever:
+    """
+    Retrieves the OaSIS occupations closest to a student's message as compact prompt context.
+
+    Context is kept per conversation (user) rather than per exact message: a remote
+    vector search rarely fits the latency budget, so each turn starts a search for its
+    message and waits at most budget_seconds for it. When the search is late, the turn
+    uses the conversation's last finished result, usually the previous turn's, and the
+    search completes in the background for the next one. Follow-ups without content words
+    ("yes", "tell me more") and repeats of the same topic reuse that result without
+    searching.
+    """
+
+    def __init__(self, top_k: int = 3, budget_seconds: float = 0.02, cache_size: int = 5000):
+        self.top_k = top_k
+        self.budget_seconds = budget_seconds
+        self.cache_size = cache_size
+        self.enabled = (
+            PINECONE_AVAILABLE
+            and bool(os.getenv("PINECONE_API_KEY"))
+            and os.getenv("CHAT_RAG_ENABLED", "true").lower() == "true"
+        )
+
+        # user -> (search sequence number, topic, context) of their latest finished search
+        self._contexts: "OrderedDict[int, Tuple[int, str, str]]" = OrderedDict()
+        # user -> (topic, task) of their latest search still running
+        self._inflight: Dict[int, Tuple[str, asyncio.Task]] = {}
+        self._sequence = itertools.count(1)
+        # reused: served a finished result without searching; fresh: search within budget;
+        # stale: search over budget, previous result served; cold: over budget, nothing to serve
+        self.stats = {"requests": 0, "reused": 0, "fresh": 0, "stale": 0, "cold": 0, "over_budget": 0, "errors": 0}
+
+    async def retrieve(self, user_id: int, text: str) -> Optional[str]:
+        """Context block for this message, or None if nothing is ready within the budget."""
+        if not self.enabled:
+            return None
+        self.stats["requests"] += 1
+
+        topic = topic_key(text)
+        finished = self._contexts.get(user_id)
+        if finished is not None:
+            self._contexts.move_to_end(user_id)
+        if topic is None or (finished is not None and finished[1] == topic):
+            if finished is None:
+                self.stats["cold"] += 1
+                return None
+            self.stats["reused"] += 1
+            return finished[2] or None
+
+        inflight = self._inflight.get(user_id)
+        if inflight is None or inflight[0] != topic:
+            task = asyncio.create_task(self._search(user_id, next(self._sequence), topic, text))
+            self._inflight[user_id] = (topic, task)
+            task.add_done_callback(lambda done: self._forget_task(user_id, done))
+        else:
+            task = inflight[1]
+        try:
+            # shield so a timeout here does not cancel the search filling the cache
+            context = await asyncio.wait_for(asyncio.shield(task), self.budget_seconds)
+            self.stats["fresh"] += 1
+            return context
+        except asyncio.TimeoutError:
+            self.stats["over_budget"] += 1
+            if finished is None:
+                self.stats["cold"] += 1
+                return None
+            self.stats["stale"] += 1
+            return finished[2] or None
+
+    def forget(self, user_id: int) -> None:
+        """Drop a user's context, e.g. when their conversation is cleared."""
+        self._inflight.pop(user_id, None)
+        # An empty result newer than any running search, so none of them refills it
+        self._contexts[user_id] = (next(self._sequence), "", "")
+
+    def _forget_task(self, user_id: int, task: asyncio.Task) -> None:
+        inflight = self._inflight.get(user_id)
+        if inflight is not None and inflight[1] is task:
+            del self._inflight[user_id]
+
+    async def _search(self, user_id: int, sequence: int, topic: str, text: str) -> Optional[str]:
+        try:
+            hits = await asyncio.to_thread(self._query, text)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Occupation retrieval failed: {str(e)}")
+            return None
+
+        lines = [describe_occupation(hit["_id"], hit.get("fields", {}).get("text", "")) for hit in hits]
+        context = f"{CONTEXT_HEADER}\n" + "\n".join(lines) if lines else ""
+        # Searches can finish out of order; an older one never replaces a newer result
+        current = self._contexts.get(user_id)
+        if current is None or current[0] < sequence:
+            self._contexts[user_id] = (sequence, topic, context)
+            self._contexts.move_to_end(user_id)
+            while len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+        return context or None
+
+    def _query(self, text: str) -> List[Dict]:
+        response = get_index().search(
+            namespace=get_active_namespace(),
+            query={"inputs": {"text": text}, "top_k": self.top_k}
+        )
+        return response.result.hits if hasattr(response, "result") else []
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+class PubSubHub:
+    """
+    In-process fan-out of per-user events to WebSocket subscribers.
+
+    With a `connect` factory, events are published with pg_notify inside the caller's
+    transaction (so they are only delivered if it commits) and every worker LISTENs on
+    the channel, which is how a message sent through one worker reaches sockets held by
+    another. Without one, events are dispatched locally after commit, which only
+    reaches subscribers of the same process.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        connect: Optional[Callable[[], Any]] = None,
+        queue_size: int = 256,
+        keepalive_seconds: float = 30.0,
+    ):
+        self.channel = channel
+        self.connect = connect
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        # Identifies events published by this process once they come back through NOTIFY
+        self.origin = uuid.uuid4().hex
+        self._listeners: List[Callable[[Dict[str, Any], bool], None]] = []
+        self._reconnect_listeners: List[Callable[[], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    # Publishing (called from sync request handlers, inside a DB transaction)
+
+    def publish(self, db: Session, user_ids: Iterable[int], payload: Dict[str, Any]) -> None:
+        """Queue an event for user_ids, delivered only if db's transaction commits."""
+        message = self._encode(list(set(user_ids)), payload)
+        self.stats["published"] += 1
+        if self.connect is not None:
+            db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": self.channel, "message": message})
+            return
+        self._queue_local(db, message)
+
+    def publish_many(self, db: Session, events: List[Tuple[Iterable[int], Dict[str, Any]]]) -> None:
+        """publish() for a batch of (user_ids, payload) events, in a single statement."""
+        if not events:
+            return
+        messages = [self._encode(list(set(user_ids)), payload) for user_ids, payload in events]
+        self.stats["published"] += len(messages)
+        if self.connect is not None:
+            db.execute(
+                text("SELECT pg_notify(:channel, message) FROM unnest(CAST(:messages AS text[])) AS message"),
+                {"channel": self.channel, "messages": messages}
+            )
+            return
+
+        for message in messages:
+            self._queue_local(db, message)
+
+    def _queue_local(self, db: Session, message: str) -> None:
+        if not db.in_transaction():
+            # Pending events belong to a transaction, so there has to be one to end
+            db.begin()
+        pending: List[str] = db.info.setdefault("pubsub_pending", [])
+        pending.append(message)
+        if not db.info.get("pubsub_hooked"):
+            db.info["pubsub_hooked"] = True
+            event.listen(db, "after_commit", self._after_commit)
+            # Soft rollback also fires when no SQL has run yet in the transaction
+            event.listen(db, "after_soft_rollback", self._after_rollback)
+
+    def _after_commit(self, session: Session) -> None:
+        for message in session.info.pop("pubsub_pending", []):
+            self._dispatch_threadsafe(message)
+
+    def _after_rollback(self, session: Session, previous_transaction) -> None:
+        if previous_transaction.parent is None:
+            session.info.pop("pubsub_pending", None)
+
+    def _encode(self, user_ids: List[int], payload: Dict[str, Any]) -> str:
+        envelope = {"users": user_ids, "origin": self.origin, "event": payload}
+        message = json.dumps(envelope, default=str)
+        if len(message.encode("utf-8")) > MAX_NOTIFY_BYTES and "message" in payload:
+            # Subscribers load the full body themselves when it does not fit a notification
+            envelope["event"] = {**payload, "message": {**payload["message"], "body": None}, "truncated": True}
+            message = json.dumps(envelope, default=str)
+        return message
+
+    def add_listener(self, callback: Callable[[Dict[str, Any], bool], None]) -> None:
+        """
+        Call callback(event, is_local) for every event seen by this process, whoever it
+        is addressed to; is_local is True for events this process published.
+        """
+        self._listeners.append(callback)
+
+    def add_reconnect_listener(self, callback: Callable[[], None]) -> None:
+        """Call callback whenever the LISTEN connection is (re)established, as events may have been missed."""
+        self._reconnect_listeners.append(callback)
+
+    # Delivery (event loop)
+
+    def _dispatch_threadsafe(self, message: str) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message: str) -> None:
+        try:
+            decoded = json.loads(message)
+        except ValueError:
+            logger.error(f"Ignoring malformed {self.channel} notification")
+            return
+        is_local = decoded.get("origin") == self.origin
+        for listener in self._listeners:
+            try:
+                listener(decoded["event"], is_local)
+            except Exception as e:
+                logger.error(f"{self.channel} listener failed: {str(e)}")
+        for user_id in decoded.get("users", []):
+            for queue in self._subscribers.get(user_id, ()):
+                if queue.full():
+                    # A stalled socket loses its oldest events rather than growing without bound
+                    queue.get_nowait()
+                    self.stats["dropped"] += 1
+                queue.put_nowait(decoded["event"])
+                self.stats["delivered"] += 1
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Queue receiving every event addressed to user_id while the block is open."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": "postgres" if self.connect is not None else "local",
+            "subscribed_users": len(self._subscribers),
+            "sockets": sum(len(queues) for queues in self._subscribers.values()),
+            **self.stats,
+        }
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.connect is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        """LISTEN on a dedicated connection, reconnecting with backoff if it drops."""
+        backoff = 1.0
+        while True:
+            connection = None
+            fileno = None
+            try:
+                connection = await asyncio.to_thread(self.connect)
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                logger.info(f"Listening for {self.channel} notifications")
+                for callback in self._reconnect_listeners:
+                    callback()
+
+                readable = asyncio.Event()
+                fileno = connection.fileno()
+                self._loop.add_reader(fileno, readable.set)
+                backoff = 1.0
+
+                while True:
+                    try:
+                        await asyncio.wait_for(readable.wait(), self.keepalive_seconds)
+                    except asyncio.TimeoutError:
+                        # Round trip so a silently dropped connection is noticed
+                        cursor.execute("SELECT 1")
+                    readable.clear()
+                    connection.poll()
+                    while connection.notifies:
+                        self._dispatch(connection.notifies.pop(0).payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.channel} listener failed, reconnecting in {backoff:.0f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if fileno is not None:
+                    self._loop.remove_reader(fileno)
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
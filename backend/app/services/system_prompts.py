@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import UserProfile
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are a Socratic mentor engaging the student in a "game" of problem-solving. Your role is to:
+
+1. Ask clarifying, guiding questions to help the student reflect, articulate their thoughts, and explore what truly motivates them.
+2. Encourage them to discover their own goals and values through questioning and gentle nudges, rather than providing direct answers upfront.
+3. Ensure the student thinks deeply and reflects on their options.
+4. Help them progress toward self-defined objectives while feeling supported and validated.
+5. Use the Socratic method: ask open-ended questions that challenge assumptions and promote critical thinking.
+6. Acknowledge and validate their thoughts and feelings while gently pushing them to explore deeper.
+7. When they express a goal or interest, ask them to elaborate on why it matters to them.
+8. Help them identify patterns in their thinking and interests.
+9. Use their personal preferences (favorite movies, books, celebrities) to create relatable examples and analogies.
+10. Consider their learning style when suggesting approaches or activities.
+
+Remember: Your goal is not to give answers, but to help them discover their own path through thoughtful questioning."""
+
+# (profile attribute, label) in the order they appear in the prompt
+PROFILE_FIELDS = [
+    ("name", "Name"),
+    ("age", "Age"),
+    ("sex", "Sex"),
+    ("major", "Major"),
+    ("year", "Year"),
+    ("gpa", "GPA"),
+    ("hobbies", "Hobbies"),
+    ("country", "Country"),
+    ("state_province", "State/Province"),
+    ("unique_quality", "Unique Quality"),
+    ("story", "Personal Story"),
+    ("favorite_movie", "Favorite Movie"),
+    ("favorite_book", "Favorite Book"),
+    ("favorite_celebrities", "Role Models"),
+    ("learning_style", "Learning Style"),
+    ("interests", "Interests"),
+]
+
+# Entries are refreshed by PUT /profiles/update on the worker that served it; the TTL
+# bounds how long other workers keep serving a prompt built from an older profile.
+PROMPT_CACHE_SIZE = int(os.getenv("CHAT_PROMPT_CACHE_SIZE", "10000"))
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_PROMPT_CACHE_TTL_SECONDS", "300"))
+
+def build_system_message(profile: Optional[UserProfile]) -> str:
+    """SYSTEM_PROMPT followed by whatever the student has filled in on their profile."""
+    if not profile:
+        return SYSTEM_PROMPT
+    lines = [
+        f"- {label}: {getattr(profile, field)}\n"
+        for field, label in PROFILE_FIELDS
+        if getattr(profile, field)
+    ]
+    return f"{SYSTEM_PROMPT}\n\nUser Profile Information:\n{''.join(lines)}"
+
+def profile_version(profile: Optional[UserProfile]) -> Optional[datetime]:
+    """updated_at is only set on update, so fall back to created_at for untouched profiles."""
+    if not profile:
+        return None
+    return profile.updated_at or profile.created_at
+
+class SystemPromptCache:
+    """LRU of compiled system prompts per user, tagged with the profile version they were built from."""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_SIZE, ttl: float = PROMPT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # user_id -> (profile version, prompt, cached at)
+        self._entries: "OrderedDict[int, Tuple[Optional[datetime], str, float]]" = OrderedDict()
+        # PUT /profiles/update runs in the threadpool, chat turns on the event loop
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: int, profile: Optional[UserProfile]) -> str:
+        """Compile and cache the prompt for a profile, unless a newer version is already cached."""
+        version = profile_version(profile)
+        prompt = build_system_message(profile)
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None and current[0] and version and current[0] > version:
+                return current[1]
+            self._entries[user_id] = (version, prompt, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prompt
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+system_prompt_cache = SystemPromptCache()
+
+def get_system_prompt(user_id: int, db: Session) -> str:
+    """Cached system prompt for a user; the profile is only read on a cache miss."""
+    prompt = system_prompt_cache.get(user_id)
+    if prompt is None:
+        logger.info(f"Building system prompt for user {user_id}")
+        profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+        prompt = system_prompt_cache.put(user_id, profile)
+    return prompt
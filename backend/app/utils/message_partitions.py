@@ -0,0 +1,95 @@
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timezone
+from typing import Callable, List, Optional, Tuple, TypeVar
+import logging
+import re
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# messages is range-partitioned by timestamp into one table per calendar month (UTC).
+# There is deliberately no DEFAULT partition: without one Postgres can read the monthly
+# partitions in order (newest first for a conversation's latest page) and stop early,
+# which a DEFAULT partition, able to hold any month, rules out.
+PARTITION_NAME = re.compile(r"^messages_(\d{4})_(\d{2})$")
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"messages_{month:%Y_%m}"
+
+def partition_month(name: str) -> Optional[date]:
+    """Month held by a partition, from its name; None for tables that are not monthly partitions."""
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def create_partition(db: Session, month: date) -> None:
+    """Attach an empty partition for month, if there is none yet. Bounds are UTC midnights."""
+    db.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(month)}
+        PARTITION OF messages
+        FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')
+    """))
+
+def list_partitions(db: Session) -> List[Tuple[str, date]]:
+    """Monthly partitions currently attached to messages, oldest first."""
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'messages'
+    """)).fetchall()
+    partitions = [(row.relname, partition_month(row.relname)) for row in rows]
+    return sorted((p for p in partitions if p[1] is not None), key=lambda p: p[1])
+
+def ensure_partitions(db: Session, months_ahead: int = 2) -> List[str]:
+    """
+    Create the partitions for the current month and the next months_ahead months.
+    Inserts with a timestamp outside every partition fail, so this runs at startup and
+    from scripts/manage_message_partitions.py well before a month begins, and as a last
+    resort from insert_with_partition_retry.
+    """
+    current = month_start(datetime.now(timezone.utc).date())
+    existing = {name for name, _ in list_partitions(db)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) in existing:
+            continue
+        create_partition(db, month)
+        db.commit()
+        created.append(partition_name(month))
+        logger.info(f"Created message partition {partition_name(month)}")
+    return created
+
+def is_missing_partition(error: Exception) -> bool:
+    """True for the error Postgres raises when no partition accepts an inserted row."""
+    orig = getattr(error, "orig", None)
+    return getattr(orig, "pgcode", None) == "23514" and "no partition" in str(orig)
+
+def insert_with_partition_retry(db: Session, insert: Callable[[], T]) -> T:
+    """
+    Run insert (an INSERT into messages) and return its result. If no partition accepts
+    the rows, because the partition cron has not run, create the current month's
+    partitions and retry once. Creating them commits db's transaction, so call this
+    before anything else is written in it.
+    """
+    try:
+        with db.begin_nested():
+            return insert()
+    except IntegrityError as e:
+        if not is_missing_partition(e):
+            raise
+    logger.warning("No message partition accepts the current month; creating it now")
+    ensure_partitions(db, months_ahead=1)
+    return insert()
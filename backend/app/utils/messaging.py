@@ -1,15 +1,37 @@
-from sqlalchemy import text, desc
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 from pydantic import BaseModel
 from datetime import datetime
+import os
+import time
+import html
 from ..models import Message, User
+from ..services.pubsub import PubSubHub
+from ..services.message_cache import RecentMessageCache
+from .database import engine, SessionLocal
+from .message_partitions import insert_with_partition_retry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Characters of the latest message kept in conversations.last_message_preview
+PREVIEW_LENGTH = 255
+
+def _listen_connection():
+    """Dedicated psycopg2 connection for LISTEN, outside the SQLAlchemy pool."""
+    import psycopg2
+    return psycopg2.connect(**engine.url.translate_connect_args(username="user"), **engine.url.query)
+
+# New-message events for WebSocket subscribers. Workers are bridged with Postgres
+# LISTEN/NOTIFY; MESSAGES_PUBSUB_BACKEND=local keeps delivery within one process.
+message_hub = PubSubHub(
+    channel="messages",
+    connect=None if os.getenv("MESSAGES_PUBSUB_BACKEND", "postgres") == "local" else _listen_connection
+)
+
 class MessageResponse(BaseModel):
     message_id: int
     sender_id: int
@@ -17,6 +39,69 @@ class MessageResponse(BaseModel):
     body: str
     timestamp: datetime
 
+# Latest messages of recently read conversations, kept current from send_message and
+# from other workers' events on message_hub
+recent_messages = RecentMessageCache(
+    capacity=int(os.getenv("MESSAGES_CACHE_PER_CONVERSATION", "50")),
+    max_conversations=int(os.getenv("MESSAGES_CACHE_MAX_CONVERSATIONS", "10000")),
+    max_bytes=int(os.getenv("MESSAGES_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    max_age=float(os.getenv("MESSAGES_CACHE_MAX_AGE_SECONDS", "600"))
+)
+
+def _pair(user_id: int, peer_id: int):
+    return (min(user_id, peer_id), max(user_id, peer_id))
+
+def _on_hub_event(event: Dict[str, Any], is_local: bool) -> None:
+    # Local sends are appended by send_message itself
+    if event.get("type") != "message" or is_local:
+        return
+    message = event["message"]
+    pair = _pair(message["sender_id"], message["recipient_id"])
+    if event.get("truncated"):
+        recent_messages.invalidate(pair)
+    else:
+        recent_messages.append(pair, MessageResponse(**message))
+
+message_hub.add_listener(_on_hub_event)
+# Notifications sent while the listener was disconnected are lost, so the rings may be stale
+message_hub.add_reconnect_listener(recent_messages.clear)
+
+class ConversationSummary(BaseModel):
+    peer_id: int
+    peer_name: Optional[str] = None
+    last_message: str
+    last_message_id: int
+    last_sender_id: int
+    timestamp: datetime
+    unread_count: int = 0
+    last_read_message_id: Optional[int] = None
+    peer_last_read_message_id: Optional[int] = None
+
+class MessageSearchHit(BaseModel):
+    message_id: int
+    sender_id: int
+    recipient_id: int
+    peer_id: int
+    peer_name: Optional[str] = None
+    timestamp: datetime
+    snippet: str
+    rank: float
+
+class MessageSearchPage(BaseModel):
+    results: List[MessageSearchHit]
+    next_cursor: Optional[str] = None
+
+class BulkSendResult(BaseModel):
+    sent: int
+    message_ids: List[int]
+    invalid_recipient_ids: List[int]
+
+class ReadReceipt(BaseModel):
+    reader_id: int
+    peer_id: int
+    last_read_message_id: Optional[int] = None
+    unread_count: int
+
 def send_message(db: Session, sender_id: int, recipient_id: int, body: str) -> Optional[MessageResponse]:
     """
     Send a message from one user to another.
@@ -44,71 +129,409 @@ def send_message(db: Session, sender_id: int, recipient_id: int, body: str) -> O
             logger.error("Message body cannot be empty")
             return None
             
-        # Create new message
-        new_message = Message(
-            sender_id=sender_id,
-            recipient_id=recipient_id,
-            body=body
-        )
+        def insert_message() -> Message:
+            new_message = Message(
+                sender_id=sender_id,
+                recipient_id=recipient_id,
+                body=body
+            )
+            db.add(new_message)
+            db.flush()
+            return new_message
         
-        # Add to database
-        db.add(new_message)
-        db.commit()
+        # Add to database, updating the conversation row in the same transaction
+        new_message = insert_with_partition_retry(db, insert_message)
         db.refresh(new_message)
+        upsert_conversation(db, new_message)
         
-        logger.info(f"Message sent from user {sender_id} to user {recipient_id}")
-        
-        return MessageResponse(
+        response = MessageResponse(
             message_id=new_message.message_id,
             sender_id=new_message.sender_id,
             recipient_id=new_message.recipient_id,
             body=new_message.body,
             timestamp=new_message.timestamp
         )
+        # Delivered to both parties' open sockets once the transaction commits
+        message_hub.publish(
+            db,
+            [sender_id, recipient_id],
+            {"type": "message", "message": response.model_dump(mode="json")}
+        )
+        db.commit()
+        recent_messages.append(_pair(sender_id, recipient_id), response)
+        
+        logger.info(f"Message sent from user {sender_id} to user {recipient_id}")
+        
+        return response
         
     except Exception as e:
         db.rollback()
         logger.error(f"Error sending message: {str(e)}")
         return None
 
-def get_conversation(db: Session, user_id: int, peer_id: int, limit: int = 20) -> List[MessageResponse]:
+# Applies a new message (the proposed row, as EXCLUDED) to an existing conversation.
+# Concurrent sends can commit out of id order, so the last_* columns only move forward
+# (a later commit of an older message leaves them alone) while unread counters always
+# add up. Sending marks the conversation read for the sender, unless a newer message
+# is already there, which the sender may not have seen.
+CONVERSATION_UPSERT = """
+            ON CONFLICT (user_a_id, user_b_id) DO UPDATE
+            SET last_message_id = GREATEST(EXCLUDED.last_message_id, conversations.last_message_id),
+                last_sender_id = CASE WHEN EXCLUDED.last_message_id > conversations.last_message_id
+                                      THEN EXCLUDED.last_sender_id ELSE conversations.last_sender_id END,
+                last_message_preview = CASE WHEN EXCLUDED.last_message_id > conversations.last_message_id
+                                            THEN EXCLUDED.last_message_preview ELSE conversations.last_message_preview END,
+                last_message_at = CASE WHEN EXCLUDED.last_message_id > conversations.last_message_id
+                                       THEN EXCLUDED.last_message_at ELSE conversations.last_message_at END,
+                unread_a = CASE WHEN EXCLUDED.last_read_a IS NOT NULL
+                                     AND EXCLUDED.last_message_id > conversations.last_message_id THEN 0
+                                ELSE conversations.unread_a + EXCLUDED.unread_a END,
+                unread_b = CASE WHEN EXCLUDED.last_read_b IS NOT NULL
+                                     AND EXCLUDED.last_message_id > conversations.last_message_id THEN 0
+                                ELSE conversations.unread_b + EXCLUDED.unread_b END,
+                last_read_a = GREATEST(EXCLUDED.last_read_a, conversations.last_read_a),
+                last_read_b = GREATEST(EXCLUDED.last_read_b, conversations.last_read_b)
+"""
+
+def send_bulk_messages(
+    db: Session, sender_id: int, recipient_ids: List[int], bodies: List[str]
+) -> Tuple[BulkSendResult, List[MessageResponse]]:
     """
-    Retrieve the conversation between two users.
+    Send bodies[i] to recipient_ids[i] for every i, in one statement and one commit.
+
+    Recipients are validated with a single join against users (unknown ids are reported,
+    not sent), the messages are inserted with one multi-row INSERT and each affected
+    conversation row is upserted once, with its unread counter raised by the number of
+    messages it received. Returns the result and the sent messages, for
+    publish_bulk_messages to notify once the response is out.
+    """
+    statement = text(f"""
+        WITH requested AS (
+            SELECT requested.recipient_id, requested.body, requested.position
+            FROM unnest(CAST(:recipient_ids AS integer[]), CAST(:bodies AS text[]))
+                 WITH ORDINALITY AS requested(recipient_id, body, position)
+            JOIN users ON users.id = requested.recipient_id
+        ),
+        inserted AS (
+            INSERT INTO messages (sender_id, recipient_id, body)
+            SELECT :sender_id, recipient_id, body
+            FROM requested
+            ORDER BY position
+            RETURNING message_id, sender_id, recipient_id, body, timestamp
+        ),
+        latest AS (
+            SELECT DISTINCT ON (recipient_id)
+                   recipient_id, message_id, body, timestamp,
+                   COUNT(*) OVER (PARTITION BY recipient_id) AS received,
+                   LEAST(sender_id, recipient_id) AS user_a,
+                   GREATEST(sender_id, recipient_id) AS user_b
+            FROM inserted
+            ORDER BY recipient_id, message_id DESC
+        ),
+        upserted AS (
+            INSERT INTO conversations (
+                user_a_id, user_b_id, last_message_id, last_sender_id,
+                last_message_preview, last_message_at, unread_a, unread_b,
+                last_read_a, last_read_b
+            )
+            SELECT user_a, user_b, message_id, :sender_id,
+                   LEFT(body, :preview_length), timestamp,
+                   CASE WHEN recipient_id = user_a AND :sender_id <> user_a THEN received ELSE 0 END,
+                   CASE WHEN recipient_id = user_b AND :sender_id <> user_b THEN received ELSE 0 END,
+                   CASE WHEN :sender_id = user_a THEN message_id END,
+                   CASE WHEN :sender_id = user_b THEN message_id END
+            FROM latest
+            {CONVERSATION_UPSERT}
+        )
+        SELECT message_id, sender_id, recipient_id, body, timestamp
+        FROM inserted
+        ORDER BY message_id
+    """)
+    params = {
+        "sender_id": sender_id,
+        "recipient_ids": recipient_ids,
+        "bodies": bodies,
+        "preview_length": PREVIEW_LENGTH,
+    }
+    rows = insert_with_partition_retry(db, lambda: db.execute(statement, params).fetchall())
+    db.commit()
+
+    messages = [
+        MessageResponse(
+            message_id=row.message_id,
+            sender_id=row.sender_id,
+            recipient_id=row.recipient_id,
+            body=row.body,
+            timestamp=row.timestamp
+        )
+        for row in rows
+    ]
+    for message in messages:
+        recent_messages.append(_pair(sender_id, message.recipient_id), message)
+
+    sent_to = {message.recipient_id for message in messages}
+    invalid = sorted({recipient_id for recipient_id in recipient_ids if recipient_id not in sent_to})
+    logger.info(f"Bulk sent {len(messages)} messages from user {sender_id}, {len(invalid)} unknown recipients")
+    result = BulkSendResult(
+        sent=len(messages),
+        message_ids=[message.message_id for message in messages],
+        invalid_recipient_ids=invalid
+    )
+    return result, messages
+
+def publish_bulk_messages(messages: List[MessageResponse]) -> None:
+    """Notify both parties of each message of a bulk send; run after the response, outside its transaction."""
+    db = SessionLocal()
+    try:
+        message_hub.publish_many(
+            db,
+            [
+                ([message.sender_id, message.recipient_id], {"type": "message", "message": message.model_dump(mode="json")})
+                for message in messages
+            ]
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error publishing {len(messages)} bulk messages: {str(e)}")
+    finally:
+        db.close()
+
+def upsert_conversation(db: Session, message: Message) -> None:
+    """
+    Point the sender/recipient conversation row at a newly inserted message and bump the
+    recipient's unread counter. Sending also marks the conversation read for the sender.
+    Runs in the caller's transaction.
+    """
+    user_a, user_b = sorted((message.sender_id, message.recipient_id))
+    db.execute(
+        text(f"""
+            INSERT INTO conversations (
+                user_a_id, user_b_id, last_message_id, last_sender_id,
+                last_message_preview, last_message_at, unread_a, unread_b,
+                last_read_a, last_read_b
+            )
+            VALUES (
+                :user_a, :user_b, :message_id, :sender_id,
+                :preview, :timestamp, :unread_a, :unread_b,
+                CASE WHEN :sender_id = :user_a THEN :message_id END,
+                CASE WHEN :sender_id = :user_b THEN :message_id END
+            )
+            {CONVERSATION_UPSERT}
+        """),
+        {
+            "user_a": user_a,
+            "user_b": user_b,
+            "message_id": message.message_id,
+            "sender_id": message.sender_id,
+            "preview": message.body[:PREVIEW_LENGTH],
+            "timestamp": message.timestamp,
+            # Messages to yourself are never unread
+            "unread_a": int(message.recipient_id == user_a and message.sender_id != user_a),
+            "unread_b": int(message.recipient_id == user_b and message.sender_id != user_b),
+        }
+    )
+
+def mark_conversation_read(
+    db: Session, user_id: int, peer_id: int, up_to: Optional[int] = None
+) -> Optional[ReadReceipt]:
+    """
+    Move user_id's read watermark in the conversation with peer_id forward to up_to
+    (default: the latest message) and bring their unread counter in line.
+
+    Reading up to the latest message is a single-row update that zeroes the counter;
+    only a partial read counts the peer's messages past the watermark, via the pair index.
+    Watermarks never move backwards. Returns None if the two users have no conversation.
+    """
+    user_a, user_b = sorted((user_id, peer_id))
+    side = "a" if user_id == user_a else "b"
+    row = db.execute(
+        text(f"""
+            UPDATE conversations
+            SET last_read_{side} = GREATEST(
+                    COALESCE(last_read_{side}, 0),
+                    LEAST(COALESCE(:up_to, last_message_id), last_message_id)
+                ),
+                unread_{side} = CASE
+                    WHEN COALESCE(:up_to, last_message_id) >= last_message_id THEN 0
+                    ELSE (
+                        SELECT COUNT(*)
+                        FROM messages
+                        WHERE LEAST(sender_id, recipient_id) = :user_a
+                          AND GREATEST(sender_id, recipient_id) = :user_b
+                          AND sender_id = :peer_id
+                          AND message_id > GREATEST(COALESCE(last_read_{side}, 0), :up_to)
+                    )
+                END
+            WHERE user_a_id = :user_a AND user_b_id = :user_b
+            RETURNING last_read_{side} AS last_read_message_id, unread_{side} AS unread_count
+        """),
+        {"user_a": user_a, "user_b": user_b, "peer_id": peer_id, "up_to": up_to}
+    ).fetchone()
+    if row is None:
+        return None
+
+    receipt = ReadReceipt(
+        reader_id=user_id,
+        peer_id=peer_id,
+        last_read_message_id=row.last_read_message_id,
+        unread_count=row.unread_count
+    )
+    # Lets the peer show "seen" and the reader's other tabs clear their badge
+    message_hub.publish(db, [user_id, peer_id], {"type": "read", **receipt.model_dump(mode="json")})
+    db.commit()
+    return receipt
+
+def get_user_conversations(db: Session, user_id: int, limit: int = 20, offset: int = 0) -> List[ConversationSummary]:
+    """
+    A user's inbox, newest conversation first, in one query.
+
+    The user may be either side of a conversation row, so each side is read newest-first
+    from its own (user, last_message_at) index and the two short lists are merged.
+    """
+    window = limit + offset
+    rows = db.execute(
+        text("""
+            WITH inbox AS (
+                (
+                    SELECT user_b_id AS peer_id, unread_a AS unread_count,
+                           last_read_a AS last_read_message_id, last_read_b AS peer_last_read_message_id,
+                           last_message_id, last_sender_id, last_message_preview, last_message_at
+                    FROM conversations
+                    WHERE user_a_id = :user_id
+                    ORDER BY last_message_at DESC
+                    LIMIT :window
+                )
+                UNION ALL
+                (
+                    SELECT user_a_id, unread_b,
+                           last_read_b, last_read_a,
+                           last_message_id, last_sender_id, last_message_preview, last_message_at
+                    FROM conversations
+                    WHERE user_b_id = :user_id AND user_a_id <> :user_id
+                    ORDER BY last_message_at DESC
+                    LIMIT :window
+                )
+            )
+            SELECT inbox.*, user_profiles.name AS peer_name
+            FROM inbox
+            LEFT JOIN user_profiles ON user_profiles.user_id = inbox.peer_id
+            ORDER BY inbox.last_message_at DESC, inbox.last_message_id DESC
+            LIMIT :limit OFFSET :offset
+        """),
+        {"user_id": user_id, "window": window, "limit": limit, "offset": offset}
+    ).fetchall()
+
+    return [
+        ConversationSummary(
+            peer_id=row.peer_id,
+            peer_name=row.peer_name or f"User {row.peer_id}",
+            last_message=row.last_message_preview,
+            last_message_id=row.last_message_id,
+            last_sender_id=row.last_sender_id,
+            timestamp=row.last_message_at,
+            unread_count=row.unread_count,
+            last_read_message_id=row.last_read_message_id,
+            peer_last_read_message_id=row.peer_last_read_message_id
+        )
+        for row in rows
+    ]
+
+def get_conversation(
+    db: Session,
+    user_id: int,
+    peer_id: int,
+    limit: int = 20,
+    before: Optional[int] = None,
+    after: Optional[int] = None
+) -> List[MessageResponse]:
+    """
+    Retrieve one page of the conversation between two users, newest first.
+    
+    Pages are addressed by message-id cursors: `before` returns the messages older than
+    that message, `after` the ones newer than it (without either, the latest page).
+    Both are range scans on the (LEAST, GREATEST, timestamp, message_id) index, so any
+    page costs the same regardless of how long the conversation is. The cursor's timestamp
+    also bounds the scan, so only the monthly partitions on the requested side of it are
+    read. The latest page has no such bound: it relies on Postgres scanning the monthly
+    partitions in order, newest first, and stopping once it has `limit` rows, which only
+    holds while messages has no DEFAULT partition (see app/utils/message_partitions.py).
+    Pages within the newest messages of a recently read conversation are served from
+    recent_messages.
     
     Args:
         db: Database session
         user_id: ID of the first user
         peer_id: ID of the second user
         limit: Maximum number of messages to retrieve
+        before: Message id cursor for older messages
+        after: Message id cursor for newer messages
         
     Returns:
         List of MessageResponse objects
     """
     try:
-        # Validate users exist
-        user = db.query(User).filter(User.id == user_id).first()
-        peer = db.query(User).filter(User.id == peer_id).first()
+        pair = _pair(user_id, peer_id)
+        cached = recent_messages.get_page(pair, limit, before=before, after=after)
+        if cached is not None:
+            return cached
+        read_started = time.monotonic()
         
-        if not user or not peer:
-            logger.error(f"Invalid user IDs: user={user_id}, peer={peer_id}")
-            return []
+        params = {
+            "user_a": pair[0],
+            "user_b": pair[1],
+            "limit": limit,
+            "cursor": after if after is not None else before,
+        }
+        # The plain timestamp bound is redundant with the row comparison but lets
+        # Postgres prune partitions once the cursor's timestamp is known
+        if after is not None:
+            cursor_filter = """
+                  AND timestamp >= (SELECT timestamp FROM cursor)
+                  AND (timestamp, message_id) > (SELECT timestamp, message_id FROM cursor)
+            """
+            order = "ASC"
+        elif before is not None:
+            cursor_filter = """
+                  AND timestamp <= (SELECT timestamp FROM cursor)
+                  AND (timestamp, message_id) < (SELECT timestamp, message_id FROM cursor)
+            """
+            order = "DESC"
+        else:
+            cursor_filter = ""
+            order = "DESC"
         
-        # Get messages between the two users
-        messages = db.query(Message).filter(
-            ((Message.sender_id == user_id) & (Message.recipient_id == peer_id)) |
-            ((Message.sender_id == peer_id) & (Message.recipient_id == user_id))
-        ).order_by(desc(Message.timestamp)).limit(limit).all()
+        rows = db.execute(
+            text(f"""
+                WITH cursor AS (
+                    SELECT timestamp, message_id FROM messages WHERE message_id = :cursor
+                )
+                SELECT message_id, sender_id, recipient_id, body, timestamp
+                FROM messages
+                WHERE LEAST(sender_id, recipient_id) = :user_a
+                  AND GREATEST(sender_id, recipient_id) = :user_b
+                  {cursor_filter}
+                ORDER BY timestamp {order}, message_id {order}
+                LIMIT :limit
+            """),
+            params
+        ).fetchall()
+        if order == "ASC":
+            # Read oldest-first to take the page right after the cursor, return newest-first
+            rows = rows[::-1]
         
-        # Convert to response objects
-        result = []
-        for msg in messages:
-            result.append(MessageResponse(
-                message_id=msg.message_id,
-                sender_id=msg.sender_id,
-                recipient_id=msg.recipient_id,
-                body=msg.body,
-                timestamp=msg.timestamp
-            ))
+        result = [
+            MessageResponse(
+                message_id=row.message_id,
+                sender_id=row.sender_id,
+                recipient_id=row.recipient_id,
+                body=row.body,
+                timestamp=row.timestamp
+            )
+            for row in rows
+        ]
+        if before is None and after is None:
+            recent_messages.fill(pair, result, limit, read_started)
         
         logger.info(f"Retrieved {len(result)} messages between users {user_id} and {peer_id}")
         return result
@@ -117,6 +540,89 @@ def get_conversation(db: Session, user_id: int, peer_id: int, limit: int = 20) -
         logger.error(f"Error retrieving conversation: {str(e)}")
         return []
 
+# ts_headline markers, swapped for <mark> tags once the snippet is HTML-escaped
+_HIGHLIGHT_START = "\ue000"
+_HIGHLIGHT_STOP = "\ue001"
+HEADLINE_OPTIONS = f'StartSel="{_HIGHLIGHT_START}", StopSel="{_HIGHLIGHT_STOP}", MaxWords=30, MinWords=10, MaxFragments=2'
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet).replace(_HIGHLIGHT_START, "<mark>").replace(_HIGHLIGHT_STOP, "</mark>")
+
+def encode_search_cursor(rank: float, message_id: int) -> str:
+    return f"{rank!r}:{message_id}"
+
+def decode_search_cursor(cursor: str):
+    """(rank, message_id) of a next_cursor; raises ValueError if it is malformed."""
+    rank, message_id = cursor.split(":")
+    return float(rank), int(message_id)
+
+def search_messages(
+    db: Session, user_id: int, query: str, limit: int = 20, cursor: Optional[str] = None
+) -> MessageSearchPage:
+    """
+    Full-text search over the messages a user sent or received, best match first.
+
+    Matches come from the GIN index on messages.body_tsv, combined with the per-user
+    sender/recipient indexes, so only the user's own matching messages are ranked.
+    `query` uses web search syntax ("quoted phrases", or, -excluded). Pages are keyed
+    on (rank, message_id): pass the previous page's next_cursor to continue.
+    Snippets are HTML-escaped with the matched words wrapped in <mark>.
+    """
+    params = {"user_id": user_id, "query": query, "limit": limit, "options": HEADLINE_OPTIONS}
+    cursor_filter = ""
+    if cursor is not None:
+        params["cursor_rank"], params["cursor_id"] = decode_search_cursor(cursor)
+        cursor_filter = "AND (rank, message_id) < (CAST(:cursor_rank AS real), :cursor_id)"
+
+    rows = db.execute(
+        text(f"""
+            WITH matches AS (
+                SELECT message_id, sender_id, recipient_id, body, timestamp,
+                       ts_rank(body_tsv, search.query) AS rank
+                FROM messages, websearch_to_tsquery('simple', :query) AS search(query)
+                WHERE body_tsv @@ search.query
+                  AND (sender_id = :user_id OR recipient_id = :user_id)
+            ),
+            page AS (
+                SELECT *
+                FROM matches
+                WHERE TRUE {cursor_filter}
+                ORDER BY rank DESC, message_id DESC
+                LIMIT :limit
+            )
+            -- Headlines re-parse the body, so only the returned page gets them
+            SELECT page.message_id, page.sender_id, page.recipient_id, page.timestamp, page.rank,
+                   CASE WHEN page.sender_id = :user_id THEN page.recipient_id ELSE page.sender_id END AS peer_id,
+                   user_profiles.name AS peer_name,
+                   ts_headline('simple', page.body, websearch_to_tsquery('simple', :query), :options) AS snippet
+            FROM page
+            LEFT JOIN user_profiles ON user_profiles.user_id =
+                CASE WHEN page.sender_id = :user_id THEN page.recipient_id ELSE page.sender_id END
+            ORDER BY page.rank DESC, page.message_id DESC
+        """),
+        params
+    ).fetchall()
+
+    results = [
+        MessageSearchHit(
+            message_id=row.message_id,
+            sender_id=row.sender_id,
+            recipient_id=row.recipient_id,
+            peer_id=row.peer_id,
+            peer_name=row.peer_name or f"User {row.peer_id}",
+            timestamp=row.timestamp,
+            snippet=_highlight(row.snippet),
+            rank=row.rank
+        )
+        for row in rows
+    ]
+    next_cursor = None
+    if len(results) == limit:
+        next_cursor = encode_search_cursor(results[-1].rank, results[-1].message_id)
+
+    logger.info(f"Message search for user {user_id} returned {len(results)} results")
+    return MessageSearchPage(results=results, next_cursor=next_cursor)
+
 def get_user_suggested_peers(db: Session, user_id: int, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Get the top suggested peers for a user.
@@ -0,0 +1,254 @@
+import csv
+import json
+import logging
+import os
+import shutil
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default locations, relative to the repository root
+_REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CSV_PATH = os.getenv(
+    "OASIS_CSV_PATH",
+    str(_REPO_ROOT / "data_n_notebook" / "data" / "KnowlegdeBase" / "KnowledgeBase.csv"),
+)
+DEFAULT_CACHE_DIR = os.getenv(
+    "OASIS_CACHE_DIR",
+    str(_REPO_ROOT / "data_n_notebook" / "data" / "oasis_cache"),
+)
+
+# Trait columns stored as typed float32 columns, in a fixed order
+ROLE_SKILLS = [
+    "creativity",
+    "leadership",
+    "digital_literacy",
+    "critical_thinking",
+    "problem_solving",
+]
+COGNITIVE_TRAITS = [
+    "analytical_thinking",
+    "attention_to_detail",
+    "collaboration",
+    "adaptability",
+    "independence",
+    "evaluation",
+    "decision_making",
+    "stress_tolerance",
+]
+TRAIT_COLUMNS = ROLE_SKILLS + COGNITIVE_TRAITS
+
+# Candidate (normalized) column names for the occupation label
+LABEL_COLUMNS = ["oasis_label__final_x", "oasis_label__final", "label"]
+
+def normalize_column(name: str) -> str:
+    """Normalize a CSV header the same way the vector search parser normalizes field keys."""
+    return (
+        name.strip()
+        .replace(" ", "_")
+        .replace("-", "_")
+        .replace("__", "_")
+        .lower()
+    )
+
+def _source_signature(csv_path: str) -> Dict[str, object]:
+    stat = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+def _parse_float(value: Optional[str]) -> float:
+    try:
+        return float(value.strip())
+    except (ValueError, AttributeError):
+        return float("nan")
+
+def build_oasis_cache(csv_path: str = DEFAULT_CSV_PATH, cache_dir: str = DEFAULT_CACHE_DIR) -> "OasisTable":
+    """
+    Convert KnowledgeBase.csv into a memory-mappable columnar cache.
+
+    Layout of cache_dir:
+        meta.json         column names, trait columns, row count and source signature
+        codes.npy         oasis_code per row
+        doc_ids.npy       vector index document id per row (oasis-{code}-{concordance})
+        labels.npy        occupation label per row
+        traits.npy        float32 (rows, len(TRAIT_COLUMNS)), NaN where missing
+        code_order.npy    row indices sorted by oasis_code (the oasis_code index)
+        cells.bin         UTF-8 bytes of every raw cell, row-major
+        cell_offsets.npy  int64 offsets into cells.bin, rows * columns + 1 entries
+    """
+    logger.info(f"Building OaSIS columnar cache from {csv_path}")
+
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns: List[str] = list(reader.fieldnames or [])
+        normalized = {normalize_column(column): column for column in columns}
+
+        trait_sources = [normalized.get(trait) for trait in TRAIT_COLUMNS]
+        label_source = next((normalized[name] for name in LABEL_COLUMNS if name in normalized), None)
+
+        codes, doc_ids, labels, traits = [], [], [], []
+        cells = bytearray()
+        offsets = [0]
+
+        for i, row in enumerate(reader):
+            if not row or not row.get("oasis_code"):
+                continue
+
+            code = row["oasis_code"].strip()
+            codes.append(code)
+            doc_ids.append(f"oasis-{code}-{(row.get('Concordance number', str(i)) or '').strip()}")
+            labels.append((row.get(label_source) or "").strip() if label_source else "")
+            traits.append([_parse_float(row.get(source)) if source else float("nan") for source in trait_sources])
+
+            for column in columns:
+                cells += (row.get(column) or "").encode("utf-8")
+                offsets.append(len(cells))
+
+    tmp_dir = f"{cache_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    codes_array = np.array(codes, dtype=str)
+    np.save(os.path.join(tmp_dir, "codes.npy"), codes_array)
+    np.save(os.path.join(tmp_dir, "doc_ids.npy"), np.array(doc_ids, dtype=str))
+    np.save(os.path.join(tmp_dir, "labels.npy"), np.array(labels, dtype=str))
+    np.save(
+        os.path.join(tmp_dir, "traits.npy"),
+        np.array(traits, dtype=np.float32).reshape(len(codes), len(TRAIT_COLUMNS)),
+    )
+    np.save(os.path.join(tmp_dir, "code_order.npy"), np.argsort(codes_array, kind="stable"))
+    np.save(os.path.join(tmp_dir, "cell_offsets.npy"), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(tmp_dir, "cells.bin"), "wb") as f:
+        f.write(cells)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "columns": columns,
+                "trait_columns": TRAIT_COLUMNS,
+                "rows": len(codes),
+                "source": _source_signature(csv_path),
+            },
+            f,
+        )
+
+    # Swap the finished cache into place so readers never see a partial build
+    old_dir = f"{cache_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(cache_dir):
+        os.replace(cache_dir, old_dir)
+    os.replace(tmp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"OaSIS cache written to {cache_dir} ({len(codes)} rows, {len(columns)} columns)")
+    load_oasis_table.cache_clear()
+    return OasisTable(cache_dir)
+
+class OasisTable:
+    """Read-only, memory-mapped view of the OaSIS columnar cache."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.columns: List[str] = self.meta["columns"]
+        self.trait_columns: List[str] = self.meta["trait_columns"]
+        self.codes = np.load(os.path.join(cache_dir, "codes.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(cache_dir, "doc_ids.npy"), mmap_mode="r")
+        self.labels = np.load(os.path.join(cache_dir, "labels.npy"), mmap_mode="r")
+        self.traits = np.load(os.path.join(cache_dir, "traits.npy"), mmap_mode="r")
+        self._code_order = np.load(os.path.join(cache_dir, "code_order.npy"), mmap_mode="r")
+        self._sorted_codes = self.codes[self._code_order]
+        self._cell_offsets = np.load(os.path.join(cache_dir, "cell_offsets.npy"), mmap_mode="r")
+        cells_path = os.path.join(cache_dir, "cells.bin")
+        self._cells = (
+            np.memmap(cells_path, dtype=np.uint8, mode="r")
+            if os.path.getsize(cells_path)
+            else np.zeros(0, dtype=np.uint8)
+        )
+        self._trait_matrix: Optional[np.ndarray] = None
+        self._occupation_traits: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return int(self.meta["rows"])
+
+    def is_stale(self, csv_path: str) -> bool:
+        """True if csv_path exists and differs from the CSV this cache was built from."""
+        return os.path.exists(csv_path) and self.meta.get("source") != _source_signature(csv_path)
+
+    def indices_for(self, oasis_code: str) -> np.ndarray:
+        """Row indices for an oasis_code, via binary search on the sorted code index."""
+        left = np.searchsorted(self._sorted_codes, oasis_code, side="left")
+        right = np.searchsorted(self._sorted_codes, oasis_code, side="right")
+        return np.asarray(self._code_order[left:right])
+
+    def index_of(self, oasis_code: str) -> Optional[int]:
+        """First row index for an oasis_code, or None if the code is unknown."""
+        rows = self.indices_for(oasis_code)
+        return int(rows.min()) if len(rows) else None
+
+    def cell(self, row: int, column: int) -> str:
+        position = row * len(self.columns) + column
+        start, end = self._cell_offsets[position], self._cell_offsets[position + 1]
+        return bytes(self._cells[start:end]).decode("utf-8")
+
+    def row(self, row: int) -> Dict[str, str]:
+        """Rebuild the raw CSV row as a {column: value} dict."""
+        return {column: self.cell(row, i) for i, column in enumerate(self.columns)}
+
+    def iter_rows(self) -> Iterator[Dict[str, str]]:
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def trait_matrix(self) -> np.ndarray:
+        """Dense float32 trait matrix with missing values filled by the column mean."""
+        if self._trait_matrix is None:
+            matrix = np.array(self.traits, dtype=np.float32)
+            with warnings.catch_warnings():
+                # Columns that are entirely missing have no mean; they are filled with 0 below
+                warnings.simplefilter("ignore", RuntimeWarning)
+                means = np.nanmean(matrix, axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+            means = np.nan_to_num(means, nan=0.0)
+            missing = np.isnan(matrix)
+            matrix[missing] = np.take(means, np.nonzero(missing)[1])
+            self._trait_matrix = matrix
+        return self._trait_matrix
+
+    def occupation_traits(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        One trait vector per unique oasis_code: (sorted codes, labels, float32 vectors),
+        each vector being the mean over that occupation's concordance rows.
+        """
+        if self._occupation_traits is None:
+            codes, first_rows, inverse = np.unique(np.asarray(self.codes), return_index=True, return_inverse=True)
+            trait_matrix = self.trait_matrix()
+            vectors = np.zeros((len(codes), trait_matrix.shape[1]), dtype=np.float32)
+            np.add.at(vectors, inverse, trait_matrix)
+            vectors /= np.maximum(np.bincount(inverse, minlength=len(codes)), 1)[:, None]
+            self._occupation_traits = (codes, np.asarray(self.labels)[first_rows], vectors)
+        return self._occupation_traits
+
+@lru_cache(maxsize=4)
+def load_oasis_table(cache_dir: str = DEFAULT_CACHE_DIR, csv_path: Optional[str] = None) -> OasisTable:
+    """
+    Load the OaSIS cache, memoized per process.
+
+    If csv_path is given the cache is (re)built when missing or older than the CSV;
+    otherwise a missing cache raises FileNotFoundError.
+    """
+    if csv_path and (
+        not os.path.exists(os.path.join(cache_dir, "meta.json"))
+        or OasisTable(cache_dir).is_stale(csv_path)
+    ):
+        return build_oasis_cache(csv_path, cache_dir)
+
+    if not os.path.exists(os.path.join(cache_dir, "meta.json")):
+        raise FileNotFoundError(
+            f"OaSIS cache not found in {cache_dir}. Build it with: python backend/scripts/build_oasis_cache.py"
+        )
+    return OasisTable(cache_dir)
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .oasis_cache import DEFAULT_CACHE_DIR, load_oasis_table
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SIMILARITY_GRAPH = "knn"
+SKILL_GAP_NEIGHBORS = 8
+
+def knn_csr(
+    vectors: np.ndarray, k: int, metric: str = "cosine", block_size: int = 1024
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Exact k-nearest-neighbour graph over the rows of `vectors`, as CSR arrays.
+
+    Returns (indptr, indices, weights). For "cosine" the weights are similarities sorted
+    descending; for "euclidean" they are distances sorted ascending. Rows are processed
+    in blocks so memory stays at block_size * n floats.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    k = max(0, min(k, n - 1))
+
+    if metric == "cosine":
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+    elif metric != "euclidean":
+        raise ValueError(f"Unsupported metric: {metric}")
+    squared_norms = np.einsum("ij,ij->i", vectors, vectors)
+
+    indices = np.empty((n, k), dtype=np.int32)
+    weights = np.empty((n, k), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        products = vectors[start:stop] @ vectors.T
+        if metric == "cosine":
+            # Negate so that "smallest" always means "closest"
+            scores = -products
+        else:
+            scores = squared_norms[start:stop, None] + squared_norms[None, :] - 2 * products
+        scores[np.arange(stop - start), np.arange(start, stop)] = np.inf  # no self loops
+
+        if k == 0:
+            continue
+        nearest = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        nearest_scores = np.take_along_axis(scores, nearest, axis=1)
+        order = np.argsort(nearest_scores, axis=1)
+        indices[start:stop] = np.take_along_axis(nearest, order, axis=1)
+        nearest_scores = np.take_along_axis(nearest_scores, order, axis=1)
+        if metric == "cosine":
+            weights[start:stop] = -nearest_scores
+        else:
+            weights[start:stop] = np.sqrt(np.maximum(nearest_scores, 0))
+
+    indptr = np.arange(0, n * k + 1, k, dtype=np.int64) if n else np.zeros(1, dtype=np.int64)
+    return indptr, indices.reshape(-1), weights.reshape(-1)
+
+class CSRGraph:
+    """Occupation graph over unique oasis codes, stored as CSR adjacency arrays."""
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        labels: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        vectors: Optional[np.ndarray] = None,
+    ):
+        self.codes = codes
+        self.labels = labels
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        # Node feature vectors, only kept for graphs searched with A*
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def index_of(self, oasis_code: str) -> Optional[int]:
+        """Node index of an oasis_code; codes are stored sorted, so this is a binary search."""
+        position = int(np.searchsorted(self.codes, oasis_code))
+        if position < len(self.codes) and self.codes[position] == oasis_code:
+            return position
+        return None
+
+    def neighbors(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbour indices, edge weights) of a node, an O(k) slice of the CSR arrays."""
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+def save_graph(graph: CSRGraph, name: str, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+    """Write a graph next to the OaSIS cache as {name}_*.npy files."""
+    os.makedirs(cache_dir, exist_ok=True)
+    for part in ("codes", "labels", "indptr", "indices", "weights"):
+        # Write to a temp file and swap it in so a running API never loads a partial array
+        path = os.path.join(cache_dir, f"{name}_{part}.npy")
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, getattr(graph, part))
+        os.replace(tmp_path, path)
+    load_graph.cache_clear()
+    logger.info(f"Saved {name} graph with {len(graph)} nodes and {len(graph.indices)} edges to {cache_dir}")
+
+@lru_cache(maxsize=4)
+def load_graph(name: str, cache_dir: str = DEFAULT_CACHE_DIR) -> CSRGraph:
+    """Memory-map a graph written by save_graph, memoized per process."""
+    parts = {
+        part: np.load(os.path.join(cache_dir, f"{name}_{part}.npy"), mmap_mode="r")
+        for part in ("codes", "labels", "indptr", "indices", "weights")
+    }
+    return CSRGraph(**parts)
+
+def symmetrize_csr(
+    n: int, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Make a directed kNN graph undirected: keep edge i-j if either endpoint lists the other."""
+    rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    all_rows = np.concatenate([rows, indices])
+    all_cols = np.concatenate([indices, rows])
+    all_weights = np.concatenate([weights, weights])
+
+    order = np.lexsort((all_cols, all_rows))
+    all_rows, all_cols, all_weights = all_rows[order], all_cols[order], all_weights[order]
+    keep = np.ones(len(all_rows), dtype=bool)
+    keep[1:] = (all_rows[1:] != all_rows[:-1]) | (all_cols[1:] != all_cols[:-1])
+
+    all_rows, all_cols, all_weights = all_rows[keep], all_cols[keep], all_weights[keep]
+    new_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(all_rows, minlength=n), out=new_indptr[1:])
+    return new_indptr, all_cols.astype(np.int32), all_weights.astype(np.float32)
+
+@lru_cache(maxsize=1)
+def load_skill_gap_graph(cache_dir: str = DEFAULT_CACHE_DIR, k: int = SKILL_GAP_NEIGHBORS) -> CSRGraph:
+    """
+    Undirected occupation graph whose edges join each occupation to its k closest
+    occupations in trait space, weighted by the Euclidean trait-vector distance.
+
+    Built in memory from the OaSIS cache on first use (a few milliseconds for the
+    full taxonomy) and memoized per process.
+    """
+    codes, labels, vectors = load_oasis_table(cache_dir).occupation_traits()
+
+    indptr, indices, weights = knn_csr(vectors, k, metric="euclidean")
+    indptr, indices, weights = symmetrize_csr(len(codes), indptr, indices, weights)
+    # Recompute edge weights exactly so they agree with the A* straight-line heuristic
+    rows = np.repeat(np.arange(len(codes)), np.diff(indptr))
+    weights = np.linalg.norm(vectors[rows] - vectors[indices], axis=1).astype(np.float32)
+    logger.info(f"Built skill-gap graph with {len(codes)} occupations and {len(indices)} edges")
+    return CSRGraph(codes, labels, indptr, indices, weights, vectors)
+
+def shortest_path(graph: CSRGraph, source: int, target: int) -> Optional[Tuple[float, List[int]]]:
+    """
+    A* search from source to target. Returns (total weight, node path) or None if unreachable.
+
+    When the graph carries node vectors the straight-line distance to the target is used
+    as the heuristic; it never overestimates because edge weights are Euclidean distances
+    between the same vectors. Without vectors this is plain Dijkstra.
+    """
+    if graph.vectors is not None:
+        remaining = np.linalg.norm(graph.vectors - graph.vectors[target], axis=1).tolist()
+    else:
+        remaining = [0.0] * len(graph)
+
+    best = {source: 0.0}
+    previous = {}
+    frontier = [(remaining[source], 0.0, source)]
+    closed = set()
+
+    while frontier:
+        _, cost, node = heapq.heappop(frontier)
+        if node == target:
+            path = [node]
+            while node in previous:
+                node = previous[node]
+                path.append(node)
+            return cost, path[::-1]
+        if node in closed:
+            continue
+        closed.add(node)
+
+        neighbors, weights = graph.neighbors(node)
+        for neighbor, weight in zip(neighbors.tolist(), weights.tolist()):
+            new_cost = cost + weight
+            if new_cost < best.get(neighbor, float("inf")):
+                best[neighbor] = new_cost
+                previous[neighbor] = node
+                heapq.heappush(frontier, (new_cost + remaining[neighbor], new_cost, neighbor))
+
+    return None
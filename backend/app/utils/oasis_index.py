@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "oasis-minilm-index"
+
+# Pointer file naming the live namespace of the OaSIS index. Ingestion writes a new
+# versioned namespace and only flips this pointer once the new version is validated.
+_REPO_ROOT = Path(__file__).resolve().parents[3]
+POINTER_PATH = os.getenv(
+    "OASIS_INDEX_POINTER",
+    str(_REPO_ROOT / "data_n_notebook" / "data" / "oasis_index_pointer.json"),
+)
+
+_pointer_cache: Tuple[Optional[float], Dict[str, Any]] = (None, {})
+
+def new_version_name() -> str:
+    """Namespace name for a fresh index version, e.g. v20250418T101019."""
+    return datetime.now(timezone.utc).strftime("v%Y%m%dT%H%M%S")
+
+def read_pointer(path: str = POINTER_PATH) -> Dict[str, Any]:
+    """Return the pointer state: {"active", "previous", "pending", "history"}."""
+    if not os.path.exists(path):
+        return {"active": "", "previous": None, "pending": None, "history": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_pointer(state: Dict[str, Any], path: str) -> None:
+    # os.replace is atomic, so readers see either the old or the new pointer
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def set_pending_namespace(namespace: Optional[str], path: str = POINTER_PATH) -> Dict[str, Any]:
+    """Record the version currently being built so an interrupted ingestion can resume it."""
+    state = read_pointer(path)
+    state["pending"] = namespace
+    _write_pointer(state, path)
+    return state
+
+def activate_namespace(namespace: str, path: str = POINTER_PATH) -> Dict[str, Any]:
+    """Make namespace live, keeping the current one as the rollback target."""
+    state = read_pointer(path)
+    if state.get("active") != namespace:
+        state["previous"] = state.get("active")
+        state["active"] = namespace
+    if state.get("pending") == namespace:
+        state["pending"] = None
+    state.setdefault("history", []).append(
+        {"namespace": namespace, "activated_at": datetime.now(timezone.utc).isoformat()}
+    )
+    _write_pointer(state, path)
+    logger.info(f"Activated OaSIS namespace {namespace!r} (previous: {state.get('previous')!r})")
+    return state
+
+def rollback_namespace(path: str = POINTER_PATH) -> Dict[str, Any]:
+    """Swap the active and previous namespaces."""
+    state = read_pointer(path)
+    if state.get("previous") is None:
+        raise ValueError("No previous OaSIS namespace to roll back to")
+    state["active"], state["previous"] = state["previous"], state.get("active")
+    state.setdefault("history", []).append(
+        {"namespace": state["active"], "activated_at": datetime.now(timezone.utc).isoformat(), "rollback": True}
+    )
+    _write_pointer(state, path)
+    logger.info(f"Rolled back OaSIS namespace to {state['active']!r}")
+    return state
+
+def get_active_namespace(path: str = POINTER_PATH) -> str:
+    """
+    Live namespace for searches.
+
+    OASIS_NAMESPACE pins a version explicitly; otherwise the pointer file is re-read
+    whenever its mtime changes, so a switch or rollback takes effect on the next request.
+    """
+    pinned = os.getenv("OASIS_NAMESPACE")
+    if pinned is not None:
+        return pinned
+
+    global _pointer_cache
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return ""
+
+    cached_mtime, state = _pointer_cache
+    if cached_mtime != mtime:
+        try:
+            state = read_pointer(path)
+            _pointer_cache = (mtime, state)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable OaSIS index pointer {path}: {str(e)}")
+    return state.get("active", "") or ""
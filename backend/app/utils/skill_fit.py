@@ -0,0 +1,60 @@
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .oasis_cache import COGNITIVE_TRAITS, ROLE_SKILLS, TRAIT_COLUMNS
+
+# Skills and traits are rated on a 0-5 scale, so no per-dimension gap exceeds this
+SKILL_SCALE_MAX = 5.0
+
+def to_vector(values: Dict[str, Optional[float]], columns: Iterable[str] = TRAIT_COLUMNS) -> np.ndarray:
+    """float32 vector in `columns` order, NaN where a value is missing."""
+    return np.array(
+        [values.get(column) if values.get(column) is not None else np.nan for column in columns],
+        dtype=np.float32,
+    )
+
+# SavedRecommendation attributes holding each of TRAIT_COLUMNS, in the same order
+SAVED_RECOMMENDATION_COLUMNS = [f"role_{skill}" for skill in ROLE_SKILLS] + COGNITIVE_TRAITS
+
+def saved_recommendation_matrix(recommendations: Sequence[Any]) -> np.ndarray:
+    """float32 (rows, len(TRAIT_COLUMNS)) matrix of saved recommendations (or rows with the same attributes), NaN where missing."""
+    matrix = np.array(
+        [[getattr(rec, column) for column in SAVED_RECOMMENDATION_COLUMNS] for rec in recommendations],
+        dtype=np.float64,
+    ).reshape(len(recommendations), len(SAVED_RECOMMENDATION_COLUMNS))
+    return matrix.astype(np.float32)
+
+def fit_scores(
+    user_vector: np.ndarray, matrix: np.ndarray, weights: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score every row of `matrix` against one user vector in a single vectorized pass.
+
+    Returns (gaps, fit): gaps is matrix - user_vector (positive where the role asks for
+    more than the user has, NaN where either side is missing) and fit is
+    1 - weighted RMS gap / SKILL_SCALE_MAX, in [0, 1]. Rows without any comparable
+    dimension get a NaN fit.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    gaps = matrix - np.asarray(user_vector, dtype=np.float32)[None, :]
+
+    comparable = ~np.isnan(gaps)
+    dimension_weights = np.ones(gaps.shape[1], dtype=np.float32) if weights is None else weights
+    row_weights = np.where(comparable, dimension_weights[None, :], 0.0)
+    squared = np.where(comparable, gaps * gaps, 0.0)
+
+    total_weight = row_weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rms = np.sqrt((row_weights * squared).sum(axis=1) / total_weight)
+    fit = np.where(total_weight > 0, 1.0 - rms / SKILL_SCALE_MAX, np.nan)
+    return gaps, fit
+
+def top_k(fit: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best fits, best first, ignoring NaN fits."""
+    ranked = np.where(np.isnan(fit), -np.inf, fit)
+    k = min(k, int(np.count_nonzero(~np.isnan(fit))))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-ranked, k - 1)[:k]
+    return candidates[np.argsort(-ranked[candidates], kind="stable")]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure how often chat turns get occupation context from OccupationRetriever.
+
+Simulates N students chatting concurrently against the retriever, with the Pinecone
+search replaced by a sleep drawn from a log-normal latency distribution (median and p95
+configurable, defaults typical of a hosted index with integrated embedding). Reports
+the share of turns that went out with context, how it was obtained and how many
+searches missed the latency budget. Needs neither Pinecone nor the database:
+
+    python scripts/benchmark_occupation_context.py --students 50 --turns 8 --median-ms 150 --p95-ms 400
+"""
+
+import sys
+import argparse
+import asyncio
+import logging
+import math
+import random
+import time
+from pathlib import Path
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.services.occupation_context import OccupationRetriever
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# What students type: mostly new content, with content-free follow-ups in between
+MESSAGES = [
+    "I think I want to study computer science but I'm not sure.",
+    "I really like helping people and solving puzzles.",
+    "My parents want me to become a doctor.",
+    "I enjoy drawing and designing things on my laptop.",
+    "I loved building things with Lego when I was younger.",
+    "Could I work outdoors with animals?",
+    "I'm good at math but I find physics boring.",
+    "What does a nurse do all day?",
+    "I like video games, could that be a job?",
+    "Is accounting a stable career?",
+    "I volunteer at the hospital on weekends.",
+    "I want to travel and speak languages.",
+]
+FOLLOW_UPS = ["yes", "okay", "tell me more", "why?", "sure, and then?"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Simulate chat turns against the occupation retriever')
+
+    parser.add_argument('--students', '-n', type=int, default=50, help='Concurrent students')
+    parser.add_argument('--turns', '-t', type=int, default=8, help='Messages sent by each student')
+    parser.add_argument('--median-ms', type=float, default=150.0, help='Median search latency')
+    parser.add_argument('--p95-ms', type=float, default=400.0, help='95th percentile search latency')
+    parser.add_argument('--budget-ms', type=float, default=20.0, help='Retriever latency budget')
+    parser.add_argument('--think-time-ms', type=float, default=2000.0, help='Mean pause between turns (exponential)')
+    parser.add_argument('--follow-up-rate', type=float, default=0.3, help='Share of turns without content words')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+    return parser.parse_args()
+
+def latency_sampler(median_ms: float, p95_ms: float, rng: random.Random):
+    mu = math.log(median_ms / 1000.0)
+    sigma = max(math.log(p95_ms / median_ms) / 1.645, 1e-6)
+    return lambda: rng.lognormvariate(mu, sigma)
+
+async def student(retriever: OccupationRetriever, user_id: int, args, rng: random.Random, served: list):
+    for _ in range(args.turns):
+        text = rng.choice(FOLLOW_UPS) if rng.random() < args.follow_up_rate else rng.choice(MESSAGES)
+        context = await retriever.retrieve(user_id, text)
+        served.append(context is not None)
+        await asyncio.sleep(rng.expovariate(1000.0 / args.think_time_ms))
+
+async def run(args) -> int:
+    rng = random.Random(args.seed)
+    sample_latency = latency_sampler(args.median_ms, args.p95_ms, rng)
+
+    def fake_query(text):
+        time.sleep(sample_latency())
+        return [{"_id": f"oasis-{abs(hash(text)) % 100000:05d}.00", "fields": {"text": text}}]
+
+    retriever = OccupationRetriever(budget_seconds=args.budget_ms / 1000.0)
+    retriever.enabled = True
+    retriever._query = fake_query
+
+    served = []
+    started = time.perf_counter()
+    await asyncio.gather(*(student(retriever, user_id, args, rng, served) for user_id in range(args.students)))
+    elapsed = time.perf_counter() - started
+
+    stats = retriever.stats
+    searched = stats["fresh"] + stats["over_budget"]
+    logger.info(f"{len(served)} turns in {elapsed:.1f}s, search latency median {args.median_ms:.0f} ms / p95 {args.p95_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+    logger.info(f"Turns with context: {sum(served) / len(served):.1%}")
+    logger.info(f"  reused without searching: {stats['reused'] / len(served):.1%}")
+    logger.info(f"  fresh search within budget: {stats['fresh'] / len(served):.1%}")
+    logger.info(f"  previous result while the search ran late: {stats['stale'] / len(served):.1%}")
+    logger.info(f"Turns without context (cold): {stats['cold'] / len(served):.1%}")
+    logger.info(f"Searches over budget: {stats['over_budget'] / max(searched, 1):.1%} of {searched}")
+    return 0
+
+def main():
+    return asyncio.run(run(parse_args()))
+
+if __name__ == "__main__":
+    sys.exit(main())
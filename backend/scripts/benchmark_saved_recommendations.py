@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Count the SQL statements and time GET /space/recommendations takes per request.
+
+Creates a throwaway user with N saved recommendations (and notes on each) for every N
+in --sizes, lists them as the endpoint does and reports the statements it issued. The
+count should stay the same whatever N is. Everything runs inside one transaction that
+is rolled back, so the database is left unchanged.
+
+    python scripts/benchmark_saved_recommendations.py --sizes 1,10,50,200
+"""
+
+import sys
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.utils.database import engine
+from app.models import User, SavedRecommendation, UserNote, UserSkill
+from app.routers.space import list_saved_recommendations
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure queries per request of the saved recommendations listing')
+
+    parser.add_argument('--sizes', type=str, default='1,10,50,200', help='Comma-separated numbers of saved recommendations')
+    parser.add_argument('--notes-per-recommendation', type=int, default=2, help='Notes attached to each recommendation')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per size')
+
+    return parser.parse_args()
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def seed_user(db: Session, recommendations: int, notes_per_recommendation: int) -> User:
+    user = User(email=f"benchmark-{uuid.uuid4().hex[:12]}@example.com", hashed_password="not-a-real-hash")
+    db.add(user)
+    db.flush()
+    db.add(UserSkill(user_id=user.id, creativity=3, leadership=4, digital_literacy=2, critical_thinking=5, problem_solving=3))
+    for i in range(recommendations):
+        recommendation = SavedRecommendation(
+            user_id=user.id,
+            oasis_code=f"BENCH.{i:05d}",
+            label=f"Benchmark occupation {i}",
+            description="Synthetic recommendation",
+            role_creativity=i % 5 + 1,
+            role_leadership=(i + 1) % 5 + 1,
+            role_digital_literacy=(i + 2) % 5 + 1,
+            role_critical_thinking=(i + 3) % 5 + 1,
+            role_problem_solving=(i + 4) % 5 + 1,
+            all_fields={"note": "x" * 2000}
+        )
+        db.add(recommendation)
+        db.flush()
+        for j in range(notes_per_recommendation):
+            db.add(UserNote(user_id=user.id, saved_recommendation_id=recommendation.id, content=f"Note {j}"))
+    db.flush()
+    return user
+
+def measure(db: Session, user: User, repeat: int):
+    counter = StatementCounter()
+    timings = []
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        for _ in range(repeat):
+            # Fresh identity map, as in a real request
+            db.expire_all()
+            started = time.perf_counter()
+            result, _ = list_saved_recommendations(db, user)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    return len(result), counter.count / repeat, statistics.median(timings)
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    # The route logs one line per request; keep the report readable
+    logging.getLogger("app.routers.space").setLevel(logging.WARNING)
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        logger.info(f"{'saved':>8} {'returned':>9} {'queries/request':>16} {'median ms':>10}")
+        for size in sizes:
+            user = seed_user(db, size, args.notes_per_recommendation)
+            returned, queries, median_ms = measure(db, user, args.repeat)
+            logger.info(f"{size:>8} {returned:>9} {queries:>16.1f} {median_ms:>10.1f}")
+        return 0
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.utils.oasis_cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CSV_PATH,
+    build_oasis_cache,
+    load_oasis_table
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Convert KnowledgeBase.csv into the OaSIS columnar cache')
+    
+    parser.add_argument(
+        '--csv', '-c',
+        type=str,
+        default=DEFAULT_CSV_PATH,
+        help='Path to KnowledgeBase.csv'
+    )
+    
+    parser.add_argument(
+        '--cache-dir', '-d',
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help='Directory to write the cache into'
+    )
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    
+    try:
+        started = time.perf_counter()
+        table = build_oasis_cache(args.csv, args.cache_dir)
+        logger.info(f"Built cache with {len(table)} rows in {time.perf_counter() - started:.2f}s")
+        
+        load_oasis_table.cache_clear()
+        started = time.perf_counter()
+        table = load_oasis_table(args.cache_dir)
+        table.trait_matrix()
+        logger.info(f"Cache loads in {(time.perf_counter() - started) * 1000:.1f}ms")
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return 1
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.utils.oasis_cache import DEFAULT_CACHE_DIR, load_oasis_table
+from app.utils.oasis_graph import SIMILARITY_GRAPH, CSRGraph, knn_csr, save_graph
+from app.utils.oasis_index import INDEX_NAME, get_active_namespace
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = 100
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build the occupation-to-occupation kNN graph')
+    
+    parser.add_argument(
+        '--k', '-k',
+        type=int,
+        default=20,
+        help='Neighbours stored per occupation'
+    )
+    
+    parser.add_argument(
+        '--source', '-s',
+        type=str,
+        choices=['pinecone', 'local'],
+        default='pinecone',
+        help='Fetch vectors from the live Pinecone namespace or embed locally'
+    )
+    
+    parser.add_argument(
+        '--model', '-m',
+        type=str,
+        default='sentence-transformers/all-MiniLM-L6-v2',
+        help='Sentence transformer model used with --source local'
+    )
+    
+    parser.add_argument(
+        '--cache-dir', '-d',
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help='OaSIS cache directory (the graph is written next to it)'
+    )
+    
+    return parser.parse_args()
+
+def fetch_pinecone_vectors(doc_ids):
+    """Fetch the stored embedding of every document from the live namespace."""
+    from pinecone import Pinecone
+    
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index = pc.Index(INDEX_NAME)
+    namespace = get_active_namespace()
+    
+    vectors = {}
+    for start in range(0, len(doc_ids), FETCH_BATCH_SIZE):
+        response = index.fetch(ids=doc_ids[start:start + FETCH_BATCH_SIZE], namespace=namespace)
+        for doc_id, vector in response.vectors.items():
+            vectors[doc_id] = vector.values
+    
+    missing = [doc_id for doc_id in doc_ids if doc_id not in vectors]
+    if missing:
+        raise ValueError(f"{len(missing)} documents have no vector in namespace {namespace!r}, e.g. {missing[0]}")
+    return np.array([vectors[doc_id] for doc_id in doc_ids], dtype=np.float32)
+
+def embed_locally(table, model_name):
+    """Embed every row's text with a local sentence transformer."""
+    from app.utils.embeddings import get_embedding_model
+    
+    model = get_embedding_model(model_name)
+    texts = [
+        ". ".join(f"{key}: {value}" for key, value in row.items() if value and value.strip() not in {"", "nan"})
+        for row in table.iter_rows()
+    ]
+    return np.asarray(model.encode(texts, batch_size=64, show_progress_bar=True), dtype=np.float32)
+
+def main():
+    args = parse_args()
+    
+    try:
+        table = load_oasis_table(args.cache_dir)
+        doc_ids = [str(doc_id) for doc_id in table.doc_ids]
+        logger.info(f"Loading vectors for {len(doc_ids)} OaSIS rows from {args.source}")
+        
+        if args.source == 'pinecone':
+            row_vectors = fetch_pinecone_vectors(doc_ids)
+        else:
+            row_vectors = embed_locally(table, args.model)
+        
+        # One node per occupation: average the (normalized) vectors of its concordance rows
+        row_vectors /= np.maximum(np.linalg.norm(row_vectors, axis=1, keepdims=True), 1e-12)
+        codes, first_rows, inverse = np.unique(np.asarray(table.codes), return_index=True, return_inverse=True)
+        node_vectors = np.zeros((len(codes), row_vectors.shape[1]), dtype=np.float32)
+        np.add.at(node_vectors, inverse, row_vectors)
+        
+        started = time.perf_counter()
+        indptr, indices, weights = knn_csr(node_vectors, args.k, metric='cosine')
+        logger.info(f"Computed {args.k}-NN graph over {len(codes)} occupations in {time.perf_counter() - started:.2f}s")
+        
+        labels = np.asarray(table.labels)[first_rows]
+        save_graph(CSRGraph(codes, labels, indptr, indices, weights), SIMILARITY_GRAPH, args.cache_dir)
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return 1
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
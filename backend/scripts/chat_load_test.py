@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Load test for the chat endpoints.
+
+Drives N concurrent simulated students through multi-turn conversations against a
+running API and reports throughput, latency percentiles, rejections and event-loop lag
+(on the client, and on the server via GET /chat/metrics). Run the API against
+scripts/llm_stub_server.py to test offline:
+
+    python scripts/llm_stub_server.py --latency-ms 800 &
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn app.main:app &
+    python scripts/chat_load_test.py --students 30 --turns 5
+"""
+
+import sys
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.services.loop_monitor import EventLoopLagMonitor
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+PROMPTS = [
+    "I think I want to study computer science but I'm not sure.",
+    "I really like helping people and solving puzzles.",
+    "My parents want me to become a doctor.",
+    "I enjoy drawing and designing things on my laptop.",
+    "I don't know what I'm good at.",
+    "I loved building things with Lego when I was younger.",
+    "Maybe I should take a gap year first?",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the chat endpoints with simulated students')
+
+    parser.add_argument('--base-url', type=str, default='http://localhost:8000', help='API base URL')
+    parser.add_argument('--students', '-n', type=int, default=30, help='Number of concurrent students')
+    parser.add_argument('--turns', '-t', type=int, default=5, help='Messages sent by each student')
+    parser.add_argument(
+        '--think-time-ms',
+        type=float,
+        default=1000.0,
+        help='Mean pause between a reply and the next message (exponentially distributed)'
+    )
+    parser.add_argument('--ramp-up-s', type=float, default=0.0, help='Spread student start times over this many seconds')
+    parser.add_argument('--stream', action='store_true', help='Use /chat/send/stream and measure time to first token')
+    parser.add_argument('--email-prefix', type=str, default='loadtest', help='Prefix of the synthetic student accounts')
+    parser.add_argument('--password', type=str, default='loadtest-password', help='Password of the synthetic accounts')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--clear', action='store_true', help='Clear each student history before starting')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+
+    return parser.parse_args()
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+class Results:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, status: str, latency: Optional[float] = None, first_token: Optional[float] = None):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if first_token is not None:
+            self.first_token.append(first_token)
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """Log in a synthetic student, registering the account on first use."""
+    response = await client.post("/users/login", json={"email": email, "password": password})
+    if response.status_code != 200:
+        register = await client.post("/users/register", json={"email": email, "password": password})
+        if register.status_code not in (200, 400):
+            raise RuntimeError(f"Could not register {email}: {register.status_code} {register.text}")
+        response = await client.post("/users/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def send_turn(client: httpx.AsyncClient, headers: Dict[str, str], text: str, stream: bool, results: Results):
+    started = time.perf_counter()
+    try:
+        if not stream:
+            response = await client.post("/chat/send", json={"text": text}, headers=headers)
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                results.record("ok", elapsed)
+            else:
+                results.record(str(response.status_code))
+            return
+
+        first_token = None
+        status = "stream_incomplete"
+        async with client.stream("POST", "/chat/send/stream", json={"text": text}, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                results.record(str(response.status_code))
+                return
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    if event is None and first_token is None:
+                        first_token = time.perf_counter() - started
+                    elif event == "done":
+                        status = "ok"
+                    elif event == "error":
+                        detail = json.loads(line[len("data: "):])
+                        status = "stream_error_429" if "retry_after" in detail else "stream_error"
+                elif not line:
+                    event = None
+        elapsed = time.perf_counter() - started
+        results.record(status, elapsed if status == "ok" else None, first_token)
+    except httpx.HTTPError as e:
+        logger.debug(f"Request failed: {str(e)}")
+        results.record(type(e).__name__)
+
+async def run_student(index: int, args, client: httpx.AsyncClient, results: Results, rng: random.Random):
+    await asyncio.sleep(args.ramp_up_s * index / max(args.students, 1))
+    token = await login(client, f"{args.email_prefix}+{index}@example.com", args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+    if args.clear:
+        await client.post("/chat/clear", headers=headers)
+
+    for _ in range(args.turns):
+        await send_turn(client, headers, rng.choice(PROMPTS), args.stream, results)
+        if args.think_time_ms > 0:
+            await asyncio.sleep(rng.expovariate(1000.0 / args.think_time_ms))
+
+async def run(args) -> int:
+    rng = random.Random(args.seed)
+    results = Results()
+    monitor = EventLoopLagMonitor(interval=0.05, samples=100000, warn_ms=float("inf"))
+
+    limits = httpx.Limits(max_connections=args.students * 2, max_keepalive_connections=args.students * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await monitor.start()
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *(run_student(i, args, client, results, rng) for i in range(args.students)),
+            return_exceptions=True
+        )
+        duration = time.perf_counter() - started
+        await monitor.stop()
+
+        failed_students = [o for o in outcomes if isinstance(o, Exception)]
+        for error in failed_students[:5]:
+            logger.error(f"Student failed: {error}")
+
+        server_metrics = None
+        try:
+            token = await login(client, f"{args.email_prefix}+0@example.com", args.password)
+            response = await client.get("/chat/metrics", headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 200:
+                server_metrics = response.json()
+        except (httpx.HTTPError, RuntimeError):
+            pass
+
+    ok = results.statuses.get("ok", 0)
+    total = sum(results.statuses.values())
+    logger.info("=" * 60)
+    logger.info(f"Students: {args.students}, turns each: {args.turns}, streaming: {args.stream}")
+    logger.info(f"Requests: {total} in {duration:.1f}s, {ok} ok ({ok / duration:.2f} replies/s)")
+    logger.info(f"Outcomes: {results.statuses}")
+    if failed_students:
+        logger.info(f"Students that could not run: {len(failed_students)}")
+    logger.info(
+        "Latency (s): "
+        f"p50={percentile(results.latencies, 0.50):.3f} "
+        f"p95={percentile(results.latencies, 0.95):.3f} "
+        f"p99={percentile(results.latencies, 0.99):.3f} "
+        f"max={percentile(results.latencies, 1.0):.3f}"
+    )
+    if results.first_token:
+        logger.info(
+            "Time to first token (s): "
+            f"p50={percentile(results.first_token, 0.50):.3f} "
+            f"p95={percentile(results.first_token, 0.95):.3f} "
+            f"p99={percentile(results.first_token, 0.99):.3f}"
+        )
+    logger.info(f"Client event loop lag (ms): {monitor.metrics()}")
+    if server_metrics:
+        logger.info(f"Server event loop lag (ms): {server_metrics.get('event_loop')}")
+        logger.info(f"Server LLM gate: {server_metrics.get('llm')}")
+    return 0 if ok else 1
+
+def main():
+    args = parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
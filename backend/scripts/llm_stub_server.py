@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for load testing the chat endpoints.
+
+Serves POST /v1/chat/completions (plain and streaming) with a configurable latency
+distribution and injected failures, so /chat/send can be driven at classroom scale
+without a real provider. Point the API at it with:
+
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+"""
+
+import sys
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+REPLIES = [
+    "What draws you to that idea?",
+    "Why do you think that matters to you?",
+    "How would you know you had succeeded?",
+    "What would your favorite character do in your place?",
+    "Which part of that feels most exciting, and which feels uncertain?",
+    "Can you think of a time you felt that way before?",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run a local OpenAI-compatible chat completion stub')
+
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind')
+    parser.add_argument('--port', type=int, default=8100, help='Port to bind')
+    parser.add_argument(
+        '--latency-ms',
+        type=float,
+        default=800.0,
+        help='Median time to first token, in milliseconds'
+    )
+    parser.add_argument(
+        '--latency-sigma',
+        type=float,
+        default=0.5,
+        help='Spread of the log-normal latency distribution (0 for a fixed latency)'
+    )
+    parser.add_argument(
+        '--token-delay-ms',
+        type=float,
+        default=30.0,
+        help='Delay between streamed tokens, in milliseconds'
+    )
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests rejected with a 429')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+
+    return parser.parse_args()
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    rng = random.Random(args.seed)
+    stats = {"requests": 0, "streams": 0, "errors": 0, "rate_limited": 0, "in_flight": 0}
+
+    def first_token_delay() -> float:
+        median = args.latency_ms / 1000.0
+        if args.latency_sigma <= 0:
+            return median
+        return rng.lognormvariate(0.0, args.latency_sigma) * median
+
+    def error_response():
+        roll = rng.random()
+        if roll < args.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"Retry-After": "1"}
+            )
+        if roll < args.rate_limit_rate + args.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected failure (stub)", "type": "server_error", "code": None}}
+            )
+        return None
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        failure = error_response()
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "gpt-3.5-turbo")
+        reply = rng.choice(REPLIES)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 4 for m in body.get("messages", []))
+
+        if not body.get("stream"):
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(first_token_delay() + args.token_delay_ms / 1000.0 * len(reply.split()))
+            finally:
+                stats["in_flight"] -= 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(reply) // 4 + 1,
+                    "total_tokens": prompt_tokens + len(reply) // 4 + 1,
+                },
+            }
+
+        async def event_stream():
+            stats["streams"] += 1
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(first_token_delay())
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": word if i == 0 else f" {word}"},
+                                "finish_reason": None,
+                            }
+                        ],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(args.token_delay_ms / 1000.0)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    return app
+
+def main():
+    args = parse_args()
+    logger.info(
+        f"LLM stub on http://{args.host}:{args.port}/v1 "
+        f"(median latency {args.latency_ms} ms, sigma {args.latency_sigma}, "
+        f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%})"
+    )
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
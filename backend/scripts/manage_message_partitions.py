@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Maintain the monthly partitions of the messages table.
+
+    python scripts/manage_message_partitions.py status
+    python scripts/manage_message_partitions.py create --months-ahead 3
+    python scripts/manage_message_partitions.py archive --keep-months 24 --archive-dir /mnt/archive/messages
+    python scripts/manage_message_partitions.py restore /mnt/archive/messages/messages_2024_01.csv.gz
+
+`archive` moves every month older than --keep-months out of the database: each partition
+is detached, written to <archive-dir>/<partition>.csv.gz, checked against its row count and
+dropped, all in one transaction, so a failure leaves the partition attached. Archived
+messages no longer appear in conversations or search; `restore` attaches them again.
+Run `create` and `archive` from cron, e.g. monthly.
+"""
+
+import sys
+import argparse
+import csv
+import gzip
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the parent directory to sys.path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from sqlalchemy import text
+from app.utils.database import SessionLocal
+from app.utils.message_partitions import (
+    add_months, create_partition, ensure_partitions, list_partitions, month_start, partition_month
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# body_tsv is generated, so it is recomputed on restore rather than archived
+ARCHIVED_COLUMNS = "message_id, sender_id, recipient_id, body, timestamp"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Create, archive and restore monthly partitions of messages')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help='List partitions with their size and estimated row count')
+
+    create = subparsers.add_parser('create', help='Create partitions for the coming months')
+    create.add_argument('--months-ahead', type=int, default=3, help='Months past the current one to create')
+
+    archive = subparsers.add_parser('archive', help='Move old partitions to compressed files')
+    archive.add_argument('--keep-months', type=int, default=24, help='Months kept in the database, current month included')
+    archive.add_argument('--archive-dir', type=str, required=True, help='Directory receiving the .csv.gz files')
+    archive.add_argument('--dry-run', action='store_true', help='Only list the partitions that would be archived')
+
+    restore = subparsers.add_parser('restore', help='Load an archived partition back into messages')
+    restore.add_argument('archive_file', type=str, help='A messages_YYYY_MM.csv.gz file written by archive')
+
+    return parser.parse_args()
+
+def show_status(db) -> int:
+    rows = db.execute(text("""
+        SELECT child.relname,
+               pg_size_pretty(pg_total_relation_size(child.oid)) AS size,
+               child.reltuples::bigint AS estimated_rows
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'messages'
+        ORDER BY child.relname
+    """)).fetchall()
+    for row in rows:
+        logger.info(f"{row.relname}: {row.size}, ~{max(row.estimated_rows, 0)} rows")
+    return 0
+
+def archive_partition(db, name: str, archive_dir: Path) -> None:
+    path = archive_dir / f"{name}.csv.gz"
+    if path.exists():
+        raise FileExistsError(f"{path} already exists; move it away before archiving {name} again")
+
+    # DETACH takes the lock that stops new writes; the COPY then sees the final contents
+    db.execute(text(f"ALTER TABLE messages DETACH PARTITION {name}"))
+    expected = db.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+
+    partial = path.with_suffix(".partial")
+    committed = False
+    try:
+        cursor = db.connection().connection.cursor()
+        with open(partial, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+                cursor.copy_expert(
+                    f"COPY (SELECT {ARCHIVED_COLUMNS} FROM {name} ORDER BY message_id) TO STDOUT WITH (FORMAT csv, HEADER)",
+                    compressed
+                )
+            # On disk before the rows are dropped
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        with gzip.open(partial, "rt", newline="") as written:
+            # Bodies may contain newlines, so count CSV records rather than lines
+            written_rows = sum(1 for _ in csv.reader(written)) - 1
+        if written_rows != expected:
+            raise RuntimeError(f"{name}: wrote {written_rows} rows but the partition holds {expected}")
+
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        committed = True
+    finally:
+        # Until the drop is committed the rows are still in the database, and a stray
+        # file would block the next archive run of this month
+        if not committed:
+            partial.unlink(missing_ok=True)
+    # Named like a finished archive only once its rows are gone from the database
+    partial.rename(path)
+    logger.info(f"Archived {expected} messages from {name} to {path}")
+
+def archive_partitions(db, keep_months: int, archive_dir: Path, dry_run: bool) -> int:
+    if keep_months < 1:
+        logger.error("--keep-months must be at least 1: the current month is always kept")
+        return 1
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -(keep_months - 1))
+    old = [name for name, month in list_partitions(db) if month < cutoff]
+    if not old:
+        logger.info(f"No partitions older than {cutoff:%Y-%m}")
+        return 0
+    if dry_run:
+        logger.info(f"Would archive: {', '.join(old)}")
+        return 0
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    failures = 0
+    for name in old:
+        try:
+            archive_partition(db, name, archive_dir)
+        except Exception as e:
+            db.rollback()
+            failures += 1
+            logger.error(f"Failed to archive {name}, left attached: {str(e)}")
+    return 1 if failures else 0
+
+def restore_partition(db, archive_file: Path) -> int:
+    name = archive_file.name.split(".")[0]
+    month = partition_month(name)
+    if month is None:
+        logger.error(f"{archive_file} is not named like an archived partition (messages_YYYY_MM.csv.gz)")
+        return 1
+
+    create_partition(db, month)
+    cursor = db.connection().connection.cursor()
+    with gzip.open(archive_file, "rb") as compressed:
+        # Through the parent, so rows outside the month are rejected by the partition bounds
+        cursor.copy_expert(
+            f"COPY messages ({ARCHIVED_COLUMNS}) FROM STDIN WITH (FORMAT csv, HEADER)",
+            compressed
+        )
+    db.commit()
+    logger.info(f"Restored {cursor.rowcount} messages into {name}")
+    return 0
+
+def main():
+    args = parse_args()
+    db = SessionLocal()
+    try:
+        if args.command == 'status':
+            return show_status(db)
+        if args.command == 'create':
+            created = ensure_partitions(db, months_ahead=args.months_ahead)
+            logger.info(f"Created {len(created)} partitions")
+            return 0
+        if args.command == 'archive':
+            return archive_partitions(db, args.keep_months, Path(args.archive_dir), args.dry_run)
+        return restore_partition(db, Path(args.archive_file))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"{args.command} failed: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
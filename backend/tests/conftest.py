@@ -0,0 +1,126 @@
+"""
+Shared fixtures. These tests run against a real Postgres, because the code under test
+relies on Postgres-only SQL (ON CONFLICT, partitions, tsvector, LEAST/GREATEST indexes):
+
+    createdb orientor_test
+    TEST_DATABASE_URL=postgresql://postgres@localhost:5432/orientor_test python -m pytest tests
+
+Without TEST_DATABASE_URL every test is skipped. The database is wiped between tests,
+so never point it at a database whose contents matter.
+"""
+
+import importlib.util
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    # app.utils.database connects at import time, so point it at the test database first
+    os.environ["ENV"] = "development"
+    os.environ["LOCAL_DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    sys.path.insert(0, str(BACKEND_DIR))
+else:
+    collect_ignore_glob = ["test_*.py"]
+
+def pytest_report_header(config):
+    if not TEST_DATABASE_URL:
+        return "TEST_DATABASE_URL is not set: database tests skipped"
+
+@pytest.fixture(scope="session")
+def engine():
+    from app.utils.database import engine, Base
+    import app.models  # noqa: F401 - registers every table on Base.metadata
+    from app.utils.message_partitions import ensure_partitions
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # The migrations give message_id a server-side default, which raw INSERTs rely on
+        conn.execute(text("ALTER TABLE messages ALTER COLUMN message_id SET DEFAULT nextval('message_id_seq')"))
+    with Session(engine) as db:
+        ensure_partitions(db)
+    yield engine
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy import text
+    from app.utils.database import SessionLocal, Base
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        with engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+@pytest.fixture
+def make_user(db):
+    from app.models import User
+
+    def make_user(**fields):
+        user = User(email=f"test-{uuid.uuid4().hex[:12]}@example.com", hashed_password="not-a-real-hash", **fields)
+        db.add(user)
+        db.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def migration_schema(engine):
+    """
+    A connection whose search_path is an empty throwaway schema, for running a single
+    revision's upgrade()/downgrade() against the tables that revision expects.
+    """
+    from sqlalchemy import text
+
+    schema = f"migration_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            conn.execute(text("SET search_path TO public"))
+            conn.commit()
+
+def load_revision(name: str):
+    """The module of an alembic revision, by file name (without .py)."""
+    path = BACKEND_DIR / "alembic" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(f"revision_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_revision(conn, name: str, direction: str) -> None:
+    """Run upgrade() or downgrade() of revision name on conn and commit."""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    module = load_revision(name)
+    context = MigrationContext.configure(conn)
+    with Operations.context(context):
+        getattr(module, direction)()
+    conn.commit()
+
+def index_names(conn, table: str):
+    from sqlalchemy import text
+
+    rows = conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"),
+        {"table": table}
+    )
+    return {row.indexname for row in rows}
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+from app.services.chat_history import ChatHistoryStore, MemoryHistoryBackend, PostgresHistoryBackend
+from app.utils.database import SessionLocal
+
+def turn(text):
+    return [{"role": "user", "content": text}]
+
+def append(text):
+    return lambda history: [*history, *turn(text)]
+
+def two_workers():
+    # Two stores on one table behave like two uvicorn workers
+    backend = PostgresHistoryBackend(SessionLocal)
+    return ChatHistoryStore(backend), ChatHistoryStore(backend), backend
+
+def test_versions_are_assigned_by_the_database(make_user):
+    user = make_user()
+    worker, _, backend = two_workers()
+
+    async def scenario():
+        await worker.set(user.id, turn("first"))
+        await worker.flush()
+        await worker.set(user.id, turn("second"))
+        await worker.flush()
+    asyncio.run(scenario())
+
+    assert backend.load(user.id) == (turn("second"), 2)
+
+def test_concurrent_turns_on_two_workers_both_survive(make_user):
+    user = make_user()
+    first, second, backend = two_workers()
+
+    async def scenario():
+        assert await first.get(user.id) is None
+        assert await second.get(user.id) is None
+        # Both built on the same (empty) history before either flushed
+        await first.update(user.id, append("from first"))
+        await second.update(user.id, append("from second"))
+        await first.flush()
+        await second.flush()
+        return await first.get(user.id), await second.get(user.id)
+    seen_by_first, seen_by_second = asyncio.run(scenario())
+
+    both = turn("from first") + turn("from second")
+    assert backend.load(user.id) == (both, 2)
+    assert seen_by_first == seen_by_second == both
+    assert second.stats()["dirty"] == 0
+
+def test_changes_made_during_a_lost_flush_are_kept(make_user):
+    user = make_user()
+    first, second, backend = two_workers()
+
+    async def scenario():
+        await second.update(user.id, append("second, turn 1"))
+        await first.update(user.id, append("first"))
+        await first.flush()
+        flushing = asyncio.create_task(second.flush())
+        await asyncio.sleep(0)
+        await second.update(user.id, append("second, turn 2"))
+        await flushing
+        await second.flush()
+    asyncio.run(scenario())
+
+    assert backend.load(user.id)[0] == turn("first") + turn("second, turn 1") + turn("second, turn 2")
+
+def test_reads_see_another_workers_flushed_write(make_user):
+    user = make_user()
+    first, second, _ = two_workers()
+
+    async def scenario():
+        await first.set(user.id, turn("one"))
+        await first.flush()
+        assert await second.get(user.id) == turn("one")
+        await first.update(user.id, append("two"))
+        await first.flush()
+        # No time window: the very next read on second picks it up
+        return await second.get(user.id)
+
+    assert asyncio.run(scenario()) == turn("one") + turn("two")
+
+def test_one_conflict_does_not_fail_the_rest_of_the_batch(make_user):
+    contested, uncontested = make_user(), make_user()
+    first, second, backend = two_workers()
+
+    async def scenario():
+        await second.update(contested.id, append("second"))
+        await second.update(uncontested.id, append("only writer"))
+        await first.update(contested.id, append("first"))
+        await first.flush()
+        await second.flush()
+    asyncio.run(scenario())
+
+    assert backend.load(contested.id) == (turn("first") + turn("second"), 2)
+    assert backend.load(uncontested.id) == (turn("only writer"), 1)
+
+def test_evicted_dirty_session_is_rebased_and_written(make_user):
+    user, other = make_user(), make_user()
+    first, _, backend = two_workers()
+    second = ChatHistoryStore(backend, max_sessions=1)
+
+    async def scenario():
+        await second.update(user.id, append("second"))
+        # Evicts user's unflushed session
+        await second.update(other.id, append("other"))
+        await first.update(user.id, append("first"))
+        await first.flush()
+        await second.flush()
+    asyncio.run(scenario())
+
+    assert backend.load(user.id) == (turn("first") + turn("second"), 2)
+    assert second.stats()["dirty"] == 0
+
+class SlowMemoryBackend(MemoryHistoryBackend):
+    def save_many(self, rows):
+        time.sleep(0.05)
+        return super().save_many(rows)
+
+def test_update_during_a_flush_is_written_once():
+    store = ChatHistoryStore(SlowMemoryBackend())
+
+    async def scenario():
+        await store.update(1, append("a"))
+        await asyncio.gather(store.flush(), store.update(1, append("b")))
+        await store.flush()
+        return await store.get(1)
+
+    assert asyncio.run(scenario()) == turn("a") + turn("b")
+    assert store.backend.load(1) == (turn("a") + turn("b"), 2)
+
+def test_memory_backend_has_the_same_compare_and_swap():
+    backend = MemoryHistoryBackend()
+    assert backend.save_many({1: (turn("a"), 0)}) == {1: 1}
+    assert backend.save_many({1: (turn("b"), 0)}) == {}
+    assert backend.save_many({1: (turn("c"), 1)}) == {1: 2}
+    assert backend.load(1) == (turn("c"), 2)
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import chat
+from app.routes.user import get_current_user
+from app.utils.database import get_db
+
+@pytest.fixture
+def client(db, make_user):
+    user = make_user()
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: db
+    # raise_server_exceptions=False: look at the response like a client would
+    return TestClient(app, raise_server_exceptions=False), user
+
+def test_stream_discards_the_user_turn_when_the_prompt_cannot_be_built(client, monkeypatch):
+    client, user = client
+
+    def broken_prompt(*args, **kwargs):
+        raise RuntimeError("profile lookup failed")
+    monkeypatch.setattr(chat, "build_prompt", broken_prompt)
+
+    response = client.post("/chat/send/stream", json={"text": "hello"})
+
+    assert response.status_code == 500
+    assert asyncio.run(chat.load_history(user.id)) == (None, [])
+
+def test_metrics_require_a_logged_in_user(client):
+    client, _ = client
+    assert client.get("/chat/metrics").status_code == 200
+
+    anonymous = FastAPI()
+    anonymous.include_router(chat.router)
+    assert TestClient(anonymous).get("/chat/metrics").status_code == 401
@@ -0,0 +1,93 @@
+from sqlalchemy import text
+
+from app.models import Message
+from app.utils.database import SessionLocal
+from app.utils.messaging import send_bulk_messages, send_message, upsert_conversation
+
+def insert_message(db, sender_id, recipient_id, body):
+    message = Message(sender_id=sender_id, recipient_id=recipient_id, body=body)
+    db.add(message)
+    db.flush()
+    db.refresh(message)
+    return message
+
+def ids(*messages):
+    return [message.message_id for message in messages]
+
+def conversation(db, user_a, user_b):
+    return db.execute(
+        text("SELECT * FROM conversations WHERE user_a_id = :a AND user_b_id = :b"),
+        {"a": min(user_a, user_b), "b": max(user_a, user_b)}
+    ).fetchone()
+
+def test_send_updates_the_conversation(db, make_user):
+    alice, bob = make_user(), make_user()
+    first = send_message(db, alice.id, bob.id, "hello")
+    second = send_message(db, alice.id, bob.id, "are you there?")
+
+    row = conversation(db, alice.id, bob.id)
+    assert row.last_message_id == second.message_id > first.message_id
+    assert row.last_message_preview == "are you there?"
+    bob_side = "b" if bob.id > alice.id else "a"
+    assert getattr(row, f"unread_{bob_side}") == 2
+
+def test_older_message_committing_last_does_not_become_the_last_message(db, make_user):
+    alice, bob = make_user(), make_user()
+    slow, fast = SessionLocal(), SessionLocal()
+    try:
+        # Both messages are inserted, the older id's transaction reaches the upsert last
+        older = insert_message(slow, alice.id, bob.id, "older")
+        newer = insert_message(fast, alice.id, bob.id, "newer")
+        older_id, newer_id = ids(older, newer)
+        upsert_conversation(fast, newer)
+        fast.commit()
+        upsert_conversation(slow, older)
+        slow.commit()
+    finally:
+        slow.close()
+        fast.close()
+
+    row = conversation(db, alice.id, bob.id)
+    assert older_id < newer_id
+    assert row.last_message_id == newer_id
+    assert row.last_message_preview == "newer"
+    bob_side = "b" if bob.id > alice.id else "a"
+    alice_side = "a" if bob_side == "b" else "b"
+    # Both messages still count as unread, and the sender's watermark does not move back
+    assert getattr(row, f"unread_{bob_side}") == 2
+    assert getattr(row, f"last_read_{alice_side}") == newer_id
+
+def test_late_reply_does_not_clear_messages_the_sender_has_not_seen(db, make_user):
+    alice, bob = make_user(), make_user()
+    send_message(db, bob.id, alice.id, "earlier")
+    slow, fast = SessionLocal(), SessionLocal()
+    try:
+        # Alice replies, but her transaction commits after Bob's next message
+        reply = insert_message(slow, alice.id, bob.id, "reply")
+        followup = insert_message(fast, bob.id, alice.id, "follow-up")
+        followup_id, = ids(followup)
+        upsert_conversation(fast, followup)
+        fast.commit()
+        upsert_conversation(slow, reply)
+        slow.commit()
+    finally:
+        slow.close()
+        fast.close()
+
+    row = conversation(db, alice.id, bob.id)
+    alice_side = "a" if alice.id < bob.id else "b"
+    bob_side = "b" if alice_side == "a" else "a"
+    assert row.last_message_id == followup_id
+    assert row.last_sender_id == bob.id
+    # Alice has not seen the follow-up, so her reply must not zero her counter
+    assert getattr(row, f"unread_{alice_side}") == 2
+    assert getattr(row, f"unread_{bob_side}") == 1
+
+def test_bulk_send_counts_every_message_as_unread(db, make_user):
+    sender, first, second = make_user(), make_user(), make_user()
+    send_bulk_messages(db, sender.id, [first.id, second.id, first.id], ["one", "two", "three"])
+
+    row = conversation(db, sender.id, first.id)
+    first_side = "a" if first.id < sender.id else "b"
+    assert row.last_message_preview == "three"
+    assert getattr(row, f"unread_{first_side}") == 2
@@ -0,0 +1,68 @@
+import importlib.util
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.utils.message_partitions import create_partition, ensure_partitions, list_partitions, month_start, partition_name
+from app.utils.messaging import get_conversation, send_bulk_messages, send_message
+from conftest import BACKEND_DIR
+
+def drop_current_partition(db):
+    current = partition_name(month_start(datetime.now(timezone.utc).date()))
+    db.execute(text(f"DROP TABLE {current}"))
+    db.commit()
+    return current
+
+def test_send_creates_a_missing_partition(db, make_user):
+    alice, bob = make_user(), make_user()
+    current = drop_current_partition(db)
+    try:
+        sent = send_message(db, alice.id, bob.id, "the cron did not run this month")
+        assert sent is not None
+        assert current in {name for name, _ in list_partitions(db)}
+        assert [m.message_id for m in get_conversation(db, alice.id, bob.id)] == [sent.message_id]
+    finally:
+        ensure_partitions(db)
+
+def test_bulk_send_creates_a_missing_partition(db, make_user):
+    sender, first, second = make_user(), make_user(), make_user()
+    drop_current_partition(db)
+    try:
+        result, messages = send_bulk_messages(db, sender.id, [first.id, second.id], ["one", "two"])
+        assert result.sent == 2
+        assert [m.body for m in messages] == ["one", "two"]
+    finally:
+        ensure_partitions(db)
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name, BACKEND_DIR / "scripts" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_failed_archive_leaves_no_file_behind(db, make_user, tmp_path, monkeypatch):
+    manage = load_script("manage_message_partitions")
+    alice, bob = make_user(), make_user()
+    create_partition(db, date(2020, 1, 1))
+    db.execute(
+        text("INSERT INTO messages (sender_id, recipient_id, body, timestamp) VALUES (:a, :b, 'old', '2020-01-15')"),
+        {"a": alice.id, "b": bob.id}
+    )
+    db.commit()
+
+    def failing_commit():
+        raise RuntimeError("connection lost")
+    with monkeypatch.context() as patch:
+        patch.setattr(db, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            manage.archive_partition(db, "messages_2020_01", tmp_path)
+    db.rollback()
+
+    assert "messages_2020_01" in {name for name, _ in list_partitions(db)}
+    assert list(tmp_path.iterdir()) == []
+
+    # The next run is not blocked by a leftover file
+    manage.archive_partition(db, "messages_2020_01", tmp_path)
+    assert "messages_2020_01" not in {name for name, _ in list_partitions(db)}
+    assert [path.name for path in tmp_path.iterdir()] == ["messages_2020_01.csv.gz"]
@@ -0,0 +1,98 @@
+from sqlalchemy import text
+
+from conftest import index_names, run_revision
+
+def create_unpartitioned_messages(conn, with_conversation_index: bool = False) -> None:
+    # messages as add_messages_table and 383abf336991 left it
+    conn.execute(text("CREATE TABLE users (id serial PRIMARY KEY)"))
+    conn.execute(text("CREATE SEQUENCE message_id_seq"))
+    conn.execute(text("""
+        CREATE TABLE messages (
+            message_id integer DEFAULT nextval('message_id_seq') NOT NULL,
+            sender_id integer NOT NULL REFERENCES users (id),
+            recipient_id integer NOT NULL REFERENCES users (id),
+            body text NOT NULL,
+            timestamp timestamptz DEFAULT now() NOT NULL,
+            CONSTRAINT messages_pkey PRIMARY KEY (message_id)
+        )
+    """))
+    conn.execute(text("CREATE INDEX ix_messages_sender_id ON messages (sender_id)"))
+    conn.execute(text("CREATE INDEX ix_messages_recipient_id ON messages (recipient_id)"))
+    conn.execute(text("CREATE INDEX ix_messages_timestamp ON messages (timestamp)"))
+    if with_conversation_index:
+        conn.execute(text("CREATE INDEX ix_messages_conversation ON messages (sender_id, recipient_id, timestamp)"))
+    conn.commit()
+
+def insert_messages(conn, timestamps) -> None:
+    conn.execute(text("INSERT INTO users DEFAULT VALUES"))
+    conn.execute(text("INSERT INTO users DEFAULT VALUES"))
+    for i, timestamp in enumerate(timestamps):
+        conn.execute(
+            text("INSERT INTO messages (sender_id, recipient_id, body, timestamp) VALUES (1, 2, :body, :timestamp)"),
+            {"body": f"message {i}", "timestamp": timestamp}
+        )
+    conn.commit()
+
+def test_pair_index_round_trip(migration_schema):
+    conn = migration_schema
+    create_unpartitioned_messages(conn)
+    before = index_names(conn, "messages")
+
+    run_revision(conn, "add_messages_pair_index", "upgrade")
+    assert index_names(conn, "messages") == before | {"ix_messages_pair_timestamp"}
+
+    run_revision(conn, "add_messages_pair_index", "downgrade")
+    assert index_names(conn, "messages") == before
+
+    run_revision(conn, "add_messages_pair_index", "upgrade")
+    assert "ix_messages_pair_timestamp" in index_names(conn, "messages")
+
+def test_pair_index_drops_a_surviving_conversation_index(migration_schema):
+    conn = migration_schema
+    create_unpartitioned_messages(conn, with_conversation_index=True)
+
+    run_revision(conn, "add_messages_pair_index", "upgrade")
+    assert "ix_messages_conversation" not in index_names(conn, "messages")
+
+def partitions(conn):
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'messages' AND parent.relnamespace = current_schema()::regnamespace
+    """))
+    return {row.relname for row in rows}
+
+def messages_snapshot(conn):
+    return conn.execute(text(
+        "SELECT message_id, sender_id, recipient_id, body, timestamp, body_tsv::text FROM messages ORDER BY message_id"
+    )).fetchall()
+
+def test_partition_round_trip_keeps_every_message(migration_schema):
+    conn = migration_schema
+    create_unpartitioned_messages(conn)
+    run_revision(conn, "add_messages_pair_index", "upgrade")
+    run_revision(conn, "add_messages_search", "upgrade")
+    insert_messages(conn, ["2025-11-30 23:59:59+00", "2025-12-01 00:00:00+00", "2026-02-14 12:00:00+00"])
+    before_rows = messages_snapshot(conn)
+    before_indexes = index_names(conn, "messages")
+
+    run_revision(conn, "partition_messages_by_month", "upgrade")
+    assert {"messages_2025_11", "messages_2025_12", "messages_2026_01", "messages_2026_02"} <= partitions(conn)
+    assert "messages_default" not in partitions(conn)
+    assert messages_snapshot(conn) == before_rows
+    assert conn.execute(text("SELECT COUNT(*) FROM messages_2025_12")).scalar() == 1
+    assert index_names(conn, "messages") == before_indexes
+    # New rows still get ids from the shared sequence
+    insert_messages(conn, ["2026-02-15 08:00:00+00"])
+    after_insert = messages_snapshot(conn)
+    assert after_insert[-1].message_id > before_rows[-1].message_id
+
+    run_revision(conn, "partition_messages_by_month", "downgrade")
+    assert partitions(conn) == set()
+    assert messages_snapshot(conn) == after_insert
+    assert index_names(conn, "messages") == before_indexes
+
+    run_revision(conn, "partition_messages_by_month", "upgrade")
+    assert messages_snapshot(conn) == after_insert
@@ -0,0 +1,131 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models import SavedRecommendation, UserSkill
+from app.routers.space import decode_cursor, encode_cursor, list_saved_recommendations, rank_saved_recommendations, router
+from app.routes.user import get_current_user
+from app.utils.database import get_db
+
+SAVED_AT = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+def save_recommendations(db, user, count):
+    """count recommendations in groups of three sharing saved_at, and repeating skill levels, so both orders have ties."""
+    db.add(UserSkill(user_id=user.id, creativity=3, leadership=4, digital_literacy=2, critical_thinking=5, problem_solving=3))
+    for i in range(count):
+        db.add(SavedRecommendation(
+            user_id=user.id,
+            oasis_code=f"TEST.{i:03d}",
+            label=f"Occupation {i}",
+            saved_at=SAVED_AT - timedelta(minutes=i // 3),
+            role_creativity=i % 5 + 1 if i % 7 else None,
+            role_leadership=(i + 1) % 5 + 1 if i % 7 else None,
+            role_digital_literacy=(i + 2) % 5 + 1 if i % 7 else None,
+            role_critical_thinking=(i + 3) % 5 + 1 if i % 7 else None,
+            role_problem_solving=(i + 4) % 5 + 1 if i % 7 else None,
+        ))
+    db.commit()
+
+def walk_pages(db, user, sort, limit, summary=False):
+    ids, cursor, pages = [], None, 0
+    while True:
+        items, cursor = list_saved_recommendations(db, user, limit=limit, cursor=cursor, sort=sort, summary=summary)
+        assert len(items) <= limit
+        ids.extend(item.id for item in items)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+@pytest.mark.parametrize("sort", ["saved_at", "fit"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 7, 100])
+def test_pages_cover_every_recommendation_once_in_order(db, make_user, sort, limit):
+    user = make_user()
+    save_recommendations(db, user, 23)
+    everything, _ = list_saved_recommendations(db, user, sort=sort, summary=True)
+
+    ids, pages = walk_pages(db, user, sort, limit)
+
+    assert ids == [item.id for item in everything]
+    assert len(set(ids)) == 23
+    assert pages == max(1, -(-23 // limit))
+
+def test_fit_order_is_best_first_with_unrated_last(db, make_user):
+    user = make_user()
+    save_recommendations(db, user, 15)
+    items, _ = list_saved_recommendations(db, user, sort="fit", summary=True)
+
+    scores = [item.fit_score for item in items]
+    rated = [score for score in scores if score is not None]
+    assert rated == sorted(rated, reverse=True)
+    assert scores[len(rated):] == [None] * (len(scores) - len(rated))
+    assert len(rated) < len(scores)
+
+def test_saved_at_order_breaks_ties_by_id(db, make_user):
+    user = make_user()
+    save_recommendations(db, user, 9)
+    items, _ = list_saved_recommendations(db, user, sort="saved_at", summary=True)
+
+    keys = [(item.saved_at, item.id) for item in items]
+    assert keys == sorted(keys, reverse=True)
+
+def test_a_page_does_not_move_when_earlier_pages_change(db, make_user):
+    user = make_user()
+    save_recommendations(db, user, 10)
+    first_page, cursor = list_saved_recommendations(db, user, limit=4, summary=True)
+    expected_next, _ = list_saved_recommendations(db, user, limit=4, cursor=cursor, summary=True)
+
+    # A newer save and a deletion on the first page do not shift the keyset page
+    db.add(SavedRecommendation(user_id=user.id, oasis_code="TEST.NEW", label="New", saved_at=SAVED_AT + timedelta(days=1)))
+    db.query(SavedRecommendation).filter(SavedRecommendation.id == first_page[0].id).delete()
+    db.commit()
+    next_page, _ = list_saved_recommendations(db, user, limit=4, cursor=cursor, summary=True)
+
+    assert [item.id for item in next_page] == [item.id for item in expected_next]
+
+@pytest.mark.parametrize("value", [SAVED_AT, datetime(2026, 3, 1, 12, 30, 15, 123456), 0.8845000267028809, float("-inf")])
+def test_cursor_round_trips_and_is_url_safe(value):
+    cursor = encode_cursor(value, 42)
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    decoded_value, recommendation_id = decode_cursor(cursor, "fit" if isinstance(value, float) else "saved_at")
+    assert recommendation_id == 42
+    if isinstance(value, float):
+        assert decoded_value == value
+    else:
+        assert decoded_value == (value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "Zm9vfGJhcg", ""])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "saved_at")
+
+def test_cursor_survives_an_unencoded_query_string(db, make_user):
+    user = make_user()
+    save_recommendations(db, user, 5)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    first = client.get("/space/recommendations?limit=2&summary=true")
+    cursor = first.headers["X-Next-Cursor"]
+    # Appended as-is, the way a client building the URL by hand would
+    second = client.get(f"/space/recommendations?limit=2&summary=true&cursor={cursor}")
+
+    assert second.status_code == 200
+    assert not {item["id"] for item in first.json()} & {item["id"] for item in second.json()}
+    assert client.get("/space/recommendations?limit=2&cursor=garbage").status_code == 400
+
+def test_ranking_leaves_out_gaps_it_cannot_compute(db, make_user):
+    user = make_user()
+    save_recommendations(db, user, 8)
+    ranking = rank_saved_recommendations(trait=[], db=db, current_user=user)
+
+    gaps = [gap for item in ranking for gap in item.skill_gaps.values()]
+    assert gaps and not any(math.isnan(gap) for gap in gaps)
+    # Recommendation 0 has no role skills at all
+    assert next(item for item in ranking if item.oasis_code == "TEST.000").skill_gaps == {}
@@ -53,12 +53,32 @@ export default function PeerChatPage() {
             );
 
             setMessages(response.data);
+            if (response.data.length > 0) {
+                markRead();
+            }
         } catch (err: any) {
             console.error('Error fetching messages:', err);
             setError(err.response?.data?.detail || 'Failed to load messages');
         }
     };
 
+    // Move our read watermark to the latest message of this conversation
+    const markRead = async () => {
+        try {
+            const token = localStorage.getItem('access_token');
+            if (!token) return;
+            await axios.post(
+                `${cleanApiUrl}/messages/conversation/${peerId}/read`,
+                {},
+                {
+                    headers: { Authorization: `Bearer ${token}` }
+                }
+            );
+        } catch (err: any) {
+            console.error('Error marking conversation read:', err);
+        }
+    };
+
     // Function to fetch peer profile
     const fetchPeerProfile = async () => {
         try {
@@ -125,8 +145,7 @@ export default function PeerChatPage() {
                 }
             );
 
-            // Refresh messages after sending
-            fetchMessages();
+            // The new message arrives over the WebSocket
         } catch (err: any) {
             console.error('Error sending message:', err);
             setError(err.response?.data?.detail || 'Failed to send message');
@@ -157,13 +176,58 @@ export default function PeerChatPage() {
         }
     }, [peerId]);
 
-    // Set up polling for new messages
+    // Receive new messages over a WebSocket instead of polling
     useEffect(() => {
         if (!peerId) return;
+        const token = localStorage.getItem('access_token');
+        if (!token) return;
+
+        const peer = parseInt(peerId);
+        const wsUrl = cleanApiUrl.replace(/^http/, 'ws');
+        let socket: WebSocket | null = null;
+        let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+        let reconnectDelay = 1000;
+        let closed = false;
+
+        const connect = () => {
+            socket = new WebSocket(`${wsUrl}/messages/ws?token=${encodeURIComponent(token)}`);
+
+            socket.onopen = () => {
+                reconnectDelay = 1000;
+                // Catch up on anything sent while the socket was down
+                fetchMessages();
+            };
 
-        const pollInterval = setInterval(fetchMessages, 5000); // Poll every 5 seconds
+            socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type !== 'message') return;
+                const message: Message = data.message;
+                if (message.sender_id !== peer && message.recipient_id !== peer) return;
+                // Conversation is kept newest first, like the API returns it
+                setMessages((previous) =>
+                    previous.some((m) => m.message_id === message.message_id)
+                        ? previous
+                        : [message, ...previous]
+                );
+                if (message.sender_id === peer) {
+                    markRead();
+                }
+            };
+
+            socket.onclose = () => {
+                if (closed) return;
+                reconnectTimer = setTimeout(connect, reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+            };
+        };
 
-        return () => clearInterval(pollInterval);
+        connect();
+
+        return () => {
+            closed = true;
+            if (reconnectTimer) clearTimeout(reconnectTimer);
+            socket?.close();
+        };
     }, [peerId]);
 
     if (!peerId) {
@@ -17,10 +17,6 @@ interface MessageFeedback {
     feedback: 'helpful' | 'not_helpful';
 }
 
-interface ChatResponse {
-    text: string;
-}
-
 // Define API URL with fallback and trim any trailing spaces
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 const cleanApiUrl = API_URL ? API_URL.trim() : '';
@@ -34,6 +30,7 @@ export default function ChatPage() {
     const [authError, setAuthError] = useState<string | null>(null);
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const [feedback, setFeedback] = useState<MessageFeedback[]>([]);
+    const streamControllerRef = useRef<AbortController | null>(null);
 
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -43,6 +40,11 @@ export default function ChatPage() {
         scrollToBottom();
     }, [messages]);
 
+    // Cancel any in-flight reply stream when leaving the page
+    useEffect(() => {
+        return () => streamControllerRef.current?.abort();
+    }, []);
+
     // Check authentication on mount
     useEffect(() => {
         const token = localStorage.getItem('access_token');
@@ -83,36 +85,76 @@ export default function ChatPage() {
                 return;
             }
 
-            const response = await axios.post<ChatResponse>(
-                `${cleanApiUrl}/chat/send`,
-                { text: inputMessage },
-                {
-                    headers: {
-                        'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json',
-                    },
-                }
-            );
+            // Stream the reply token by token over server-sent events
+            const controller = new AbortController();
+            streamControllerRef.current = controller;
+            const response = await fetch(`${cleanApiUrl}/chat/send/stream`, {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${token}`,
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ text: inputMessage }),
+                signal: controller.signal,
+            });
+
+            if (response.status === 401) {
+                setAuthError('Your session has expired. Please log in again.');
+                setTimeout(() => router.push('/login'), 2000);
+                return;
+            }
+            if (!response.ok || !response.body) {
+                throw new Error(`Chat request failed with status ${response.status}`);
+            }
 
-            const aiMessage: Message = {
-                id: Date.now() + 1,
-                text: response.data.text,
+            const aiMessageId = Date.now() + 1;
+            setMessages(prev => [...prev, {
+                id: aiMessageId,
+                text: '',
                 sender: 'ai',
                 timestamp: new Date(),
-            };
+            }]);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
 
-            setMessages(prev => [...prev, aiMessage]);
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const events = buffer.split('\n\n');
+                buffer = events.pop() ?? '';
+
+                for (const rawEvent of events) {
+                    let eventName = 'message';
+                    let data = '';
+                    for (const line of rawEvent.split('\n')) {
+                        if (line.startsWith('event: ')) eventName = line.slice(7);
+                        if (line.startsWith('data: ')) data += line.slice(6);
+                    }
+                    if (!data) continue;
+
+                    const payload = JSON.parse(data);
+                    if (eventName === 'error') {
+                        throw new Error(payload.detail);
+                    }
+                    if (eventName === 'message') {
+                        setMessages(prev => prev.map(message =>
+                            message.id === aiMessageId
+                                ? { ...message, text: message.text + payload.text }
+                                : message
+                        ));
+                    }
+                }
+            }
         } catch (error: unknown) {
+            if (error instanceof DOMException && error.name === 'AbortError') return;
             console.error('Error sending message:', error);
-            if (error && typeof error === 'object' && 'response' in error && 
-                typeof error.response === 'object' && error.response && 
-                'status' in error.response && error.response.status === 401) {
-                setAuthError('Your session has expired. Please log in again.');
-                setTimeout(() => router.push('/login'), 2000);
-            } else {
-                setAuthError('An error occurred while sending your message. Please try again.');
-            }
+            setAuthError('An error occurred while sending your message. Please try again.');
         } finally {
+            streamControllerRef.current = null;
             setIsTyping(false);
         }
     };
@@ -41,6 +41,14 @@ export interface SkillsComparison {
   problem_solving: SkillComparison;
 }
 
+export interface RecommendationFit {
+  id: number;
+  oasis_code: string;
+  label: string;
+  fit_score: number | null;
+  skill_gaps: Record<string, number>;
+}
+
 export interface UserSkills {
   creativity: number;
   leadership: number;
@@ -200,4 +208,22 @@ export const getSkillComparison = async (oasisCode: string): Promise<any> => {
     console.error('Error fetching skill comparison:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+}; 
+
+// Rank every saved recommendation by fit with the user's skills (and optional trait preferences)
+export const getRecommendationRanking = async (
+  traitPreferences: Record<string, number> = {}
+): Promise<RecommendationFit[]> => {
+  try {
+    const params = new URLSearchParams();
+    Object.entries(traitPreferences).forEach(([trait, value]) => params.append('trait', `${trait}:${value}`));
+    const response = await axios.get<RecommendationFit[]>(
+      `${API_URL}/space/recommendations/ranking`,
+      { ...getAuthHeader(), params }
+    );
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching recommendation ranking:', error);
+    throw error;
+  }
+};
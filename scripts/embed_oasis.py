@@ -1,16 +1,45 @@
 import os
-import csv
+import json
+import hashlib
+import time
+import random
+import argparse
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
-from typing import Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, TypeVar
 from pinecone import Pinecone  # Pinecone v3+
 
+# Share the OaSIS columnar cache and index pointer with the backend
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+from app.utils.oasis_cache import DEFAULT_CACHE_DIR, load_oasis_table
+from app.utils.oasis_index import (
+    INDEX_NAME,
+    POINTER_PATH,
+    activate_namespace,
+    get_active_namespace,
+    new_version_name,
+    read_pointer,
+    rollback_namespace,
+    set_pending_namespace,
+)
+
 load_dotenv()
 
+T = TypeVar("T")
+
 # === Config ===
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = "oasis-minilm-index"
 CSV_PATH = "/Users/philippebeliveau/Desktop/Notebook/Orientor_project/Orientor_project/data_n_notebook/data/KnowlegdeBase/KnowledgeBase.csv"
-BATCH_SIZE = 10
+MANIFEST_PATH = os.getenv("OASIS_MANIFEST_PATH", "oasis_ingest.manifest.json")
+BATCH_SIZE = 96  # Pinecone caps integrated-embedding upserts at 96 records per request
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+DELETE_BATCH_SIZE = 1000
+FETCH_BATCH_SIZE = 100  # ids per fetch when copying vectors between namespaces
+VALIDATION_TIMEOUT_SECONDS = 120
 
 # ✅ Initialize Pinecone client
 pc = Pinecone(api_key=PINECONE_API_KEY)
@@ -25,55 +54,345 @@ def combine_row_text(row: Dict[str, str]) -> str:
 
     return ". ".join(text_parts).strip()
 
-def main():
-    print(f"🚀 Upserting raw text to Pinecone index: {INDEX_NAME} (using integrated embedding)")
+def read_records(csv_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Dict[str, str]:
+    """Return {doc_id: text} for every usable row, read from the columnar cache (rebuilt if stale)."""
+    table = load_oasis_table(cache_dir, csv_path=csv_path)
+    records: Dict[str, str] = {}
+
+    for i, row in enumerate(table.iter_rows()):
+        text = combine_row_text(row)
+        if text:
+            records[str(table.doc_ids[i])] = text
+
+    return records
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class Manifest:
+    """
+    Per-namespace record of the content hash last committed for each document id.
+
+    The manifest is saved after every committed batch, so it doubles as the resume
+    checkpoint: a rerun after a crash only re-sends rows that never made it in.
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._namespaces: Dict[str, Dict[str, str]] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("index") == INDEX_NAME:
+                    self._namespaces = state.get("namespaces", {})
+                else:
+                    print(f"⚠️ Manifest {path} belongs to another index, ignoring it")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable manifest {path}: {e}")
+
+        self.documents = self._namespaces.setdefault(namespace, {})
+
+    def diff(self, hashes: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """Return (ids to upsert, ids to delete) so the namespace matches `hashes`."""
+        changed = [doc_id for doc_id, digest in hashes.items() if self.documents.get(doc_id) != digest]
+        deleted = [doc_id for doc_id in self.documents if doc_id not in hashes]
+        return changed, deleted
+
+    def record(self, hashes: Dict[str, str]) -> None:
+        self.documents.update(hashes)
+        self.save()
+
+    def forget(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            self.documents.pop(doc_id, None)
+        self.save()
+
+    def reset(self) -> None:
+        self.documents.clear()
+
+    def namespaces(self) -> List[str]:
+        return list(self._namespaces)
+
+    def documents_of(self, namespace: str) -> Dict[str, str]:
+        """The recorded hashes of another namespace (empty if it was never ingested)."""
+        return dict(self._namespaces.get(namespace, {}))
+
+    def drop_namespace(self, namespace: str) -> None:
+        self._namespaces.pop(namespace, None)
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index": INDEX_NAME, "namespaces": self._namespaces}, f)
+        os.replace(tmp_path, self.path)
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def with_retry(operation: Callable[[], T], description: str, max_retries: int) -> T:
+    """Run operation, retrying with jittered exponential backoff. Returns its result."""
+    for attempt in range(max_retries + 1):
+        try:
+            return operation()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = BACKOFF_BASE_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"⚠️ {description} failed ({e}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def upsert_with_retry(records: List[Dict[str, str]], namespace: str, max_retries: int) -> int:
+    """Upsert one batch of records. Returns the record count."""
+    with_retry(
+        lambda: index.upsert_records(namespace=namespace, records=records),
+        f"Batch starting at {records[0]['id']}",
+        max_retries,
+    )
+    return len(records)
+
+def delete_with_retry(doc_ids: List[str], namespace: str, max_retries: int) -> int:
+    """Delete one chunk of document ids. Returns the id count."""
+    with_retry(
+        lambda: index.delete(ids=doc_ids, namespace=namespace),
+        f"Delete starting at {doc_ids[0]}",
+        max_retries,
+    )
+    return len(doc_ids)
+
+def copy_with_retry(doc_ids: List[str], source: str, namespace: str, max_retries: int) -> Set[str]:
+    """Copy the stored vectors of doc_ids from source to namespace. Returns the ids copied."""
+    def copy() -> Set[str]:
+        fetched = index.fetch(ids=doc_ids, namespace=source).vectors
+        vectors = [
+            {"id": doc_id, "values": vector.values, "metadata": vector.metadata or {}}
+            for doc_id, vector in fetched.items()
+        ]
+        if vectors:
+            index.upsert(vectors=vectors, namespace=namespace)
+        return set(fetched)
+
+    return with_retry(copy, f"Copy starting at {doc_ids[0]}", max_retries)
+
+def seed_from_namespace(args, source: str, namespace: str, manifest: "Manifest", texts: Dict[str, str]) -> int:
+    """
+    Start a new version from the live one: rows whose text is unchanged since source was
+    ingested are copied across as stored vectors (no re-embedding) and recorded in the new
+    version's manifest, so ingest() only sends what changed. Rows source is missing, or
+    that fail to copy, are simply left to ingest().
+    """
+    source_documents = manifest.documents_of(source)
+    unchanged = [
+        doc_id for doc_id, text in texts.items()
+        if doc_id not in manifest.documents and source_documents.get(doc_id) == content_hash(text)
+    ]
+    if not unchanged:
+        return 0
+
+    print(f"📋 Copying {len(unchanged)} unchanged records from live namespace {source!r}")
+    copied_total = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(copy_with_retry, doc_ids, source, namespace, args.max_retries): doc_ids
+            for doc_ids in chunked(unchanged, FETCH_BATCH_SIZE)
+        }
+        for future in futures:
+            try:
+                copied = future.result()
+            except Exception as e:
+                print(f"⚠️ Copy of {len(futures[future])} records failed, they will be re-upserted: {e}")
+                continue
+            manifest.record({doc_id: source_documents[doc_id] for doc_id in copied})
+            copied_total += len(copied)
+
+    print(f"📋 Copied {copied_total} records from {source!r}")
+    return copied_total
+
+def validate_namespace(namespace: str, expected: int, sample_text: str, timeout: float) -> bool:
+    """Wait until the namespace reports every record, then check that it answers a query."""
+    deadline = time.monotonic() + timeout
+    vector_count = 0
+
+    while True:
+        stats = index.describe_index_stats()
+        summary = stats.namespaces.get(namespace) if stats.namespaces else None
+        vector_count = summary.vector_count if summary else 0
+        if vector_count >= expected:
+            break
+        if time.monotonic() >= deadline:
+            print(f"❌ Namespace {namespace!r} reports {vector_count}/{expected} records after {timeout:.0f}s")
+            return False
+        time.sleep(2)
+
+    response = index.search(namespace=namespace, query={"inputs": {"text": sample_text}, "top_k": 1})
+    hits = response.result.hits if hasattr(response, "result") else []
+    if not hits:
+        print(f"❌ Namespace {namespace!r} returned no hits for a sample query")
+        return False
+
+    print(f"🔍 Namespace {namespace!r} validated: {vector_count} records, sample query OK")
+    return True
+
+def ingest(args, namespace: str, manifest: "Manifest", texts: Dict[str, str]) -> bool:
+    """Bring namespace in line with texts. Returns True if every batch was committed."""
+    hashes = {doc_id: content_hash(text) for doc_id, text in texts.items()}
+    changed, deleted = manifest.diff(hashes)
+    print(f"🔎 {len(texts)} rows in CSV: {len(changed)} new or changed, {len(deleted)} removed, "
+          f"{len(texts) - len(changed)} unchanged")
+
     total_processed = 0
-    batch_records = []
+    total_deleted = 0
+    failed_batches = 0
+    started = time.perf_counter()
+    batches = chunked([{"id": doc_id, "text": texts[doc_id]} for doc_id in changed], args.batch_size)
 
-    try:
-        with open(CSV_PATH, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            for i, row in enumerate(reader):
-                if not row or not row.get("oasis_code"):
-                    continue
-
-                text = combine_row_text(row)
-                if not text:
-                    continue
-
-                # Create vector object (raw text, no values)
-                doc_id = f"oasis-{row.get('oasis_code', '').strip()}-{row.get('Concordance number', str(i)).strip()}"
-                
-                # Create vector object for integrated embeddings - keeping it simple like the docs
-                vector = {
-                    "id": doc_id,
-                    "text": text
-                }
-                
-                batch_records.append(vector)
-
-                if len(batch_records) >= BATCH_SIZE:
-                    try:
-                        index.upsert_records(namespace="", records=batch_records)
-                        total_processed += len(batch_records)
-                        print(f"✅ Upserted batch of {len(batch_records)}. Total so far: {total_processed}")
-                    except Exception as e:
-                        print(f"❌ Batch error: {e}")
-                        print(f"First record in failed batch: {batch_records[0]}")
-                    batch_records = []
-
-            if batch_records:
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        in_flight = {}
+        exhausted = False
+
+        while in_flight or not exhausted:
+            # Keep a bounded number of batches queued instead of submitting everything up front
+            while not exhausted and len(in_flight) < args.workers * 2:
+                records = next(batches, None)
+                if records is None:
+                    exhausted = True
+                    break
+                future = executor.submit(upsert_with_retry, records, namespace, args.max_retries)
+                in_flight[future] = records
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = in_flight.pop(future)
                 try:
-                    index.upsert_records(namespace="", records=batch_records)
-                    total_processed += len(batch_records)
-                    print(f"✅ Final upsert of {len(batch_records)}. Total uploaded: {total_processed}")
+                    total_processed += future.result()
+                    manifest.record({record["id"]: hashes[record["id"]] for record in records})
+                    elapsed = time.perf_counter() - started
+                    print(f"✅ Upserted batch of {len(records)}. Total so far: {total_processed} "
+                          f"({total_processed / elapsed:.1f} records/s)")
                 except Exception as e:
-                    print(f"❌ Final batch error: {e}")
-                    print(f"First record in failed batch: {batch_records[0]}")
+                    failed_batches += 1
+                    print(f"❌ Batch error after {args.max_retries} retries: {e}")
+                    print(f"First record in failed batch: {records[0]['id']}")
+
+    for doc_ids in chunked(deleted, DELETE_BATCH_SIZE):
+        try:
+            total_deleted += delete_with_retry(doc_ids, namespace, args.max_retries)
+            manifest.forget(doc_ids)
+        except Exception as e:
+            failed_batches += 1
+            print(f"❌ Delete error after {args.max_retries} retries: {e}")
+
+    manifest.save()
+    elapsed = time.perf_counter() - started
+    rate = total_processed / elapsed if elapsed > 0 else 0.0
+    print(f"📈 Upserted {total_processed} and deleted {total_deleted} records in {elapsed:.1f}s ({rate:.1f} records/s)")
+
+    if failed_batches:
+        print(f"⚠️ {failed_batches} batch(es) failed. Re-run to retry only the rows that were not committed.")
+    return failed_batches == 0
+
+def prune_versions(manifest: "Manifest", keep: List[str], max_retries: int) -> None:
+    """Delete versioned namespaces that are neither live nor kept for rollback."""
+    for namespace in manifest.namespaces():
+        if namespace in keep or not namespace:
+            continue
+        try:
+            with_retry(
+                lambda: index.delete(delete_all=True, namespace=namespace),
+                f"Dropping namespace {namespace}",
+                max_retries,
+            )
+            manifest.drop_namespace(namespace)
+            print(f"🧹 Dropped old namespace {namespace!r}")
+        except Exception as e:
+            print(f"⚠️ Could not drop namespace {namespace!r}: {e}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upsert the OaSIS knowledge base into Pinecone")
+    parser.add_argument("--csv", default=CSV_PATH, help="Path to KnowledgeBase.csv")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="OaSIS columnar cache directory")
+    parser.add_argument("--batch-size", "-b", type=int, default=BATCH_SIZE, help="Records per upsert request")
+    parser.add_argument("--workers", "-w", type=int, default=MAX_WORKERS, help="Concurrent upsert workers")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="Retries per failed batch")
+    parser.add_argument("--namespace", default=None, help="Write into this namespace instead of a new version")
+    parser.add_argument("--in-place", action="store_true", help="Apply a delta directly to the live namespace")
+    parser.add_argument("--new-version", action="store_true", help="Start a new version even if one is pending")
+    parser.add_argument("--no-activate", action="store_true", help="Build and validate the version but leave it inactive")
+    parser.add_argument("--activate", metavar="NAMESPACE", help="Make an existing namespace live and exit")
+    parser.add_argument("--rollback", action="store_true", help="Switch back to the previous live namespace and exit")
+    parser.add_argument("--no-prune", action="store_true", help="Keep namespaces older than the rollback target")
+    parser.add_argument("--pointer", default=POINTER_PATH, help="Index pointer file naming the live namespace")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Content-hash manifest used for delta runs and resume")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifests and re-embed every row, even into a new version")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.rollback:
+        state = rollback_namespace(args.pointer)
+        print(f"⏪ Live namespace is now {state['active']!r} (previous: {state['previous']!r})")
+        return
+    if args.activate is not None:
+        state = activate_namespace(args.activate, args.pointer)
+        print(f"🔀 Live namespace is now {state['active']!r} (previous: {state['previous']!r})")
+        return
+
+    # Blue/green: write a new versioned namespace unless asked to patch the live one.
+    # A new version starts as a copy of the live one, so only changed rows are embedded;
+    # an interrupted version stays pending and is resumed by the next run.
+    pointer = read_pointer(args.pointer)
+    blue_green = not args.in_place and args.namespace is None
+    if args.in_place:
+        namespace = get_active_namespace(args.pointer)
+    elif args.namespace is not None:
+        namespace = args.namespace
+    elif pointer.get("pending") and not args.new_version:
+        namespace = pointer["pending"]
+        print(f"↩️ Resuming pending version {namespace!r}")
+    else:
+        namespace = new_version_name()
+        set_pending_namespace(namespace, args.pointer)
+
+    print(f"🚀 Upserting raw text to Pinecone index: {INDEX_NAME}, namespace {namespace!r} (using integrated embedding)")
+
+    try:
+        manifest = Manifest(args.manifest, namespace)
+        if args.full:
+            manifest.reset()
+
+        texts = read_records(args.csv, args.cache_dir)
+        live = pointer.get("active") or ""
+        if blue_green and not args.full and live != namespace:
+            seed_from_namespace(args, live, namespace, manifest, texts)
+        if not ingest(args, namespace, manifest, texts):
+            return
+
+        if blue_green:
+            sample_text = next(iter(texts.values()), "")
+            if not validate_namespace(namespace, len(manifest.documents), sample_text, VALIDATION_TIMEOUT_SECONDS):
+                print(f"⚠️ Version {namespace!r} failed validation; the live namespace was not changed.")
+                return
+            if args.no_activate:
+                print(f"✅ Version {namespace!r} is ready. Activate it with --activate {namespace}")
+                return
+
+            state = activate_namespace(namespace, args.pointer)
+            print(f"🔀 Live namespace is now {namespace!r}. Roll back with --rollback")
+            if not args.no_prune:
+                prune_versions(manifest, [state["active"], state.get("previous") or ""], args.max_retries)
 
         print("🎉 All done! Data embedded and upserted into Pinecone.")
 
+    except KeyboardInterrupt:
+        print("⏸️ Interrupted. Re-run to resume; committed batches are recorded in the manifest.")
     except Exception as e:
         print(f"❌ Error: {e}")
 